@@ -0,0 +1,326 @@
+"""
+Micro-benchmarks for the recommender on synthetic data.
+
+Run from the repo root, e.g.:
+    python -m backend.recommender.bench sections --sections 10000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from .recommender import (
+    CohortPrereqs, PrereqChecker, Section, SectionIndex, compile_prereq, evaluate_prereq,
+    get_prereq_data, normalize_course_code
+)
+from .db import connection
+from .planner import DegreePlanner
+from .scheduler import build_schedules
+
+SUBJECTS = [
+    "CS", "MATH", "STAT", "ECE", "PHYS", "CHEM", "ENGL", "HIST", "ECON", "PSYC",
+    "BIOL", "CMDA", "ISE", "ME", "AOE", "GEOS", "PHIL", "SOC", "COMM", "ACIS"
+]
+
+# --- Synthetic Data ---
+
+def synthetic_sections(n_sections, seed=0):
+    """
+    Builds n_sections fake section dicts shaped like get_open_sections output.
+    Codes use the 'SUBJ-NNNN' form stored in the sections table.
+    """
+    rng = random.Random(seed)
+    sections = []
+    for crn in range(10000, 10000 + n_sections):
+        subject = rng.choice(SUBJECTS)
+        number = rng.randint(1, 4) * 1000 + rng.randint(0, 99) * 10 + rng.randint(0, 9)
+        start = rng.choice([480, 570, 660, 750, 840, 930, 1020])
+        end = start + rng.choice([50, 75, 150])
+        sections.append({
+            "crn": str(crn),
+            "code": f"{subject}-{number}",
+            "name": "",
+            "instructor": f"Instructor{rng.randint(1, 400)}",
+            "days": rng.choice(["M W F", "T R", "M W", "F", "T"]),
+            "start_time": f"{start // 60}:{start % 60:02d}",
+            "end_time": f"{end // 60}:{end % 60:02d}",
+            "location": "TBA"
+        })
+    return sections
+
+def synthetic_requirements(sections, n_requirements, candidates_per_req, seed=0):
+    """Picks select_from lists out of the catalog's course codes."""
+    rng = random.Random(seed)
+    codes = sorted({normalize_course_code(s["code"]) for s in sections})
+    return [
+        {
+            "requirement_type": f"Requirement {i}",
+            "select_from": rng.sample(codes, min(candidates_per_req, len(codes))),
+            "not_from": []
+        }
+        for i in range(n_requirements)
+    ]
+
+def synthetic_prereqs(n_courses, seed=0):
+    """
+    Builds prereqs_json-shaped trees like scrape_pre_co_req produces:
+    left-nested binary {"type": "and"/"or", "conditions": [...]} nodes over "SUBJ NNNN" leaves.
+    """
+    rng = random.Random(seed)
+
+    def leaf():
+        return f"{rng.choice(SUBJECTS)} {rng.randint(1, 4)}{rng.randint(0, 999):03d}"
+
+    def tree(depth):
+        if depth == 0 or rng.random() < 0.3:
+            return leaf()
+        node = tree(depth - 1)
+        for _ in range(rng.randint(1, 3)):
+            node = {"type": rng.choice(["and", "or"]), "conditions": [node, tree(depth - 1)]}
+        return node
+
+    return {
+        f"{rng.choice(SUBJECTS)}{rng.randint(1, 4)}{rng.randint(0, 999):03d}": tree(3)
+        for _ in range(n_courses)
+    }
+
+def synthetic_students(n_students, seed=0, courses_per_student=30):
+    rng = random.Random(seed)
+    return [
+        {f"{rng.choice(SUBJECTS)}{rng.randint(1, 4)}{rng.randint(0, 999):03d}" for _ in range(courses_per_student)}
+        for _ in range(n_students)
+    ]
+
+# --- Benchmarks ---
+
+def _scan_matches(requirements, sections):
+    """The original R x C x S matching loop, kept as the baseline."""
+    total = 0
+    for req in requirements:
+        for candidate in req["select_from"]:
+            candidate_norm = normalize_course_code(candidate)
+            for section in sections:
+                if normalize_course_code(section["code"]) == candidate_norm:
+                    total += 1
+    return total
+
+def _index_matches(requirements, index):
+    total = 0
+    for req in requirements:
+        for candidate in req["select_from"]:
+            total += len(index.lookup(normalize_course_code(candidate)))
+    return total
+
+def bench_sections(args):
+    sections = synthetic_sections(args.sections)
+    requirements = synthetic_requirements(sections, args.requirements, args.candidates)
+
+    start = time.perf_counter()
+    index = SectionIndex(sections)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scan_total = _scan_matches(requirements, sections)
+    scan_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        index_total = _index_matches(requirements, index)
+    index_s = (time.perf_counter() - start) / args.repeat
+
+    assert scan_total == index_total, "index and scan disagree"
+    print(f"📦 {len(sections)} sections, {len(requirements)} requirements x {args.candidates} candidates, {scan_total} matches")
+    print(f"  linear scan:   {scan_s * 1000:10.2f} ms")
+    print(f"  index build:   {build_s * 1000:10.2f} ms (once per load)")
+    print(f"  index lookups: {index_s * 1000:10.2f} ms ({scan_s / max(index_s, 1e-9):.0f}x faster)")
+
+def bench_prereqs(args):
+    if args.from_db:
+        with connection() as conn:
+            raw = get_prereq_data(conn, compiled=False)
+    else:
+        raw = synthetic_prereqs(args.courses)
+    students = synthetic_students(args.students)
+    # Give every student some of the actual leaves so both branches get exercised.
+    leaves = sorted({leaf for tree in raw.values() for leaf in compile_prereq(tree).leaves})
+    rng = random.Random(1)
+    for student in students:
+        student.update(rng.sample(leaves, min(len(leaves), 200)))
+
+    start = time.perf_counter()
+    compiled = {code: compile_prereq(tree) for code, tree in raw.items()}
+    compile_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [[evaluate_prereq(tree, student) for tree in raw.values()] for student in students]
+    recursive_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [[fn(student) for fn in compiled.values()] for student in students]
+    compiled_s = time.perf_counter() - start
+
+    assert expected == actual, "compiled and recursive evaluators disagree"
+    checks = len(raw) * len(students)
+    print(f"🌳 {len(raw)} prerequisite trees x {len(students)} students = {checks} checks")
+    print(f"  recursive:  {recursive_s * 1000:10.2f} ms ({checks / recursive_s:,.0f} checks/s)")
+    print(f"  compile:    {compile_s * 1000:10.2f} ms (once per load)")
+    print(f"  compiled:   {compiled_s * 1000:10.2f} ms ({checks / compiled_s:,.0f} checks/s, {recursive_s / compiled_s:.1f}x faster)")
+
+def bench_cohort(args):
+    raw = synthetic_prereqs(args.courses)
+    compiled = {code: compile_prereq(tree) for code, tree in raw.items()}
+    students = synthetic_students(args.students)
+    leaves = sorted({leaf for fn in compiled.values() for leaf in fn.leaves})
+    rng = random.Random(1)
+    for student in students:
+        student.update(rng.sample(leaves, min(len(leaves), 200)))
+
+    start = time.perf_counter()
+    expected = [[PrereqChecker(compiled, student).satisfied(code) for code in compiled] for student in students]
+    per_student_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cohort = CohortPrereqs(compiled, students)
+    masks = [cohort.satisfied_mask(code) for code in compiled]
+    cohort_s = time.perf_counter() - start
+
+    actual = [[bool(mask >> j & 1) for mask in masks] for j in range(len(students))]
+    assert expected == actual, "cohort bitsets and per-student checks disagree"
+    print(f"👥 {len(students)} students x {len(compiled)} courses with prerequisites")
+    print(f"  per-student: {per_student_s * 1000:10.2f} ms ({len(students) / per_student_s:,.0f} students/s)")
+    print(f"  cohort:      {cohort_s * 1000:10.2f} ms ({len(students) / cohort_s:,.0f} students/s, {per_student_s / cohort_s:.1f}x faster)")
+
+def bench_section_records(args):
+    sections = synthetic_sections(args.sections)
+    # Rows as they come back from the sections table.
+    rows = [
+        (s["crn"], s["code"], s["days"], f"{s['start_time']}-{s['end_time']}", s["location"], s["instructor"])
+        for s in sections
+    ]
+    del sections
+
+    def as_dicts():
+        fetched = list(rows)  # fetchall() copy
+        out = []
+        for crn, code, days, time_str, location, instructor in fetched:
+            start_time, end_time = time_str.split("-")
+            out.append({"crn": crn, "code": code, "name": "", "instructor": instructor, "days": days,
+                        "start_time": start_time, "end_time": end_time, "location": location})
+        return out
+
+    def as_records():
+        out = []
+        for crn, code, days, time_str, location, instructor in iter(rows):
+            start_time, end_time = time_str.split("-")
+            out.append(Section(crn, code, "", instructor, days, start_time, end_time, location))
+        return out
+
+    print(f"🧱 {len(rows)} section rows")
+    for label, build in (("dicts + fetchall", as_dicts), ("streamed Sections", as_records)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = build()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {label:18s} {elapsed * 1000:8.2f} ms, peak {peak / 1024 / 1024:6.2f} MiB")
+        del result
+
+def bench_schedules(args):
+    rng = random.Random(0)
+    sections = synthetic_sections(args.requirements * args.sections_per_req)
+    recommendations = {"recommendations": []}
+    for i in range(args.requirements):
+        chunk = sections[i * args.sections_per_req:(i + 1) * args.sections_per_req]
+        recommendations["recommendations"].append({
+            "requirement": f"Requirement {i}",
+            "recommended_courses": [
+                {"section": s, "avg_gpa": round(rng.uniform(2.0, 4.0), 2), "professor": s["instructor"]}
+                for s in chunk
+            ]
+        })
+
+    start = time.perf_counter()
+    result = build_schedules(recommendations, k=args.k, time_budget=args.budget)
+    elapsed = time.perf_counter() - start
+    best = result["schedules"][0]["total_gpa"] if result["schedules"] else None
+    print(f"🗓️  {args.requirements} requirements x {args.sections_per_req} sections, top {args.k}")
+    print(f"  {elapsed * 1000:.2f} ms, {result['nodes']} nodes, {len(result['schedules'])} schedules, "
+          f"best total GPA {best}, {'complete' if result['complete'] else 'stopped at time budget'}")
+
+def bench_planner(args):
+    raw = synthetic_prereqs(args.courses)
+    codes = sorted(raw)
+    rng = random.Random(0)
+    dars_data = {
+        "completed_courses": [{"course_id": code} for code in rng.sample(codes, 40)],
+        "in_progress_courses": [],
+        "requirements_needed": [
+            {"requirement_type": f"Requirement {i}", "hours_needed": "6.00",
+             "select_from": rng.sample(codes, args.candidates), "not_from": []}
+            for i in range(args.requirements)
+        ]
+    }
+    prereq_data = {code: compile_prereq(tree) for code, tree in raw.items()}
+
+    start = time.perf_counter()
+    planner = DegreePlanner(dars_data, prereq_data, credits_per_term=args.cap)
+    plan_s = time.perf_counter() - start
+
+    # Pull the last course up to the earliest term its prerequisites allow.
+    course = planner.terms[-1][0] if planner.terms and planner.terms[-1] else None
+    start = time.perf_counter()
+    if course:
+        planner.lock(course, planner._path(course)[0])
+    lock_s = time.perf_counter() - start
+
+    print(f"🎓 {args.requirements} requirements over {len(raw)} courses with prerequisites")
+    print(f"  plan:   {plan_s * 1000:8.2f} ms, {len(planner.courses)} courses in {len(planner.terms)} terms, "
+          f"{len(planner.unplaced)} unplaced")
+    print(f"  re-plan after locking {course}: {lock_s * 1000:8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommender micro-benchmarks on synthetic data.")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("sections", help="SectionIndex lookups vs. linear scan")
+    p.add_argument("--sections", type=int, default=10000)
+    p.add_argument("--requirements", type=int, default=20)
+    p.add_argument("--candidates", type=int, default=15)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_sections)
+
+    p = sub.add_parser("section-records", help="Peak memory of Section records vs. section dicts")
+    p.add_argument("--sections", type=int, default=10000)
+    p.set_defaults(func=bench_section_records)
+
+    p = sub.add_parser("prereqs", help="Compiled prerequisite evaluators vs. evaluate_prereq")
+    p.add_argument("--from-db", action="store_true", help="Use the full course_requirements table (needs DATABASE_URL)")
+    p.add_argument("--courses", type=int, default=3000)
+    p.add_argument("--students", type=int, default=20)
+    p.set_defaults(func=bench_prereqs)
+
+    p = sub.add_parser("cohort", help="Cohort bitset prerequisite checks vs. one student at a time")
+    p.add_argument("--courses", type=int, default=3000)
+    p.add_argument("--students", type=int, default=500)
+    p.set_defaults(func=bench_cohort)
+
+    p = sub.add_parser("schedules", help="Branch-and-bound schedule builder")
+    p.add_argument("--requirements", type=int, default=6)
+    p.add_argument("--sections-per-req", type=int, default=40)
+    p.add_argument("--k", type=int, default=5)
+    p.add_argument("--budget", type=float, default=0.5)
+    p.set_defaults(func=bench_schedules)
+
+    p = sub.add_parser("planner", help="Multi-semester plan over a synthetic prerequisite graph")
+    p.add_argument("--courses", type=int, default=3000)
+    p.add_argument("--requirements", type=int, default=20)
+    p.add_argument("--candidates", type=int, default=10)
+    p.add_argument("--cap", type=int, default=15)
+    p.set_defaults(func=bench_planner)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Read-only data access for the recommender.
+
+Connections come from a bounded, process-wide pool instead of a fresh
+psycopg2.connect() (and TLS handshake) per call. The GPA, section and
+prerequisite queries are PREPAREd once per pooled connection, and bulk
+loads fetch plain tuples rather than a dict per row.
+
+Usage:
+    from backend.recommender.db import connection, fetch_all
+
+    with connection() as conn:
+        rows = fetch_all(conn, "sections_all")
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+# name -> (parameter types, SQL with $n placeholders)
+# sections_all is also streamed through a server-side cursor by get_open_sections,
+# which runs the SQL directly since DECLARE cannot wrap an EXECUTE.
+STATEMENTS = {
+    "gpa_one": (
+        "(text, text)",
+        "SELECT avg_gpa FROM avg_gpa_stats WHERE course_code = $1 AND instructor = $2"
+    ),
+    "gpa_many": (
+        "(text[], text[])",
+        "SELECT course_code, instructor, avg_gpa FROM avg_gpa_stats "
+        "WHERE (course_code, instructor) IN (SELECT * FROM unnest($1, $2))"
+    ),
+    "gpa_all": ("", "SELECT course_code, instructor, avg_gpa FROM avg_gpa_stats"),
+    "sections_all": ("", "SELECT crn, section_code, days, time, location, instructor FROM sections"),
+    "prereqs_all": (
+        "",
+        "SELECT course_code, prereqs_json FROM course_requirements WHERE prereqs_json IS NOT NULL"
+    ),
+    "course_credits": ("", "SELECT code, credits FROM courses"),
+}
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """A psycopg2 connection that remembers which STATEMENTS it has prepared."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+def _plain_sql(name):
+    """The statement with psycopg2 %s placeholders, for connections outside the pool."""
+    sql = STATEMENTS[name][1]
+    for n in range(9, 0, -1):
+        sql = sql.replace(f"${n}", "%s")
+    return sql
+
+def execute(cur, name, params=()):
+    """
+    Runs STATEMENTS[name] on cur. Pooled connections PREPARE the statement on
+    first use and EXECUTE it afterwards; any other connection (e.g. one from
+    connect_db()) just runs the SQL.
+    """
+    prepared = getattr(cur.connection, "prepared", None)
+    if prepared is None:
+        cur.execute(_plain_sql(name), params)
+        return
+    if name not in prepared:
+        types, sql = STATEMENTS[name]
+        cur.execute(f"PREPARE {name} {types} AS {sql}")
+        prepared.add(name)
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+def fetch_all(conn, name, params=()):
+    """Runs a named statement and returns all rows as tuples."""
+    with conn.cursor() as cur:
+        execute(cur, name, params)
+        return cur.fetchall()
+
+def fetch_one(conn, name, params=()):
+    """Runs a named statement and returns the first row as a tuple, or None."""
+    with conn.cursor() as cur:
+        execute(cur, name, params)
+        return cur.fetchone()
+
+# --- Connection Pool ---
+
+class BoundedPool:
+    """
+    ThreadedConnectionPool that blocks when every connection is checked out
+    (psycopg2's pool raises instead). Connections are read-only and autocommit.
+    """
+
+    def __init__(self, dsn, minconn=1, maxconn=5):
+        self.pool = ThreadedConnectionPool(
+            minconn, maxconn, dsn, sslmode="require", connection_factory=PreparedConnection
+        )
+        self.slots = threading.BoundedSemaphore(maxconn)
+
+    @contextmanager
+    def connection(self):
+        self.slots.acquire()
+        conn = None
+        try:
+            conn = self.pool.getconn()
+            if not conn.readonly:
+                conn.set_session(readonly=True, autocommit=True)
+            yield conn
+        except psycopg2.Error:
+            # Drop connections that errored; the pool opens a fresh one next time.
+            if conn is not None:
+                self.pool.putconn(conn, close=True)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self.pool.putconn(conn)
+            self.slots.release()
+
+    def close(self):
+        self.pool.closeall()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """
+    The process-wide pool, created on first use from DATABASE_URL.
+    Its size is capped by DB_POOL_MAX (default 5).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            db_url = os.environ.get("DATABASE_URL")
+            if not db_url:
+                raise Exception("DATABASE_URL not set in environment")
+            _pool = BoundedPool(db_url, maxconn=int(os.environ.get("DB_POOL_MAX", "5")))
+        return _pool
+
+def connection():
+    """Checks a connection out of the shared pool: `with connection() as conn: ...`"""
+    return get_pool().connection()
@@ -0,0 +1,333 @@
+"""
+Multi-semester graduation planner.
+
+Takes the DARS JSON from scripts/dars_parser.py and the course_requirements
+prerequisite graph and lays the remaining requirements out term by term
+under a credits-per-term cap.
+
+For every course the planner works out, once, how many terms must pass
+before it can be taken and which prerequisite courses that takes (for an
+"or" it follows the branch that finishes soonest). The courses are then
+layered topologically, longest remaining prerequisite chain first, so the
+critical path is never delayed. Locking a course into a term re-plans
+only the terms from that point on (or from wherever its prerequisites
+have to move up to).
+"""
+import math
+
+from .db import fetch_all
+from .recommender import (
+    CompiledPrereq, compile_prereq, get_student_courses, normalize_course_code, split_wildcard
+)
+
+NEVER = math.inf
+
+def get_course_credits(conn):
+    """
+    Credit hours per normalized course code from the courses table.
+    Courses with unknown credits are left out (the planner falls back to a default).
+    """
+    return {
+        normalize_course_code(code): int(credits)
+        for code, credits in fetch_all(conn, "course_credits")
+        if credits is not None
+    }
+
+class DegreePlanner:
+    """
+    Plans the remaining requirements of one student's audit.
+
+    Args:
+      dars_data: parse_dars output.
+      prereq_data: normalized course code -> prereqs_json or CompiledPrereq
+        (as returned by get_prereq_data).
+      credits_per_term: cap on credit hours per term.
+      course_credits: optional normalized code -> credit hours (see get_course_credits).
+      section_index: optional SectionIndex used to expand wildcard select_from
+        tokens such as 'CS4***'; without it wildcards are skipped.
+      default_credits: credit hours assumed for courses missing from course_credits.
+    """
+
+    def __init__(self, dars_data, prereq_data, credits_per_term=15, course_credits=None,
+                 section_index=None, default_credits=3):
+        self.prereq_data = prereq_data
+        self.credits_per_term = credits_per_term
+        self.course_credits = course_credits or {}
+        self.default_credits = default_credits
+        self.completed = get_student_courses(dars_data)
+
+        # course -> (earliest term index, prerequisite courses it needs, direct prerequisites)
+        self.paths = {}
+        self.targets = {}  # course -> requirement_type it was picked for
+        self.unmet = []    # requirements that could not be covered
+        for req in dars_data.get("requirements_needed", []):
+            self._pick_targets(req, section_index)
+
+        self.courses = set(self.targets)
+        for course in self.targets:
+            self.courses |= self._path(course)[1]
+        self.dependents = {course: set() for course in self.courses}
+        for course in self.courses:
+            for prereq in self._path(course)[2]:
+                if prereq in self.dependents:
+                    self.dependents[prereq].add(course)
+        self.height = {}
+        for course in self.courses:
+            self._height(course)
+
+        self.locked = {}
+        self.terms = []
+        self.unplaced = []
+        self._layer_from(0)
+
+    # --- Prerequisite paths ---
+
+    def credits(self, course):
+        return self.course_credits.get(course, self.default_credits)
+
+    def _tree(self, course):
+        tree = self.prereq_data.get(course)
+        if tree is not None and not isinstance(tree, CompiledPrereq):
+            tree = compile_prereq(tree)
+            self.prereq_data[course] = tree
+        return tree
+
+    def _path(self, course, visiting=None):
+        """
+        (earliest, needs, direct) for course: the 0-based term it can first be
+        taken in, every not-yet-completed prerequisite course that requires
+        (transitively), and the prerequisites it depends on directly.
+        """
+        return self._walk(course, visiting if visiting is not None else set())[0]
+
+    def _walk(self, course, visiting):
+        """
+        (_path result, cycle): cycle holds the courses still being worked out
+        higher up the stack that the result ran into (a prerequisite cycle
+        counts as unsatisfiable there). Such a result depends on where the
+        walk started, so only results that ran into no course but themselves
+        are cached.
+        """
+        if course in self.paths:
+            return self.paths[course], frozenset()
+        if course in visiting:
+            return (NEVER, frozenset(), frozenset()), frozenset([course])
+        visiting.add(course)
+        tree = self._tree(course)
+        if tree is None:
+            result, cycle = (0, frozenset(), frozenset()), frozenset()
+        else:
+            result, cycle = self._node_path(tree, visiting)
+        visiting.discard(course)
+        cycle -= {course}
+        if not cycle:
+            self.paths[course] = result
+        return result, cycle
+
+    def _leaf_path(self, leaf, visiting):
+        if leaf in self.completed:
+            return (0, frozenset(), frozenset()), frozenset()
+        (earliest, needs, _), cycle = self._walk(leaf, visiting)
+        return (earliest + 1, needs | {leaf}, frozenset([leaf])), cycle
+
+    def _node_path(self, node, visiting):
+        walked = [self._leaf_path(leaf, visiting) for leaf in sorted(node.leaves)]
+        walked += [self._node_path(child, visiting) for child in node.children]
+        options = [option for option, _ in walked]
+        cycle = frozenset().union(*(c for _, c in walked))
+        if node.op == "and":
+            earliest, needs, direct = 0, frozenset(), frozenset()
+            for opt_earliest, opt_needs, opt_direct in options:
+                earliest = max(earliest, opt_earliest)
+                needs |= opt_needs
+                direct |= opt_direct
+            return (earliest, needs, direct), cycle
+        if node.op == "or" and options:
+            return min(options, key=lambda opt: (opt[0], len(opt[1]))), cycle
+        return (NEVER, frozenset(), frozenset()), cycle
+
+    def _height(self, course):
+        """Length of the longest chain of planned courses that depend on course."""
+        if course not in self.height:
+            self.height[course] = 0  # guards against cycles
+            self.height[course] = 1 + max((self._height(d) for d in self.dependents[course]), default=0)
+        return self.height[course]
+
+    # --- Target selection ---
+
+    def _pick_targets(self, req, section_index):
+        select_from = req.get("select_from", [])
+        if not select_from:
+            return
+        not_from = req.get("not_from", [])
+        if section_index is not None:
+            candidates = section_index.expand_candidates(select_from, not_from)
+        else:
+            excluded = {normalize_course_code(token) for token in not_from if not split_wildcard(token)}
+            candidates = [
+                normalize_course_code(token) for token in select_from
+                if not split_wildcard(token) and normalize_course_code(token) not in excluded
+            ]
+        candidates = [c for c in dict.fromkeys(candidates) if c not in self.completed and c not in self.targets]
+        # Fewest terms to reach first, then fewest extra prerequisite courses.
+        candidates.sort(key=lambda c: (self._path(c)[0], len(self._path(c)[1]), c))
+
+        try:
+            hours_needed = float(req.get("hours_needed") or 0)
+        except ValueError:
+            hours_needed = 0
+        hours = 0
+        for course in candidates:
+            if self._path(course)[0] == NEVER:
+                continue
+            self.targets[course] = req.get("requirement_type", "")
+            hours += self.credits(course)
+            if hours >= hours_needed:
+                return
+        self.unmet.append(req.get("requirement_type", ""))
+
+    # --- Layering ---
+
+    def _deadlines(self):
+        """
+        Last term each course can go in so that every locked course still has
+        its prerequisites in earlier terms (NEVER when nothing locked needs it).
+        """
+        deadline = {}
+
+        def visit(course, stack):
+            if course in deadline:
+                return deadline[course]
+            if course in stack:
+                return NEVER  # prerequisite cycle
+            stack.add(course)
+            latest = self.locked.get(course, NEVER)
+            for dependent in self.dependents.get(course, ()):
+                latest = min(latest, visit(dependent, stack) - 1)
+            stack.discard(course)
+            deadline[course] = latest
+            return latest
+
+        for course in self.courses:
+            visit(course, set())
+        return deadline
+
+    def _layer_from(self, start):
+        """
+        Re-plans terms start.. keeping earlier terms as they are. Courses a
+        locked course depends on are placed before its term; raises
+        ValueError if the credit cap makes that impossible.
+        """
+        deadline = self._deadlines()
+        self.terms = self.terms[:start]
+        placed = {course: t for t, term in enumerate(self.terms) for course in term}
+        remaining = self.courses - set(placed)
+        term = start
+        while remaining:
+            chosen = [course for course, t in self.locked.items() if t == term and course in remaining]
+            load = sum(self.credits(course) for course in chosen)
+            available = sorted(
+                (course for course in remaining
+                 if course not in self.locked and all(placed.get(p, term) < term for p in self._path(course)[2])),
+                key=lambda course: (deadline[course], -self.height[course], course)
+            )
+            for course in available:
+                credits = self.credits(course)
+                if load + credits <= self.credits_per_term or not chosen:
+                    chosen.append(course)
+                    load += credits
+            late = sorted(course for course in remaining if deadline[course] <= term and course not in chosen)
+            if late:
+                raise ValueError(f"{', '.join(late)} can't fit into term {term + 1}, "
+                                 f"ahead of the locked courses that need them")
+            if not chosen and not any(t > term for t in self.locked.values()):
+                break  # nothing left can ever be placed
+            for course in chosen:
+                placed[course] = term
+                remaining.discard(course)
+            self.terms.append(chosen)
+            term += 1
+        self.unplaced = sorted(remaining)
+
+    def lock(self, course, term):
+        """
+        Pins course into the given 0-based term and re-plans from the first term
+        that changes. The course is added to the plan if it was not in it, and
+        its prerequisites are moved ahead of the term where needed.
+
+        Raises ValueError, leaving the plan as it was, if the course can't be
+        taken that early or its prerequisites can't fit in before it.
+        """
+        course = normalize_course_code(course)
+        earliest = self._path(course)[0]
+        if earliest == NEVER:
+            raise ValueError(f"{course} can't be planned: its prerequisites can never be met")
+        if term < earliest:
+            raise ValueError(f"{course} needs {earliest} term(s) of prerequisites first; "
+                             f"the earliest it can go is term {earliest + 1}")
+
+        saved = (set(self.courses), {c: set(d) for c, d in self.dependents.items()}, dict(self.height),
+                 dict(self.locked), [list(t) for t in self.terms], list(self.unplaced))
+        try:
+            if course not in self.courses:
+                self.courses.add(course)
+                self.dependents[course] = set()
+                for prereq in self._path(course)[1]:
+                    self.courses.add(prereq)
+                    self.dependents.setdefault(prereq, set())
+                for c in self.courses:
+                    for prereq in self._path(c)[2]:
+                        if prereq in self.dependents:
+                            self.dependents[prereq].add(c)
+                self.height = {}
+                for c in self.courses:
+                    self._height(c)
+                first_changed = 0
+            else:
+                current = next((t for t, courses in enumerate(self.terms) if course in courses), term)
+                first_changed = min(term, current)
+            self.locked[course] = term
+
+            deadline = self._deadlines()
+            conflicts = sorted(c for c, t in self.locked.items() if deadline[c] < t)
+            if conflicts:
+                raise ValueError(f"Locked courses {', '.join(conflicts)} would come after courses that need them")
+            # Prerequisites placed too late for the lock have to move up, so re-plan from their deadline.
+            placed = {c: t for t, courses in enumerate(self.terms) for c in courses}
+            for prereq in self._path(course)[1]:
+                if placed.get(prereq, NEVER) > deadline[prereq]:
+                    first_changed = min(first_changed, deadline[prereq])
+            self._layer_from(max(first_changed, 0))
+        except ValueError:
+            (self.courses, self.dependents, self.height,
+             self.locked, self.terms, self.unplaced) = saved
+            raise
+        return self.to_dict()
+
+    def to_dict(self):
+        return {
+            "terms": [
+                {
+                    "term": t + 1,
+                    "credits": sum(self.credits(course) for course in courses),
+                    "courses": [
+                        {"course": course, "credits": self.credits(course),
+                         "requirement": self.targets.get(course, "Prerequisite"),
+                         "locked": course in self.locked}
+                        for course in courses
+                    ]
+                }
+                for t, courses in enumerate(self.terms)
+            ],
+            "unplaced": self.unplaced,
+            "unmet_requirements": self.unmet
+        }
+
+def plan_degree(dars_data, prereq_data, credits_per_term=15, course_credits=None, section_index=None):
+    """
+    Builds a term-by-term plan for the student's remaining requirements.
+    See DegreePlanner for the arguments; use DegreePlanner directly to lock
+    courses and re-plan incrementally.
+    """
+    return DegreePlanner(dars_data, prereq_data, credits_per_term=credits_per_term,
+                         course_credits=course_credits, section_index=section_index).to_dict()
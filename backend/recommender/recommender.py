@@ -1,8 +1,17 @@
 import json
 import os
 import re
+import sys
+import time
+from functools import lru_cache
+
 import psycopg2
-from psycopg2.extras import RealDictCursor
+
+try:
+    from .db import STATEMENTS, fetch_all, fetch_one
+except ImportError:
+    # Run directly as a script (python backend/recommender/recommender.py).
+    from db import STATEMENTS, fetch_all, fetch_one
 
 # --- Helper Functions ---
 
@@ -20,6 +29,20 @@ def normalize_course_code(code):
         return f"{subject}{number}"
     return re.sub(r'[^A-Z0-9]', '', code)
 
+WILDCARD_PATTERN = re.compile(r"^([A-Z]+)(\d*)\*+$")
+COURSE_CODE_PATTERN = re.compile(r"^([A-Z]+)(\d+)")
+
+def split_wildcard(token):
+    """
+    Splits a DARS wildcard token into (subject, digit_prefix).
+    E.g., 'CS4***' → ('CS', '4'), 'MATH 3***' → ('MATH', '3').
+    Returns None if the token is not a wildcard.
+    """
+    match = WILDCARD_PATTERN.match(re.sub(r'[^A-Z0-9*]', '', token.upper()))
+    if match:
+        return match.group(1), match.group(2)
+    return None
+
 def format_course_code_for_gpa(code):
     """
     Converts a normalized course code (e.g., "CS2506") to the format used in avg_gpa_stats (e.g., "CS-2506").
@@ -34,13 +57,14 @@ def format_course_code_for_gpa(code):
 def evaluate_prereq(prereq, student_courses):
     """
     Recursively evaluate a prerequisite JSON structure against the student's completed courses.
+    A "single" node (a one-course prerequisite from parse_req_string) behaves like "and".
     """
     if isinstance(prereq, str):
         return normalize_course_code(prereq) in student_courses
     elif isinstance(prereq, dict):
         operator = prereq.get("type", "").lower()
         conditions = prereq.get("conditions", [])
-        if operator == "and":
+        if operator in ("and", "single"):
             return all(evaluate_prereq(cond, student_courses) for cond in conditions)
         elif operator == "or":
             return any(evaluate_prereq(cond, student_courses) for cond in conditions)
@@ -51,16 +75,340 @@ def evaluate_prereq(prereq, student_courses):
     else:
         return False
 
+class CompiledPrereq:
+    """
+    A prerequisite tree compiled once by compile_prereq().
+
+    Leaf course codes are normalized up front and stored as a frozenset per
+    node, and nested nodes with the same operator are flattened, so evaluating
+    is a set test plus a walk over the remaining children. Gives the same
+    answer as evaluate_prereq on the original JSON.
+    """
+    __slots__ = ("op", "leaves", "children")
+
+    def __init__(self, op, leaves, children):
+        self.op = op  # "and", "or", or "never" for unknown node types
+        self.leaves = leaves
+        self.children = children
+
+    def __call__(self, student_courses):
+        if self.op == "and":
+            return self.leaves.issubset(student_courses) and all(child(student_courses) for child in self.children)
+        if self.op == "or":
+            return not self.leaves.isdisjoint(student_courses) or any(child(student_courses) for child in self.children)
+        return False
+
+def compile_prereq(prereq):
+    """
+    Compile a prerequisite JSON structure (as stored in prereqs_json) into a CompiledPrereq.
+    Lists and "single" nodes are treated as "and", matching evaluate_prereq.
+    """
+    if isinstance(prereq, str):
+        return CompiledPrereq("and", frozenset([normalize_course_code(prereq)]), ())
+    if isinstance(prereq, dict):
+        op = prereq.get("type", "").lower()
+        conditions = prereq.get("conditions", [])
+        if op == "single":
+            op = "and"
+    elif isinstance(prereq, list):
+        op = "and"
+        conditions = prereq
+    else:
+        op = "never"
+    if op not in ("and", "or"):
+        return CompiledPrereq("never", frozenset(), ())
+
+    leaves = set()
+    children = []
+    for cond in conditions:
+        if isinstance(cond, str):
+            leaves.add(normalize_course_code(cond))
+            continue
+        child = compile_prereq(cond)
+        if child.op == op:
+            leaves.update(child.leaves)
+            children.extend(child.children)
+        else:
+            children.append(child)
+    return CompiledPrereq(op, frozenset(leaves), tuple(children))
+
 def prereqs_satisfied(course_code, student_courses, prereq_data):
     """
     Check if the student has satisfied prerequisites for a given course using prereq_data.
+    prereq_data values may be raw prereqs_json structures or CompiledPrereq objects.
     """
     normalized = normalize_course_code(course_code)
     if normalized in prereq_data:
         prereq_structure = prereq_data[normalized]
+        if isinstance(prereq_structure, CompiledPrereq):
+            return prereq_structure(student_courses)
         return evaluate_prereq(prereq_structure, student_courses)
     return True
 
+class PrereqChecker:
+    """
+    Memoizes prereqs_satisfied for one student's course set.
+    Create one per recommendation run; results are cached per course.
+    """
+
+    def __init__(self, prereq_data, student_courses):
+        self.prereq_data = prereq_data
+        self.student_courses = student_courses
+        self.results = {}
+
+    def satisfied(self, course_code):
+        normalized = normalize_course_code(course_code)
+        if normalized not in self.results:
+            self.results[normalized] = prereqs_satisfied(normalized, self.student_courses, self.prereq_data)
+        return self.results[normalized]
+
+class CohortPrereqs:
+    """
+    Prerequisite checks for a whole cohort of students at once.
+
+    Every course a student has completed or is taking is interned to an integer
+    ID, and each student's courses are packed into a Python int bitmask
+    (student_masks). The transpose, one int per course with bit j set when
+    student j has it, lets a CompiledPrereq evaluate for every student with a
+    handful of big-int ANDs/ORs. Results are cached per course.
+    """
+
+    def __init__(self, prereq_data, cohort_courses):
+        self.prereq_data = prereq_data
+        self.course_ids = {}
+        self.student_masks = []
+        self.columns = {}
+        self.all_students = (1 << len(cohort_courses)) - 1
+        self.results = {}
+
+        for j, courses in enumerate(cohort_courses):
+            mask = 0
+            for code in courses:
+                course_id = self.course_ids.setdefault(code, len(self.course_ids))
+                mask |= 1 << course_id
+                self.columns[code] = self.columns.get(code, 0) | (1 << j)
+            self.student_masks.append(mask)
+
+    def has_courses(self, student_idx, codes):
+        """Returns True if the student has every course in codes (normalized)."""
+        want = 0
+        for code in codes:
+            if code not in self.course_ids:
+                return False
+            want |= 1 << self.course_ids[code]
+        return self.student_masks[student_idx] & want == want
+
+    def _evaluate(self, compiled):
+        if compiled.op == "and":
+            result = self.all_students
+            for leaf in compiled.leaves:
+                result &= self.columns.get(leaf, 0)
+                if not result:
+                    return 0
+            for child in compiled.children:
+                result &= self._evaluate(child)
+                if not result:
+                    return 0
+            return result
+        if compiled.op == "or":
+            result = 0
+            for leaf in compiled.leaves:
+                result |= self.columns.get(leaf, 0)
+            for child in compiled.children:
+                if result == self.all_students:
+                    break
+                result |= self._evaluate(child)
+            return result
+        return 0
+
+    def satisfied_mask(self, course_code):
+        """Bitmask of the students who satisfy the course's prerequisites."""
+        normalized = normalize_course_code(course_code)
+        if normalized not in self.results:
+            prereq = self.prereq_data.get(normalized)
+            if prereq is None:
+                self.results[normalized] = self.all_students
+            else:
+                if not isinstance(prereq, CompiledPrereq):
+                    prereq = compile_prereq(prereq)
+                self.results[normalized] = self._evaluate(prereq)
+        return self.results[normalized]
+
+    def checker_for(self, student_idx):
+        """A PrereqChecker-compatible view for one student in the cohort."""
+        return _CohortStudentChecker(self, student_idx)
+
+class _CohortStudentChecker:
+    def __init__(self, cohort, student_idx):
+        self.cohort = cohort
+        self.bit = 1 << student_idx
+
+    def satisfied(self, course_code):
+        return bool(self.cohort.satisfied_mask(course_code) & self.bit)
+
+DAY_BITS = {"M": 1, "T": 2, "W": 4, "R": 8, "F": 16, "S": 32, "U": 64}
+TIME_PATTERN = re.compile(r"(\d{1,2}):(\d{2})\s*([AP]M)?", re.IGNORECASE)
+
+@lru_cache(maxsize=4096)
+def parse_days(days):
+    """
+    Converts a Banner days string (e.g., 'M W F', 'TR') to a bitmask over DAY_BITS.
+    Anything that isn't made only of day letters ('(ARR)', 'TBA', 'ONLINE', '')
+    has no fixed meeting days and maps to 0, rather than to the days its
+    letters happen to spell (the T of 'TBA' is not Tuesday).
+    """
+    letters = "".join((days or "").upper().split())
+    if not letters or any(ch not in DAY_BITS for ch in letters):
+        return 0
+    mask = 0
+    for ch in letters:
+        mask |= DAY_BITS[ch]
+    return mask
+
+@lru_cache(maxsize=4096)
+def parse_time_minutes(time_str):
+    """
+    Converts '9:05AM' / '1:30 PM' / '13:30' to minutes since midnight.
+    Returns None if the string is not a clock time (e.g., 'ARR' or '').
+    """
+    match = TIME_PATTERN.search(time_str or "")
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2)), (match.group(3) or "").upper()
+    if meridiem == "PM" and hour != 12:
+        hour += 12
+    elif meridiem == "AM" and hour == 12:
+        hour = 0
+    return hour * 60 + minute
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+class Section:
+    """
+    Compact record for one open section.
+
+    Days and times are parsed once at load time into day_mask (see DAY_BITS)
+    and start_min/end_min (minutes since midnight, None when arranged); the
+    parsers are cached since a term only has a few hundred distinct values.
+    Repeated strings are interned. Supports section["code"] style access and
+    to_dict() for JSON output, so it can stand in for the old section dicts.
+    """
+    __slots__ = ("crn", "code", "name", "instructor", "days", "start_time", "end_time", "location",
+                 "day_mask", "start_min", "end_min")
+
+    FIELDS = ("crn", "code", "name", "instructor", "days", "start_time", "end_time", "location")
+
+    def __init__(self, crn, code, name, instructor, days, start_time, end_time, location):
+        self.crn = crn
+        self.code = _intern(code)
+        self.name = _intern(name)
+        self.instructor = _intern(instructor)
+        self.days = _intern(days)
+        self.start_time = _intern(start_time)
+        self.end_time = _intern(end_time)
+        self.location = _intern(location)
+        self.day_mask = parse_days(days)
+        self.start_min = parse_time_minutes(start_time)
+        self.end_min = parse_time_minutes(end_time)
+
+    @classmethod
+    def from_dict(cls, section):
+        return cls(*(section.get(field, "") for field in cls.FIELDS))
+
+    def __getitem__(self, key):
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        return f"Section({self.crn!r}, {self.code!r}, {self.days!r} {self.start_time}-{self.end_time})"
+
+def section_to_dict(section):
+    """JSON-ready dict for a Section or a plain section dict."""
+    return section.to_dict() if isinstance(section, Section) else section
+
+class SectionIndex:
+    """
+    Open sections keyed by normalized course code (e.g., 'CS2506').
+
+    Built once when sections are loaded so each select_from candidate is a
+    dict lookup instead of a scan over the whole term. Iterating, len() and
+    indexing still behave like the underlying list of section dicts.
+
+    by_prefix maps (subject, digit prefix) to the course codes that start with
+    it, so a wildcard like 'CS4***' expands in time proportional to its matches.
+    """
+
+    def __init__(self, sections):
+        self.sections = list(sections)
+        self.by_code = {}
+        for section in self.sections:
+            code_norm = normalize_course_code(section["code"])
+            self.by_code.setdefault(code_norm, []).append(section)
+
+        self.by_prefix = {}
+        for code_norm in sorted(self.by_code):
+            match = COURSE_CODE_PATTERN.match(code_norm)
+            if not match:
+                continue
+            subject, number = match.groups()
+            for k in range(len(number) + 1):
+                self.by_prefix.setdefault((subject, number[:k]), []).append(code_norm)
+
+    def lookup(self, course_code_norm):
+        """Returns the sections for an already-normalized course code."""
+        return self.by_code.get(course_code_norm, [])
+
+    def expand_candidates(self, select_from, not_from=()):
+        """
+        Expands a requirement's select_from tokens into normalized course codes.
+        Wildcards ('CS4***') are resolved through the prefix index; anything in
+        not_from (exact codes or wildcards) is excluded. Order follows
+        select_from and each code is returned once.
+        """
+        excluded_codes = set()
+        excluded_prefixes = set()
+        for token in not_from:
+            wildcard = split_wildcard(token)
+            if wildcard:
+                excluded_prefixes.add(wildcard)
+            else:
+                excluded_codes.add(normalize_course_code(token))
+
+        def is_excluded(code_norm):
+            if code_norm in excluded_codes:
+                return True
+            if excluded_prefixes:
+                match = COURSE_CODE_PATTERN.match(code_norm)
+                if match:
+                    subject, number = match.groups()
+                    return any((subject, number[:k]) in excluded_prefixes for k in range(len(number) + 1))
+            return False
+
+        expanded = []
+        seen = set()
+        for token in select_from:
+            wildcard = split_wildcard(token)
+            codes = self.by_prefix.get(wildcard, []) if wildcard else [normalize_course_code(token)]
+            for code_norm in codes:
+                if code_norm not in seen and not is_excluded(code_norm):
+                    seen.add(code_norm)
+                    expanded.append(code_norm)
+        return expanded
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def __getitem__(self, idx):
+        return self.sections[idx]
+
 # --- Database Connection and Data Retrieval ---
 
 def connect_db():
@@ -69,59 +417,55 @@ def connect_db():
         raise Exception("DATABASE_URL not set in environment")
     return psycopg2.connect(db_url, sslmode="require")
 
-def get_open_sections(conn):
+def get_open_sections(conn, batch_size=2000):
     """
     Retrieves open sections from the database.
     Assumes a table 'sections' with columns: crn, section_code, days, time, location, instructor.
     Handles cases where the time field is not in a strict "start-end" format.
+
+    Rows are streamed through a server-side cursor batch_size at a time and
+    turned straight into Section records, so the raw result set is never held
+    in memory alongside the sections. Returns a SectionIndex over them.
     """
-    query = "SELECT crn, section_code, days, time, location, instructor FROM sections;"
     open_sections = []
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(query)
-        rows = cur.fetchall()
-        print("🔍 Open sections raw rows:")
-        for idx, row in enumerate(rows[:5]):
-            print(f"Row {idx}: {row} | keys: {list(row.keys())}")
-        for row in rows:
-            time_str = row["time"]
-            time_parts = time_str.split("-")
+    print("🔍 Open sections raw rows:")
+    # withhold=True lets the named cursor work on autocommit (pooled) connections.
+    with conn.cursor(name="open_sections_stream", withhold=True) as cur:
+        cur.itersize = batch_size
+        cur.execute(STATEMENTS["sections_all"][1])
+        for idx, (crn, section_code, days, time_str, location, instructor) in enumerate(cur):
+            if idx < 5:
+                print(f"Row {idx}: {(crn, section_code, days, time_str, location, instructor)}")
+            time_parts = (time_str or "").split("-")
             if len(time_parts) == 2:
                 start_time = time_parts[0].strip()
                 end_time = time_parts[1].strip()
             else:
                 start_time = ""
                 end_time = ""
-            open_sections.append({
-                "crn": row["crn"],
-                "code": row["section_code"],
-                "name": "",  # Optionally add course title if available.
-                "instructor": row["instructor"],
-                "days": row["days"],
-                "start_time": start_time,
-                "end_time": end_time,
-                "location": row["location"]
-            })
+            open_sections.append(Section(
+                crn, section_code,
+                "",  # Optionally add course title if available.
+                instructor, days, start_time, end_time, location
+            ))
     print("✅ Got open sections")
-    return open_sections
+    return SectionIndex(open_sections)
 
-def get_prereq_data(conn):
+def get_prereq_data(conn, compiled=True):
     """
     Retrieves prerequisite/corequisite JSON data from the database.
     Assumes a table 'course_requirements' with columns: course_code and prereqs_json.
+    Each tree is compiled once with compile_prereq unless compiled=False,
+    in which case the raw JSON structures are returned.
     """
-    query = "SELECT course_code, prereqs_json FROM course_requirements WHERE prereqs_json IS NOT NULL;"
     prereq_data = {}
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(query)
-        rows = cur.fetchall()
-        print("🔍 Prereq Data preview:")
-        for idx, row in enumerate(rows[:5]):
-            print(f"Row {idx}: {row}")
-        for row in rows:
-            code = row["course_code"]
-            # Assuming prereqs_json is stored as JSON (either text or native JSON type)
-            prereq_data[normalize_course_code(code)] = row["prereqs_json"]
+    rows = fetch_all(conn, "prereqs_all")
+    print("🔍 Prereq Data preview:")
+    for idx, row in enumerate(rows[:5]):
+        print(f"Row {idx}: {row}")
+    for code, prereq in rows:
+        # Assuming prereqs_json is stored as JSON (either text or native JSON type)
+        prereq_data[normalize_course_code(code)] = compile_prereq(prereq) if compiled else prereq
     return prereq_data
 
 def get_weighted_gpa(conn, course_code, instructor):
@@ -131,63 +475,186 @@ def get_weighted_gpa(conn, course_code, instructor):
     
     The avg_gpa_stats table has columns: course_code, instructor, avg_gpa.
     """
-    query = "SELECT avg_gpa FROM avg_gpa_stats WHERE course_code = %s AND instructor = %s;"
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(query, (course_code, instructor))
-        row = cur.fetchone()
-        if row:
-            return float(row["avg_gpa"])
-        else:
-            return 0
+    row = fetch_one(conn, "gpa_one", (course_code, instructor))
+    if row:
+        return float(row[0])
+    else:
+        return 0
+
+class GpaLookup:
+    """
+    Batched view over avg_gpa_stats for a single recommendation run.
+
+    Instead of one SELECT per (course_code, instructor) pair, callers hand the
+    full set of pairs to prefetch() and they are fetched in a single query.
+    Pairs that are not in the table resolve to 0, same as get_weighted_gpa.
+    query_count records how many round trips the lookup has issued.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.gpas = {}
+        self.query_count = 0
+        self.fully_loaded = False
+
+    @classmethod
+    def load_all(cls, conn):
+        """
+        Loads the whole avg_gpa_stats table into memory with one query.
+        """
+        lookup = cls.from_rows(fetch_all(conn, "gpa_all"), conn)
+        lookup.query_count += 1
+        return lookup
+
+    @classmethod
+    def from_rows(cls, rows, conn=None):
+        """
+        Builds a fully loaded lookup from (course_code, instructor, avg_gpa) rows.
+        """
+        lookup = cls(conn)
+        for course_code, instructor, avg_gpa in rows:
+            lookup.gpas[(course_code, instructor)] = float(avg_gpa)
+        lookup.fully_loaded = True
+        return lookup
+
+    def prefetch(self, pairs):
+        """
+        Fetches every (course_code, instructor) pair not already known in one query.
+        """
+        if self.fully_loaded:
+            return
+        missing = {pair for pair in pairs if pair not in self.gpas}
+        if not missing:
+            return
+        missing = list(missing)
+        rows = fetch_all(self.conn, "gpa_many", ([c for c, _ in missing], [i for _, i in missing]))
+        for course_code, instructor, avg_gpa in rows:
+            self.gpas[(course_code, instructor)] = float(avg_gpa)
+        self.query_count += 1
+        # Remember misses so they are not fetched again.
+        for pair in missing:
+            self.gpas.setdefault(pair, 0)
+
+    def get(self, course_code, instructor):
+        """
+        Returns the weighted GPA for the pair, or 0 if there is none.
+        Pairs that were not prefetched fall back to a single query.
+        """
+        pair = (course_code, instructor)
+        if pair not in self.gpas:
+            if self.fully_loaded:
+                return 0
+            self.prefetch([pair])
+        return self.gpas[pair]
 
 # --- Recommendation Logic ---
 
-def recommend_courses(dars_data, open_sections, prereq_data, conn):
+def get_student_courses(dars_data):
+    """Normalized codes of the student's completed and in-progress courses."""
+    return set(
+        normalize_course_code(course["course_id"])
+        for course in dars_data.get("completed_courses", []) + dars_data.get("in_progress_courses", [])
+    )
+
+def recommend_courses(dars_data, open_sections, prereq_data, conn, gpa_lookup=None, prereq_checker=None):
     """
     Generates course recommendations based on the student's DARS audit,
     open course sections, precomputed professor GPA data from avg_gpa_stats,
     and prerequisite/corequisite requirements.
+
+    open_sections may be a SectionIndex (as returned by get_open_sections) or a
+    plain list of section dicts, which is indexed on the fly.
+    GPAs are fetched through a GpaLookup in one batch once every matching
+    section is known. Pass a preloaded gpa_lookup to skip the database entirely.
+    prereq_checker defaults to a PrereqChecker over the student's courses.
     
     Returns:
       dict: Recommendations grouped by requirement_type.
     """
-    recommendations = []
-    student_courses = set(
-        normalize_course_code(course["course_id"])
-        for course in dars_data.get("completed_courses", []) + dars_data.get("in_progress_courses", [])
-    )
-    
+    if not isinstance(open_sections, SectionIndex):
+        open_sections = SectionIndex(open_sections)
+    if gpa_lookup is None:
+        gpa_lookup = GpaLookup(conn)
+    queries_before = gpa_lookup.query_count
+
+    student_courses = get_student_courses(dars_data)
+    if prereq_checker is None:
+        prereq_checker = PrereqChecker(prereq_data, student_courses)
+
+    # First pass: collect matching sections and the GPA pairs they need.
+    matches_by_req = []
+    gpa_pairs = set()
     for req in dars_data.get("requirements_needed", []):
         req_type = req.get("requirement_type", "No Type")
         select_from = req.get("select_from", [])
-        candidate_sections = []
+        matches = []
         
         if select_from:
-            for candidate in select_from:
-                candidate_norm = normalize_course_code(candidate)
-                for section in open_sections:
-                    section_code_norm = normalize_course_code(section["code"])
-                    if section_code_norm == candidate_norm:
-                        if prereqs_satisfied(section["code"], student_courses, prereq_data):
-                            if candidate_norm not in student_courses:
-                                formatted_code = format_course_code_for_gpa(candidate_norm)
-                                professor = section["instructor"].strip()
-                                avg_gpa = get_weighted_gpa(conn, formatted_code, professor)
-                                print(f"Adding section: {section['code']} with GPA: {avg_gpa}")
-                                candidate_sections.append({
-                                    "section": section,
-                                    "avg_gpa": avg_gpa,
-                                    "professor": professor
-                                })
+            for candidate_norm in open_sections.expand_candidates(select_from, req.get("not_from", [])):
+                if candidate_norm in student_courses:
+                    continue
+                formatted_code = format_course_code_for_gpa(candidate_norm)
+                for section in open_sections.lookup(candidate_norm):
+                    if prereq_checker.satisfied(section["code"]):
+                        professor = section["instructor"].strip()
+                        matches.append((section, formatted_code, professor))
+                        gpa_pairs.add((formatted_code, professor))
+        matches_by_req.append((req_type, bool(select_from), matches))
+
+    gpa_lookup.prefetch(gpa_pairs)
+
+    # Second pass: attach GPAs and rank.
+    recommendations = []
+    for req_type, has_select_from, matches in matches_by_req:
+        candidate_sections = []
+        for section, formatted_code, professor in matches:
+            avg_gpa = gpa_lookup.get(formatted_code, professor)
+            print(f"Adding section: {section['code']} with GPA: {avg_gpa}")
+            candidate_sections.append({
+                "section": section_to_dict(section),
+                "avg_gpa": avg_gpa,
+                "professor": professor
+            })
+        if has_select_from:
             candidate_sections.sort(key=lambda x: x["avg_gpa"], reverse=True)
         
         recommendations.append({
             "requirement": req_type,
             "recommended_courses": candidate_sections
         })
-    
+
+    print(f"📊 GPA lookups issued {gpa_lookup.query_count - queries_before} queries for {len(gpa_pairs)} course/instructor pairs")
     return {"recommendations": recommendations}
 
+def recommend_cohort(dars_list, open_sections, prereq_data, conn, gpa_lookup=None):
+    """
+    Runs recommend_courses for a whole advising cohort.
+
+    Prerequisites are evaluated once per course for every student together
+    through CohortPrereqs, sections are indexed once, and avg_gpa_stats is
+    loaded once for the cohort unless a gpa_lookup is passed in.
+
+    Returns:
+      list: One recommend_courses result per entry in dars_list.
+    """
+    start = time.perf_counter()
+    if not isinstance(open_sections, SectionIndex):
+        open_sections = SectionIndex(open_sections)
+    if gpa_lookup is None:
+        gpa_lookup = GpaLookup.load_all(conn)
+
+    cohort = CohortPrereqs(prereq_data, [get_student_courses(dars_data) for dars_data in dars_list])
+    results = [
+        recommend_courses(dars_data, open_sections, prereq_data, conn,
+                          gpa_lookup=gpa_lookup, prereq_checker=cohort.checker_for(j))
+        for j, dars_data in enumerate(dars_list)
+    ]
+
+    elapsed = time.perf_counter() - start
+    rate = len(dars_list) / elapsed if elapsed > 0 else float("inf")
+    print(f"👥 Recommended for {len(dars_list)} students in {elapsed:.2f}s ({rate:.1f} students/sec)")
+    return results
+
 # --- Main Execution ---
 
 if __name__ == "__main__":
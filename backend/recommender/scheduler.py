@@ -0,0 +1,176 @@
+"""
+Weekly schedule builder over recommend_courses output.
+
+Picks one section for as many of the chosen requirements as fit (between
+min_courses and max_courses) so that no two sections meet at the same time,
+then maximizes the total avg_gpa. Each section's meeting times
+become a bitmask over 5-minute slots of the week, so a conflict check is a
+single AND. The search is a depth-first branch-and-bound that keeps the
+top-k schedules, narrows the remaining requirements to the sections that
+still fit after every pick, and stops when its time budget runs out.
+"""
+import heapq
+import time
+
+from .recommender import normalize_course_code, parse_days, parse_time_minutes
+
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAY_COUNT = 7
+
+def section_time_mask(section):
+    """
+    Bitmask of the 5-minute slots of the week the section meets in.
+    Sections without a fixed time (arranged/online) get 0 and never conflict.
+    """
+    day_mask = getattr(section, "day_mask", None)
+    if day_mask is None:
+        day_mask = parse_days(section.get("days", ""))
+        start_min = parse_time_minutes(section.get("start_time", ""))
+        end_min = parse_time_minutes(section.get("end_time", ""))
+    else:
+        start_min, end_min = section.start_min, section.end_min
+    if not day_mask or start_min is None or end_min is None or end_min <= start_min:
+        return 0
+
+    first = start_min // SLOT_MINUTES
+    last = -(-end_min // SLOT_MINUTES)  # round up so a partially used slot counts as busy
+    day_bits = ((1 << (last - first)) - 1) << first
+    mask = 0
+    for day in range(DAY_COUNT):
+        if day_mask & (1 << day):
+            mask |= day_bits << (day * SLOTS_PER_DAY)
+    return mask
+
+def build_schedules(recommendations, k=5, time_budget=0.5, requirements=None, min_courses=1, max_courses=None):
+    """
+    Builds the top-k conflict-free schedules from recommend_courses output.
+
+    A schedule doesn't have to cover every requirement: a student usually has
+    more open requirements than fit in one term. Schedules covering more
+    requirements rank first, then higher total avg_gpa. Only schedules that
+    can't take one more of the requirements without a conflict (or going over
+    max_courses) are returned.
+
+    Args:
+      recommendations: the dict returned by recommend_courses.
+      k: number of schedules to return.
+      time_budget: seconds to search before returning the best found so far.
+      requirements: requirement names to schedule; defaults to every
+        requirement that has at least one recommended section.
+      min_courses: fewest requirements a schedule may cover (pass the number
+        of requirements to get all-or-nothing schedules).
+      max_courses: most requirements a schedule may cover, e.g. 5 for a
+        15-credit term; defaults to all of them.
+
+    Returns:
+      dict: {"schedules": [...], "complete": bool, "nodes": int}. Each schedule
+      has "total_gpa", one "sections" entry per requirement it covers and the
+      "unscheduled" requirement names. complete is False if the time budget
+      cut the search short.
+    """
+    deadline = time.perf_counter() + time_budget
+
+    # One option list per requirement: (gpa, slot mask, course code, requirement position, entry).
+    # Requirement names can repeat (or be empty), so picks are keyed by position.
+    groups = []
+    names = []
+    for req in recommendations.get("recommendations", []):
+        if requirements is not None and req["requirement"] not in requirements:
+            continue
+        options = [
+            (float(rec["avg_gpa"]), section_time_mask(rec["section"]),
+             normalize_course_code(rec["section"]["code"]), len(names), rec)
+            for rec in req["recommended_courses"]
+        ]
+        if options:
+            names.append(req["requirement"])
+            options.sort(key=lambda o: o[0], reverse=True)
+            groups.append(options)
+    max_courses = len(groups) if max_courses is None else min(max_courses, len(groups))
+
+    top = []  # min-heap of ((courses, total_gpa), tiebreak, picks)
+    picks = []
+    skipped = []  # requirements left out on purpose along the current branch
+    taken_courses = set()
+    state = {"nodes": 0, "complete": True, "counter": 0}
+
+    def fits(option, occupied):
+        return not (option[1] & occupied) and option[2] not in taken_courses
+
+    def best_gpas(options_lists, n):
+        return sum(sorted((options[0][0] for options in options_lists), reverse=True)[:n])
+
+    def search(remaining, occupied, total):
+        state["nodes"] += 1
+        if state["nodes"] % 256 == 0 and time.perf_counter() > deadline:
+            state["complete"] = False
+        if not state["complete"]:
+            return
+
+        # Forward check: narrow every remaining requirement to the options that
+        # still fit, dropping the ones nothing fits any more. The best remaining
+        # GPAs give an upper bound for pruning.
+        fitting = []
+        for group in remaining:
+            options = [o for o in group if fits(o, occupied)]
+            if options:
+                fitting.append(options)
+        count = len(picks)
+        room = min(max_courses - count, len(fitting))
+        if count + room < min_courses:
+            return
+        if len(top) >= k and (count + room, total + best_gpas(fitting, room)) <= top[0][0]:
+            return
+
+        if room == 0:
+            # Not worth keeping if a requirement skipped earlier still fits.
+            if count < max_courses and any(fits(o, occupied) for group in skipped for o in group):
+                return
+            state["counter"] += 1
+            item = ((count, total), -state["counter"], list(picks))
+            if len(top) < k:
+                heapq.heappush(top, item)
+            elif item[0] > top[0][0]:
+                heapq.heapreplace(top, item)
+            return
+
+        # Branch on the most constrained requirement first: each option that fits, then leaving it out.
+        pick = min(range(len(fitting)), key=lambda i: len(fitting[i]))
+        options = fitting[pick]
+        rest = fitting[:pick] + fitting[pick + 1:]
+        rest_bound = total + best_gpas(rest, room - 1)
+        for gpa, mask, course, req_idx, rec in options:
+            # Options are sorted, so once this one can't beat the k-th best, none after it can.
+            if len(top) >= k and (count + room, rest_bound + gpa) <= top[0][0]:
+                break
+            picks.append((req_idx, rec))
+            taken_courses.add(course)
+            search(rest, occupied | mask, total + gpa)
+            taken_courses.discard(course)
+            picks.pop()
+            if not state["complete"]:
+                return
+
+        skipped.append(options)
+        search(rest, occupied, total)
+        skipped.pop()
+
+    if groups and k > 0 and max_courses >= max(min_courses, 1):
+        search(groups, 0, 0.0)
+
+    schedules = []
+    for (_, total), _, chosen in sorted(top, reverse=True):
+        # Report sections in the order the requirements appear in the audit.
+        chosen.sort(key=lambda pick: pick[0])
+        covered = {req_idx for req_idx, _ in chosen}
+        schedules.append({
+            "total_gpa": round(total, 3),
+            "sections": [
+                {"requirement": names[req_idx], "section": rec["section"], "avg_gpa": rec["avg_gpa"],
+                 "professor": rec.get("professor", "")}
+                for req_idx, rec in chosen
+            ],
+            "unscheduled": [name for i, name in enumerate(names) if i not in covered]
+        })
+    return {"schedules": schedules, "complete": state["complete"], "nodes": state["nodes"]}
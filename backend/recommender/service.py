@@ -0,0 +1,235 @@
+"""
+Long-lived recommendation service.
+
+Loads open sections, prerequisites and avg_gpa_stats into memory once and
+answers POSTed DARS JSON (as produced by scripts/dars_parser.py) without
+touching the database per request. The catalog reloads after CATALOG_TTL
+seconds or on POST /refresh; an expired catalog is reloaded by one
+background thread while requests keep being answered from the old copy.
+
+Run with any ASGI server, e.g.:
+    uvicorn backend.recommender.service:app
+
+Endpoints:
+    POST /recommendations   body: DARS JSON -> recommend_courses output
+    POST /refresh           reload the catalog now
+    GET  /health            catalog size and age
+
+Set HOKIEMATCH_FIXTURE to a JSON file to serve from a fixture instead of
+DATABASE_URL (see FixtureSource for the format).
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+
+from .db import connection
+from .recommender import (
+    GpaLookup, Section, SectionIndex, compile_prereq, get_open_sections, get_prereq_data,
+    normalize_course_code, recommend_courses
+)
+
+# --- Data Sources ---
+
+class PostgresSource:
+    """Loads the catalog from the database at DATABASE_URL through the shared pool."""
+
+    def load(self):
+        with connection() as conn:
+            open_sections = get_open_sections(conn)
+            prereq_data = get_prereq_data(conn)
+            gpa_lookup = GpaLookup.load_all(conn)
+        # The connection went back to the pool; the lookup must never fall back to a query.
+        gpa_lookup.conn = None
+        return open_sections, prereq_data, gpa_lookup
+
+class FixtureSource:
+    """
+    Loads the catalog from a JSON file:
+      {
+        "sections": [{"crn": ..., "code": "CS-3114", "instructor": ..., "days": ...,
+                      "start_time": ..., "end_time": ..., "location": ...}, ...],
+        "prereqs": {"CS-3114": <prereqs_json>, ...},
+        "avg_gpa_stats": [{"course_code": "CS-3114", "instructor": ..., "avg_gpa": 3.1}, ...]
+      }
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        with open(self.path, "r") as f:
+            fixture = json.load(f)
+        open_sections = SectionIndex(Section.from_dict(section) for section in fixture.get("sections", []))
+        prereq_data = {
+            normalize_course_code(code): compile_prereq(prereq)
+            for code, prereq in fixture.get("prereqs", {}).items()
+        }
+        gpa_lookup = GpaLookup.from_rows(
+            (row["course_code"], row["instructor"], row["avg_gpa"])
+            for row in fixture.get("avg_gpa_stats", [])
+        )
+        return open_sections, prereq_data, gpa_lookup
+
+# --- Warm Catalog ---
+
+class Catalog:
+    """
+    In-memory copy of everything recommend_courses needs.
+    get() reloads from the source once the data is older than ttl seconds.
+    Only one reload runs at a time (refresh_lock): until it finishes, get()
+    keeps returning the previous snapshot.
+    """
+
+    def __init__(self, source, ttl=900):
+        self.source = source
+        self.ttl = ttl
+        self.open_sections = None
+        self.prereq_data = None
+        self.gpa_lookup = None
+        self.loaded_at = None
+        self.generation = 0  # completed loads
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+
+    def _load(self):
+        """Loads a new snapshot from the source and swaps it in. Callers hold refresh_lock."""
+        start = time.perf_counter()
+        open_sections, prereq_data, gpa_lookup = self.source.load()
+        with self.lock:
+            self.open_sections = open_sections
+            self.prereq_data = prereq_data
+            self.gpa_lookup = gpa_lookup
+            self.loaded_at = time.time()
+            self.generation += 1
+        print(f"✅ Catalog loaded in {time.perf_counter() - start:.2f}s: "
+              f"{len(open_sections)} sections, {len(prereq_data)} prerequisite trees, "
+              f"{len(gpa_lookup.gpas)} GPA rows")
+
+    def refresh(self):
+        """
+        Reloads the catalog now and waits for it. Callers that arrive while a
+        reload is in flight wait for that one instead of starting their own.
+        """
+        generation = self.generation
+        with self.refresh_lock:
+            if self.generation != generation:
+                return
+            self._load()
+
+    def _refresh_in_background(self):
+        try:
+            self._load()
+        except Exception as e:
+            print(f"❌ Catalog reload failed, still serving the previous copy: {e}")
+        finally:
+            self.refresh_lock.release()
+
+    def is_stale(self):
+        return self.loaded_at is None or (self.ttl and time.time() - self.loaded_at > self.ttl)
+
+    def get(self):
+        if self.loaded_at is None:
+            # Nothing to serve yet: wait for the first load.
+            self.refresh()
+        elif self.is_stale() and self.refresh_lock.acquire(blocking=False):
+            if self.is_stale():
+                # One thread reloads; this and every other request use the current copy meanwhile.
+                threading.Thread(target=self._refresh_in_background, daemon=True).start()
+            else:
+                self.refresh_lock.release()
+        with self.lock:
+            return self.open_sections, self.prereq_data, self.gpa_lookup
+
+    def recommend(self, dars_data):
+        open_sections, prereq_data, gpa_lookup = self.get()
+        return recommend_courses(dars_data, open_sections, prereq_data, None, gpa_lookup=gpa_lookup)
+
+    def health(self):
+        return {
+            "loaded": self.loaded_at is not None,
+            "age_seconds": round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+            "ttl_seconds": self.ttl,
+            "sections": len(self.open_sections) if self.open_sections is not None else 0,
+            "prereqs": len(self.prereq_data) if self.prereq_data is not None else 0,
+            "gpa_rows": len(self.gpa_lookup.gpas) if self.gpa_lookup is not None else 0
+        }
+
+# --- ASGI App ---
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+def create_app(catalog):
+    """Builds a plain ASGI app serving recommendations from catalog."""
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    try:
+                        await asyncio.to_thread(catalog.refresh)
+                    except Exception as e:
+                        await send({"type": "lifespan.startup.failed", "message": str(e)})
+                        return
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        method = scope["method"]
+        path = scope["path"].rstrip("/")
+
+        if path == "/health" and method == "GET":
+            await _send_json(send, 200, catalog.health())
+        elif path == "/refresh" and method == "POST":
+            try:
+                await asyncio.to_thread(catalog.refresh)
+            except Exception as e:
+                await _send_json(send, 503, {"error": f"Failed to reload catalog: {e}"})
+                return
+            await _send_json(send, 200, catalog.health())
+        elif path == "/recommendations" and method == "POST":
+            try:
+                dars_data = json.loads(await _read_body(receive) or b"{}")
+            except ValueError as e:
+                await _send_json(send, 400, {"error": f"Invalid JSON: {e}"})
+                return
+            if not isinstance(dars_data, dict):
+                await _send_json(send, 400, {"error": "Expected a DARS JSON object"})
+                return
+            try:
+                result = await asyncio.to_thread(catalog.recommend, dars_data)
+            except Exception as e:
+                await _send_json(send, 500, {"error": str(e)})
+                return
+            await _send_json(send, 200, result)
+        else:
+            await _send_json(send, 404, {"error": f"No route for {method} {scope['path']}"})
+
+    return app
+
+def _default_catalog():
+    fixture = os.environ.get("HOKIEMATCH_FIXTURE")
+    source = FixtureSource(fixture) if fixture else PostgresSource()
+    return Catalog(source, ttl=int(os.environ.get("CATALOG_TTL", "900")))
+
+app = create_app(_default_catalog())
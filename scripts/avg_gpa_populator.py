@@ -1,7 +1,10 @@
+import argparse
 import psycopg2
+from psycopg2 import sql
 from psycopg2.extras import RealDictCursor
 import os
 import re
+import time
 
 # --- Utilities ---
 
@@ -88,6 +91,277 @@ def populate_avg_gpa_stats():
     except Exception as e:
         print(f"❌ An error occurred: {e}")
 
+# --- SQL Rebuild ---
+
+# normalize_semester as SQL: year * 10 + season weight, 0 when the label doesn't match.
+# Worked out once per distinct semester label rather than once per row.
+SEMESTER_REGEX = r"^(Spring|Summer|Fall)\s+(\d{4})"
+
+# avg_gpa is kept next to its running totals (avg_gpa = weighted_sum / total_weight).
+# The sums are exact (numeric/bigint), so folding in a new term's rows gives the
+# same totals, to the last digit, as recomputing from the whole history.
+RUNNING_TOTALS_DDL = """
+ALTER TABLE avg_gpa_stats
+    ADD COLUMN IF NOT EXISTS weighted_sum numeric,
+    ADD COLUMN IF NOT EXISTS total_weight bigint;
+"""
+# The delta upsert's ON CONFLICT (course_code, instructor) needs a unique index on the key.
+KEY_INDEX_DDL = "CREATE UNIQUE INDEX avg_gpa_stats_course_instructor_key ON avg_gpa_stats (course_code, instructor);"
+AVG_COLUMNS = "course_code, instructor, weighted_sum, total_weight, avg_gpa"
+AVG_VALUES = "course_code, instructor, weighted_sum, total_weight, round(weighted_sum / total_weight, 3)"
+
+def totals_sql(source):
+    """weighted_sum/total_weight per normalized (course, instructor) over the gpa_stats-shaped table `source`."""
+    return f"""
+WITH weights AS (
+    SELECT s.semester,
+           coalesce(m.parts[2]::int * 10 + CASE m.parts[1] WHEN 'Spring' THEN 1 WHEN 'Summer' THEN 2 WHEN 'Fall' THEN 3 END, 0)
+               AS weight
+    FROM (SELECT DISTINCT semester FROM {source}) s
+    CROSS JOIN LATERAL (SELECT regexp_match(s.semester, '{SEMESTER_REGEX}') AS parts) m
+)
+SELECT upper(replace(replace(g.course_code, ' ', ''), '-', '')) AS course_code,
+       btrim(g.instructor, E' \\t\\n\\r\\f\\x0b') AS instructor,
+       sum(g.avg_gpa::numeric * w.weight) AS weighted_sum,
+       sum(w.weight) AS total_weight
+FROM {source} g
+JOIN weights w ON w.semester = g.semester
+WHERE g.avg_gpa IS NOT NULL AND g.instructor IS NOT NULL
+GROUP BY 1, 2
+HAVING sum(w.weight) > 0
+"""
+
+AVERAGES_SQL = f"""
+SELECT {AVG_VALUES}
+FROM ({totals_sql("gpa_stats")}) totals
+"""
+# The GROUP BY hashes every (course, instructor) pair; keep it out of temp files.
+REBUILD_WORK_MEM = "64MB"
+
+def _shadow_blockers(cur):
+    """Objects that depend on avg_gpa_stats itself and would break (or block the DROP) after a rename swap."""
+    cur.execute("""
+        SELECT DISTINCT 'view ' || v.oid::regclass::text
+        FROM pg_depend dep
+        JOIN pg_rewrite rw ON rw.oid = dep.objid
+        JOIN pg_class v ON v.oid = rw.ev_class
+        WHERE dep.refobjid = 'avg_gpa_stats'::regclass AND v.oid <> 'avg_gpa_stats'::regclass
+        UNION
+        SELECT 'foreign key ' || conname || ' on ' || conrelid::regclass::text
+        FROM pg_constraint
+        WHERE confrelid = 'avg_gpa_stats'::regclass;
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+def _copy_access_control(cur):
+    """
+    Gives avg_gpa_stats_new the grants, row-level security flags and policies
+    of avg_gpa_stats (LIKE ... INCLUDING ALL copies none of them).
+    """
+    cur.execute("""
+        SELECT CASE WHEN acl.grantee = 0 THEN NULL ELSE pg_get_userbyid(acl.grantee) END,
+               acl.privilege_type, acl.is_grantable
+        FROM pg_class c, aclexplode(c.relacl) acl
+        WHERE c.oid = 'avg_gpa_stats'::regclass AND acl.grantee <> c.relowner;
+    """)
+    for grantee, privilege, grantable in cur.fetchall():
+        cur.execute(sql.SQL("GRANT {} ON avg_gpa_stats_new TO {}{};").format(
+            sql.SQL(privilege), sql.Identifier(grantee) if grantee else sql.SQL("PUBLIC"),
+            sql.SQL(" WITH GRANT OPTION" if grantable else "")))
+
+    cur.execute("SELECT relrowsecurity, relforcerowsecurity FROM pg_class WHERE oid = 'avg_gpa_stats'::regclass;")
+    enabled, forced = cur.fetchone()
+    if enabled:
+        cur.execute("ALTER TABLE avg_gpa_stats_new ENABLE ROW LEVEL SECURITY;")
+    if forced:
+        cur.execute("ALTER TABLE avg_gpa_stats_new FORCE ROW LEVEL SECURITY;")
+
+    cur.execute("""
+        SELECT policyname, permissive, roles, cmd, qual, with_check
+        FROM pg_policies
+        WHERE schemaname = current_schema() AND tablename = 'avg_gpa_stats';
+    """)
+    for name, permissive, roles, cmd, qual, with_check in cur.fetchall():
+        cur.execute(sql.SQL("CREATE POLICY {} ON avg_gpa_stats_new AS {} FOR {} TO {}{}{};").format(
+            sql.Identifier(name), sql.SQL(permissive), sql.SQL(cmd),
+            sql.SQL(", ").join(sql.SQL("PUBLIC") if role == "public" else sql.Identifier(role) for role in roles),
+            sql.SQL(f" USING ({qual})" if qual else ""),
+            sql.SQL(f" WITH CHECK ({with_check})" if with_check else "")))
+
+def _swap_in_shadow(cur):
+    """
+    Renames avg_gpa_stats_new into place and drops the old table. Sequences
+    owned by the old table (serial ids) are handed to the new one first, or
+    the drop would take them along.
+    """
+    cur.execute("ALTER TABLE avg_gpa_stats RENAME TO avg_gpa_stats_old;")
+    cur.execute("ALTER TABLE avg_gpa_stats_new RENAME TO avg_gpa_stats;")
+    cur.execute("""
+        SELECT seq.oid::regclass::text, col.attname
+        FROM pg_depend dep
+        JOIN pg_class seq ON seq.oid = dep.objid AND seq.relkind = 'S'
+        JOIN pg_attribute col ON col.attrelid = dep.refobjid AND col.attnum = dep.refobjsubid
+        WHERE dep.refobjid = 'avg_gpa_stats_old'::regclass AND dep.deptype = 'a';
+    """)
+    for sequence, column in cur.fetchall():
+        cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY avg_gpa_stats.{column};")
+    cur.execute("DROP TABLE avg_gpa_stats_old;")
+
+def _rebuild_in_place(cur):
+    cur.execute("SET LOCAL work_mem = %s;", (REBUILD_WORK_MEM,))
+    cur.execute("DELETE FROM avg_gpa_stats;")
+    cur.execute(f"INSERT INTO avg_gpa_stats ({AVG_COLUMNS}) {AVERAGES_SQL};")
+    return cur.rowcount
+
+def rebuild_avg_gpa_stats(conn, shadow=False):
+    """
+    Recomputes avg_gpa_stats inside Postgres with one INSERT ... SELECT ...
+    GROUP BY (same weighting as populate_avg_gpa_stats) and swaps the result
+    in atomically, so readers never see an empty table.
+
+    By default the old rows are deleted and the new ones inserted in a single
+    transaction; readers keep seeing the old rows until it commits. With
+    shadow=True the rows are built into avg_gpa_stats_new and renamed into
+    place instead, which avoids dead tuples. The new table gets the old one's
+    grants, row-level security settings and policies before the rename;
+    triggers and comments are not carried over. Views or foreign keys that
+    point at avg_gpa_stats would keep pointing at the old table, so the
+    shadow swap refuses to run while any exist. Returns the number of rows written.
+    """
+    ensure_running_totals(conn)
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        if shadow:
+            cur.execute("SET LOCAL work_mem = %s;", (REBUILD_WORK_MEM,))
+            blockers = _shadow_blockers(cur)
+            if blockers:
+                raise Exception(f"--shadow can't swap avg_gpa_stats while these depend on it: {', '.join(blockers)}; "
+                                "rebuild without --shadow instead")
+            cur.execute("DROP TABLE IF EXISTS avg_gpa_stats_new;")
+            cur.execute("CREATE TABLE avg_gpa_stats_new (LIKE avg_gpa_stats INCLUDING ALL);")
+            _copy_access_control(cur)
+            cur.execute(f"INSERT INTO avg_gpa_stats_new ({AVG_COLUMNS}) {AVERAGES_SQL};")
+            rows = cur.rowcount
+            cur.execute("ANALYZE avg_gpa_stats_new;")
+            _swap_in_shadow(cur)
+        else:
+            rows = _rebuild_in_place(cur)
+    conn.commit()
+    print(f"✅ Rebuilt avg_gpa_stats with {rows} rows in {time.perf_counter() - start:.2f}s"
+          f"{' (shadow table swap)' if shadow else ''}.")
+    return rows
+
+# --- Schema ---
+
+def _has_totals_columns(cur):
+    cur.execute("""
+        SELECT count(*) FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'avg_gpa_stats'
+          AND column_name IN ('weighted_sum', 'total_weight');
+    """)
+    return cur.fetchone()[0] == 2
+
+def _has_key_index(cur):
+    """True if some unique index (or constraint) covers exactly (course_code, instructor)."""
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_index i
+            WHERE i.indrelid = 'avg_gpa_stats'::regclass AND i.indisunique
+              AND i.indpred IS NULL AND i.indexprs IS NULL
+              AND (SELECT array_agg(a.attname::text ORDER BY a.attname) FROM pg_attribute a
+                   WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)) = ARRAY['course_code', 'instructor']
+        );
+    """)
+    return cur.fetchone()[0]
+
+def ensure_running_totals(conn):
+    """
+    One-off migration for the running totals, each step in its own short
+    transaction so no rebuild or load ever holds its locks: adds
+    weighted_sum/total_weight and the unique (course_code, instructor) index
+    the delta upsert needs. Only reads the catalogs once both exist.
+
+    If the index can't be built (e.g. duplicate keys left by an older
+    script), a warning is printed and apply_gpa_deltas falls back to full
+    rebuilds, which leave the keys unique for the next attempt.
+    """
+    with conn.cursor() as cur:
+        if not _has_totals_columns(cur):
+            cur.execute(RUNNING_TOTALS_DDL)
+            print("✅ Added weighted_sum/total_weight to avg_gpa_stats.")
+        conn.commit()
+        if _has_key_index(cur):
+            conn.commit()
+            return
+        try:
+            cur.execute(KEY_INDEX_DDL)
+            conn.commit()
+            print("✅ Added a unique (course_code, instructor) index to avg_gpa_stats.")
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"⚠️ Could not add a unique (course_code, instructor) index to avg_gpa_stats: {e}")
+
+# --- Incremental Updates ---
+
+def running_totals_ready(cur):
+    """
+    True when deltas can be applied: every avg_gpa_stats row carries
+    weighted_sum/total_weight and the key has the unique index the upsert needs.
+    """
+    if not _has_totals_columns(cur) or not _has_key_index(cur):
+        return False
+    cur.execute("SELECT NOT EXISTS (SELECT 1 FROM avg_gpa_stats WHERE total_weight IS NULL);")
+    return cur.fetchone()[0]
+
+def apply_gpa_deltas(cur, source):
+    """
+    Folds newly loaded gpa_stats rows (the gpa_stats-shaped table `source`)
+    into avg_gpa_stats: their weighted sums are added to the running totals
+    of the keys they touch, and only those keys are upserted. Runs on the
+    caller's cursor so it commits together with the load.
+
+    Call ensure_running_totals(conn) before the load's transaction starts.
+    Only additions can be applied this way; after rows in gpa_stats are
+    corrected or deleted, run a full rebuild. If avg_gpa_stats has no running
+    totals yet (first run, or after --python) or lacks the unique key index,
+    it is rebuilt in full instead. Returns the number of avg_gpa_stats rows written.
+    """
+    if not _has_totals_columns(cur):
+        raise Exception("avg_gpa_stats has no weighted_sum/total_weight columns; run ensure_running_totals first")
+    if not running_totals_ready(cur):
+        print("⚠️ avg_gpa_stats is missing running totals or its unique key index; rebuilding it from gpa_stats.")
+        return _rebuild_in_place(cur)
+    cur.execute(f"""
+        INSERT INTO avg_gpa_stats AS s ({AVG_COLUMNS})
+        SELECT {AVG_VALUES}
+        FROM ({totals_sql(source)}) delta
+        ON CONFLICT (course_code, instructor) DO UPDATE SET
+            weighted_sum = s.weighted_sum + EXCLUDED.weighted_sum,
+            total_weight = s.total_weight + EXCLUDED.total_weight,
+            avg_gpa = round((s.weighted_sum + EXCLUDED.weighted_sum) / (s.total_weight + EXCLUDED.total_weight), 3);
+    """)
+    return cur.rowcount
+
 # --- Entry Point ---
 if __name__ == "__main__":
-    populate_avg_gpa_stats()
+    parser = argparse.ArgumentParser(description="Recompute avg_gpa_stats from gpa_stats")
+    parser.add_argument("--python", action="store_true",
+                        help="Aggregate in Python and re-insert in batches (the old path)")
+    parser.add_argument("--shadow", action="store_true",
+                        help="Build into avg_gpa_stats_new and rename it into place. Grants, RLS and policies are "
+                             "copied over; refused while views or foreign keys depend on avg_gpa_stats")
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"), help="Postgres DSN (default: DATABASE_URL)")
+    parser.add_argument("--sslmode", default="require", help="e.g. disable for a local Postgres")
+    args = parser.parse_args()
+
+    if args.python:
+        populate_avg_gpa_stats()
+    else:
+        conn = psycopg2.connect(args.dsn, sslmode=args.sslmode)
+        try:
+            rebuild_avg_gpa_stats(conn, shadow=args.shadow)
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ An error occurred: {e}")
+        finally:
+            conn.close()
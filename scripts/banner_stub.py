@@ -0,0 +1,212 @@
+"""
+Local stand-in for the Banner timetable endpoint, for exercising the scrapers
+without hitting selfservice.banner.vt.edu.
+
+POSTs are answered from DIR/<SUBJ>.html (as saved by
+`future_db_insert.py --save-html DIR`). With --synthesize, subjects without a
+saved page get a generated results table instead. --latency and --fail-rate
+simulate a slow or flaky server.
+
+GETs of .../<subj>/ stand in for catalog.vt.edu course-descriptions pages
+(generated, or DIR/catalog/<SUBJ>.html). They carry an ETag and Last-Modified
+and answer matching conditional requests with 304.
+
+    python scripts/banner_stub.py --fixtures /tmp/banner_html --synthesize --latency 0.2 --fail-rate 0.05
+    python scripts/future_db_insert.py --url http://127.0.0.1:8765/ --concurrency 16
+    python scripts/scrape_pre_co_req.py --url http://127.0.0.1:8765/{}/ --cache /tmp/catalog_cache
+"""
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+COLUMNS = ["CRN", "Course", "Title", "Schedule Type", "Modality", "Cr Hrs", "Capacity",
+           "Instructor", "Days", "Begin", "End", "Location", "Exam"]
+
+def render_subject_html(subject, n_sections, seed=0):
+    """A Banner-style results page with n_sections rows of made-up sections."""
+    rng = random.Random(f"{subject}:{seed}")
+    rows = []
+    for i in range(n_sections):
+        number = rng.randint(1, 4) * 1000 + rng.randint(0, 99) * 10 + rng.randint(0, 9)
+        start = rng.choice([480, 570, 660, 750, 840, 930])
+        end = start + rng.choice([50, 75, 150])
+        cells = [
+            f'<a href="#">{10000 + rng.randint(0, 89999)}</a>', f"{subject}-{number}",
+            f"Topics in {subject} {i}", rng.choice(["L", "B", "R"]), "Face-to-Face Instruction",
+            rng.choice(["3", "4", "1-3"]), str(rng.randint(10, 300)),
+            rng.choice(["Staff", f"A {rng.choice(['Smith', 'Lee', 'Patel', 'Garcia'])}"]),
+            rng.choice(["M W F", "T R", "M W"]),
+            f"{(start // 60 - 1) % 12 + 1}:{start % 60:02d}{'AM' if start < 720 else 'PM'}",
+            f"{(end // 60 - 1) % 12 + 1}:{end % 60:02d}{'AM' if end < 720 else 'PM'}",
+            f"{rng.choice(['MCB', 'TORG', 'GBJ', 'SURGE'])} {rng.randint(100, 330)}",
+            f"{rng.randint(1, 20):02d}M",
+        ]
+        rows.append("<tr>" + "".join(f'<td class="deleft">{cell}&nbsp;</td>' for cell in cells) + "</tr>")
+        if rng.random() < 0.1:
+            # Additional meeting times come through as a partial row.
+            rows.append('<tr><td class="deleft" colspan="5">&nbsp;</td><td>* Additional Times *</td>'
+                        '<td>M</td><td>7:00PM</td><td>8:15PM</td><td>MCB 100</td></tr>')
+    header = "<tr>" + "".join(f'<td class="deheader">{c}</td>' for c in COLUMNS) + "</tr>"
+    return (
+        "<html><head><title>Timetable of Classes</title></head><body>"
+        '<form><table class="plaintable"><tr><td>Search again</td></tr></table></form>'
+        f'<table class="dataentrytable">{header}{"".join(rows)}</table>'
+        "</body></html>"
+    )
+
+COMMON_NUMBERS = ["004", "014", "054", "064", "105", "106", "114", "205", "225", "226", "505", "574"]
+
+def _course_link(code):
+    return (f'<a href="/search/?P={code.replace(" ", "%20")}" title="{code}" class="bubblelink code" '
+            f'onclick="return showCourse(this, \'{code}\');">{code}</a>')
+
+def _requisite_html(rng, subject, depth=0):
+    """A catalog-style requisite expression: linked course codes joined by and/or, sometimes parenthesized."""
+    terms = []
+    for _ in range(rng.randint(1, 3)):
+        if depth < 1 and rng.random() < 0.2:
+            terms.append(f"({_requisite_html(rng, subject, depth + 1)})")
+        else:
+            # Requisites keep pointing at the same few gateway courses, as in the real catalog.
+            code = f"{rng.choice([subject, subject, 'MATH', 'ENGL', 'CHEM'])} {rng.randint(1, 4)}{rng.choice(COMMON_NUMBERS)}"
+            terms.append(_course_link(code))
+    return f" {rng.choice(['or', 'and'])} ".join(terms)
+
+def render_catalog_html(subject, n_courses, seed=0):
+    """A catalog course-descriptions page with n_courses made-up course blocks."""
+    rng = random.Random(f"catalog:{subject}:{seed}")
+    blocks = []
+    for i in range(n_courses):
+        code = f"{subject}&#160;{rng.randint(1, 4)}{rng.randint(0, 99):02d}{rng.randint(0, 9)}"
+        extra = []
+        if rng.random() < 0.7:
+            extra.append('<span class="text detail-prereq margin--default"><strong>Prerequisite(s):</strong> '
+                         f'{_requisite_html(rng, subject)}</span>')
+        if rng.random() < 0.15:
+            extra.append('<span class="text detail-coreq margin--default"><strong>Corequisite(s):</strong> '
+                         f'{_requisite_html(rng, subject)}</span>')
+        blocks.append(
+            '<div class="courseblock">'
+            '<div class="cols noindent">'
+            f'<span class="text courseblockcode detail-code margin--tiny text--semibold text--big"><strong>{code}</strong></span> '
+            f'<span class="text courseblocktitle detail-title margin--tiny text--semibold text--big"><strong>Topics in {subject} {i}</strong></span> '
+            f'<span class="text detail-hours_html margin--tiny text--semibold text--big"><strong>({rng.choice([1, 3, 4])} credits)</strong></span>'
+            '</div>'
+            f'<div class="courseblockextra noindent">{"Lorem ipsum dolor sit amet. " * rng.randint(2, 8)}</div>'
+            f'<div class="noindent courseblockextra">{"".join(extra)}</div>'
+            '</div>'
+        )
+    return (
+        f"<!doctype html><html lang=\"en\"><head><title>{subject} Courses | Catalog</title>"
+        "<script>function showCourse(){ return false; }</script></head><body>"
+        '<nav id="sidebar"><ul><li><a href="/undergraduate/">Undergraduate</a></li></ul></nav>'
+        f'<main><h1 class="page-title">{subject}</h1><div class="sc_sccoursedescs">{"".join(blocks)}</div></main>'
+        "</body></html>"
+    )
+
+NO_RESULTS = "<html><body><p>NO SECTIONS FOUND FOR THIS INQUIRY.</p></body></html>"
+
+def make_handler(fixtures, synthesize, latency, fail_rate, stats):
+    last_modified = formatdate(time.time(), usegmt=True)
+
+    class BannerHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+
+        def _start(self):
+            """Counts the request and simulates latency; False if it should fail with a 503."""
+            with stats["lock"]:
+                stats["requests"] += 1
+            if latency:
+                time.sleep(random.uniform(0.5, 1.5) * latency)
+            if random.random() < fail_rate:
+                self._reply(503, "Service Unavailable")
+                return False
+            return True
+
+        def do_GET(self):
+            subject = self.path.split("?")[0].strip("/").split("/")[-1].upper()
+            if not self._start():
+                return
+            path = os.path.join(fixtures, "catalog", f"{subject}.html") if fixtures else None
+            if path and os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    body = f.read()
+            elif synthesize and subject:
+                body = render_catalog_html(subject, random.Random(subject).randint(5, 150))
+            else:
+                self._reply(404, "Not Found")
+                return
+            etag = f'"{hashlib.md5(body.encode("utf-8")).hexdigest()}"'
+            headers = {"ETag": etag, "Last-Modified": last_modified}
+            if_none_match = self.headers.get("If-None-Match")
+            if (if_none_match == etag) or (if_none_match is None and self.headers.get("If-Modified-Since") == last_modified):
+                with stats["lock"]:
+                    stats["not_modified"] += 1
+                self._reply(304, "", headers)
+                return
+            self._reply(200, body, headers)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode("utf-8"))
+            subject = form.get("subj_code", [""])[0].upper()
+            if not self._start():
+                return
+
+            path = os.path.join(fixtures, f"{subject}.html") if fixtures else None
+            if path and os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    body = f.read()
+            elif synthesize and subject:
+                body = render_subject_html(subject, random.Random(subject).randint(5, 400))
+            else:
+                body = NO_RESULTS
+            self._reply(200, body)
+
+        def _reply(self, status, body, headers=None):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            if status != 304:
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return BannerHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay saved Banner timetable pages over HTTP")
+    parser.add_argument("--fixtures", help="Directory of <SUBJ>.html pages")
+    parser.add_argument("--synthesize", action="store_true", help="Generate pages for subjects without a fixture")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean seconds to wait before answering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    args = parser.parse_args()
+
+    stats = {"requests": 0, "not_modified": 0, "lock": threading.Lock()}
+    handler = make_handler(args.fixtures, args.synthesize, args.latency, args.fail_rate, stats)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"🧪 Banner stub on http://{args.host}:{args.port}/ (fixtures: {args.fixtures or 'none'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {stats['requests']} requests ({stats['not_modified']} not modified)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+"""
+Synthetic DARS corpus, benchmark and regression checks for dars_parser.
+
+Generate a corpus (plain-text dumps like plumber_output.txt, matching PDFs and
+the expected parse of each audit), then benchmark or check the parser on it:
+    python scripts/dars_bench.py generate --out /tmp/dars_corpus --audits 20 --requirements 40
+    python scripts/dars_bench.py bench --corpus /tmp/dars_corpus
+    python scripts/dars_bench.py check --corpus /tmp/dars_corpus --golden /tmp/dars_golden --update
+    python scripts/dars_bench.py check --corpus /tmp/dars_corpus --golden /tmp/dars_golden
+
+The expected output records what the generator put in each audit (student info,
+course rows, hours and SELECT FROM / NOT FROM tokens); requirement headings are
+heuristic, so only the golden snapshots cover them.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from dars_parser import (
+    extract_pages, load_pages, parse_dars_file, parse_dars_pages, save_lines, LINES_SUFFIX
+)
+
+SUBJECTS = ["CS", "MATH", "STAT", "ECE", "PHYS", "CHEM", "ENGL", "HIST", "ECON", "PSYC",
+            "CMDA", "ISE", "ME", "AOE", "GEOS", "PHIL", "COMM", "ENGE", "BIT", "STS"]
+TERMS = ["21FA", "22SP", "22FA", "23SP", "23FA", "24SP", "24SU", "24FA"]
+GRADES = ["A", "A", "B", "B", "C", "D", "P"]
+TITLES = ["Intro to Software Design", "Data Structures", "General Chemistry", "Public Speaking",
+          "Calculus of a Single Variable", "First-Year Writing", "Principles of Economics",
+          "Statistics for Engr", "Foundations of Physics", "Design Appreciation"]
+SCHOOLS = ["Northern Va Cmty C", "Univ of Maryland,", "Southwest Virginia", "Advanced Placement"]
+AREAS = ["COMPUTER SCIENCE DEGREE CORE", "CS THEORY ELECTIVE", "CS CAPSTONE", "PROFESSIONAL WRITING ELECTIVE",
+         "ADVANCED NATURAL SCIENCE ELECTIVE", "STATISTICS ELECTIVE", "MATHEMATICS REQUIREMENT",
+         "NON-TECHNICAL ELECTIVE", "CS TECHNICAL ELECTIVE", "FOUNDATIONS REQUIREMENT"]
+
+PRINT_HEADER = "4/1/25, 5:16 PM My Audit - Audit Results Tab"
+PRINT_FOOTER = ("https://uachieve.es.cloud.vt.edu/selfservice/audit/read.html?printerFriendly=true"
+                "&id=JobQueueRun!!!!ISEhIWludFNlcU5vPTkzNDc2NTQ0 {page}/{pages}")
+DISCLAIMER = [
+    "This report has been prepared to assist in planning your",
+    "academic program. While every effort has been made to ensure its",
+    "accuracy, input or data errors may occur. This report reflects",
+    "current information as of the date it was produced.",
+    "THE RESPONSIBLITY FOR VERFICATION OF INFORMATION AND COMPLETION OF DEGREE REQUIREMENTS RESTS WITH YOU.",
+]
+
+# --- Synthetic Audits ---
+
+class AuditBuilder:
+    """Accumulates the lines of one audit together with what parse_dars should find in them."""
+
+    def __init__(self):
+        self.blocks = []          # lists of lines that must stay on one page
+        self.completed = {}       # course_id -> entry, in first-seen order
+        self.in_progress = {}
+        self.requirements = []
+
+    def block(self, lines):
+        self.blocks.append(lines)
+
+    def course_row(self, course, term, credits, status, title):
+        """One transcript row; mirrors parse_dars's rule for which repeated row wins."""
+        subject, number = course
+        cid = f"{subject}{number}"
+        # Grades outside IP/TR/AP/A-F (e.g. P) are not captured and read as "Completed".
+        parsed = status if status in ("IP", "TR", "AP") or status in "ABCDEF" else None
+        entry = {"course_id": cid, "credits": credits,
+                 "status": "In-Progress" if parsed == "IP" else (parsed or "Completed")}
+        if parsed == "IP":
+            self.in_progress[cid] = entry
+        else:
+            old = self.completed.get(cid)
+            if old is None or (parsed and len(parsed) == 1) or (parsed == "AP" and old["status"] == "TR"):
+                self.completed[cid] = entry
+        suffix = " >D" if credits == "0.0" else ""
+        return f"{term} {subject} {number} {credits} {status}{suffix} {title}"
+
+    def pages(self, lines_per_page=55):
+        """Lays the blocks out on pages with the browser print header/footer on each."""
+        pages, current = [], [PRINT_HEADER]
+        for lines in self.blocks:
+            if len(current) + len(lines) > lines_per_page and len(current) > 1:
+                pages.append(current)
+                current = [PRINT_HEADER]
+            current.extend(lines)
+        pages.append(current)
+        for n, page in enumerate(pages, start=1):
+            page.append(PRINT_FOOTER.format(page=n, pages=len(pages)))
+        return pages
+
+    def expected(self, student_info):
+        return {
+            "student_info": student_info,
+            "completed_courses": list(self.completed.values()),
+            "in_progress_courses": list(self.in_progress.values()),
+            "requirements_needed": self.requirements
+        }
+
+def _course_list(rng, n_groups, wildcards):
+    """
+    A SELECT FROM / NOT FROM list such as 'CS 4104,4114 MATH 4***', wrapped
+    the way DARS wraps it (continuation lines start with a subject).
+    Returns (lines, tokens as parse_course_tokens reports them).
+    """
+    parts, tokens = [], set()
+    for subject in rng.sample(SUBJECTS, n_groups):
+        numbers = []
+        for _ in range(rng.randint(1, 4)):
+            if wildcards and rng.random() < 0.3:
+                digit = rng.randint(3, 5)
+                numbers.append(f"{digit}***")
+                tokens.add(f"{subject}{digit}***")
+            else:
+                number = rng.randint(1, 4) * 1000 + rng.randint(0, 99) * 10 + 4
+                numbers.append(str(number))
+                tokens.add(f"{subject}{number}")
+        parts.append(f"{subject} {','.join(dict.fromkeys(numbers))}")
+    lines, line = [], ""
+    for part in parts:
+        if line and len(line) + len(part) > 70:
+            lines.append(line)
+            line = part
+        else:
+            line = f"{line} {part}".strip()
+    lines.append(line)
+    return lines, sorted(tokens)
+
+def synthetic_audit(seed=0, requirements=20, or_merges=4, wildcards=0.3, transfer_rows=10, completed_rows=30):
+    """
+    Builds one DARS audit shaped like plumber_output.txt.
+
+    Returns (pages, expected): pages is a list of pages of text lines, expected
+    the parse_dars output the generator knows to be right.
+    """
+    rng = random.Random(seed)
+    audit = AuditBuilder()
+    last, first = rng.choice(["Smith", "Nguyen", "Patel", "Garcia"]), rng.choice(["Alex", "Sam", "Jordan"])
+    student_info = {"student_id": str(rng.randint(900000000, 999999999)),
+                    "name": f"{last}, {first}", "program": "Computer Science"}
+    audit.block([
+        student_info["name"],
+        student_info["program"],
+        "Prepared On 04/01/2025 05 13 PM Program BSCS CS Catalog Year Fall 2024",
+        "Code",
+        f"Student ID {student_info['student_id']} Graduation 05/13/26 Job ID {rng.randint(10**15, 10**16 - 1)}",
+        "Date",
+        "Open All Sections Close All Sections",
+    ] + DISCLAIMER + ["------> AT LEAST ONE REQUIREMENT HAS NOT BEEN SATISFIED <------"])
+
+    courses = list(dict.fromkeys(
+        (rng.choice(SUBJECTS), str(rng.randint(1, 4) * 1000 + rng.randint(0, 99) * 10 + 5))
+        for _ in range(transfer_rows + completed_rows + 5)
+    ))
+    rng.shuffle(courses)
+    transfers, taken, current = courses[:transfer_rows], courses[transfer_rows:-5], courses[-5:]
+
+    lines = ["TRANSFER CREDIT LIMIT CHECK - NO MORE THAN 50 PERCENT OF",
+             "THE CREDITS REQUIRED FOR GRADUATION MAY BE TRANSFERRED", "FROM TWO-YEAR COLLEGES"]
+    for course in transfers:
+        credits = rng.choice(["3.0", "3.0", "4.0", "1.0", "0.0"])
+        lines.append(audit.course_row(course, rng.choice(TERMS), credits, "TR", rng.choice(TITLES)))
+        lines.append(f"{course[0][:3]}{rng.randint(100, 299)} {rng.choice(SCHOOLS)}")
+    audit.block(lines)
+
+    # Requirements that are already met: a heading, a summary and the rows that satisfied them.
+    done = [(course, rng.choice(["A", "B", "C"])) for course in taken]
+    done += [(course, rng.choice(["TR", "AP"])) for course in rng.sample(transfers, min(3, len(transfers)))]
+    done += [(course, "IP") for course in current]
+    rng.shuffle(done)
+    while done:
+        size = rng.randint(1, 4)
+        chunk, done = done[:size], done[size:]
+        lines = [f"{rng.choice(AREAS)} COMPLETED", f"{len(chunk) * 3}.00 HOURS ADDED {len(chunk)} COURSES TAKEN"]
+        for course, status in chunk:
+            grade = status if status in ("TR", "AP", "IP") else rng.choice(GRADES)
+            lines.append(audit.course_row(course, rng.choice(TERMS), rng.choice(["3.0", "4.0"]), grade,
+                                          rng.choice(TITLES)))
+        audit.block(lines)
+
+    # Requirements still needed, with OR) alternatives merged into the block above them.
+    merges = set(rng.sample(range(requirements), min(or_merges, requirements)))
+    for i in range(requirements):
+        area = rng.choice(AREAS)
+        hours = rng.choice(["3.00", "4.00", "6.00"])
+        lines = [f"{i % 9 + 1}) {area} - COMPLETE ONE OF THE FOLLOWING", f"NEEDS: {hours} HOURS 1 COURSE"]
+        req = {"requirement_description": f"NEEDS: {hours} HOURS 1 COURSE", "hours_needed": hours,
+               "select_from": [], "not_from": []}
+        if rng.random() < 0.25:
+            not_lines, not_tokens = _course_list(rng, rng.randint(1, 2), False)
+            lines.append(f"-> NOT FROM: {not_lines[0]}")
+            lines.extend(not_lines[1:])
+            req["not_from"].extend(not_tokens)
+        select_lines, select_tokens = _course_list(rng, rng.randint(1, 5), rng.random() < wildcards)
+        lines.append(f"SELECT FROM: {select_lines[0]}")
+        lines.extend(select_lines[1:])
+        req["select_from"].extend(select_tokens)
+        if i in merges:
+            alt_lines, alt_tokens = _course_list(rng, rng.randint(1, 3), False)
+            lines += [f"OR) {rng.choice(AREAS)} - COMPLETE ONE COURSE", "NEEDS: 3.00 HOURS 1 COURSE",
+                      f"SELECT FROM: {alt_lines[0]}"] + alt_lines[1:]
+            req["select_from"].extend(alt_tokens)
+        audit.requirements.append(req)
+        audit.block([area] + lines)
+
+    return audit.pages(), audit.expected(student_info)
+
+# --- Minimal PDF Writer ---
+
+def _pdf_string(text):
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+def write_pdf(pages, path, font_size=8, leading=11):
+    """Writes pages of text lines as a letter-size PDF, one text line per baseline."""
+    objects = [None, None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in pages:
+        ops = [f"BT /F1 {font_size} Tf {leading} TL 30 760 Td"]
+        ops += [f"{_pdf_string(line)} Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[0] = "<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{n} 0 R' for n in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        body = obj if isinstance(obj, bytes) else obj.encode("latin-1")
+        out += b"%d 0 obj\n" % n + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+def generate(args):
+    os.makedirs(args.out, exist_ok=True)
+    start = time.perf_counter()
+    total_pages = 0
+    for n in range(args.audits):
+        pages, expected = synthetic_audit(
+            seed=args.seed + n, requirements=args.requirements, or_merges=args.or_merges,
+            wildcards=args.wildcards, transfer_rows=args.transfers
+        )
+        base = os.path.join(args.out, f"audit_{n:04d}")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for page in pages for line in page))
+        if not args.no_pdf:
+            write_pdf(pages, base + ".pdf")
+        with open(base + ".expected.json", "w", encoding="utf-8") as f:
+            json.dump(expected, f, indent=2)
+        total_pages += len(pages)
+    print(f"✅ Wrote {args.audits} audits ({total_pages} pages) to {args.out} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+# --- Benchmarks ---
+
+def _corpus(path, suffix):
+    return sorted(glob.glob(os.path.join(path, f"*{suffix}")))
+
+def _stage_extract(paths, layout):
+    lines = pages = 0
+    for path in paths:
+        extracted = extract_pages(path, layout=layout)
+        pages += len(extracted)
+        lines += sum(map(len, extracted))
+    return lines, pages
+
+def _stage_parse(paths):
+    lines = pages = 0
+    for path in paths:
+        extracted = load_pages(path)
+        pages += len(extracted)
+        lines += sum(map(len, extracted))
+        parse_dars_pages(extracted)
+    return lines, pages
+
+def _stage_end_to_end(paths, layout):
+    lines = pages = 0
+    for path in paths:
+        extracted = extract_pages(path, layout=layout)
+        pages += len(extracted)
+        lines += sum(map(len, extracted))
+        parse_dars_pages(extracted)
+    return lines, pages
+
+STAGES = {
+    "extract": lambda paths: _stage_extract(paths, False),
+    "extract-layout": lambda paths: _stage_extract(paths, True),
+    "parse": _stage_parse,
+    "end-to-end": lambda paths: _stage_end_to_end(paths, False),
+}
+
+def _run_stage(stage, paths, trace=False):
+    """
+    Runs one stage in a fresh worker. With trace=True the stage runs under
+    tracemalloc and the peak is what the stage itself allocated (imports and
+    the worker's startup excluded); the timing of a traced run is not used.
+    """
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    lines, pages = STAGES[stage](paths)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return lines, pages, elapsed, peak
+
+def _artifacts(pdfs, lines_dir):
+    """Stage 1 output for the parse-only stage, written once per corpus."""
+    os.makedirs(lines_dir, exist_ok=True)
+    paths = []
+    for pdf in pdfs:
+        path = os.path.join(lines_dir, os.path.basename(pdf)[:-4] + LINES_SUFFIX)
+        if not os.path.exists(path):
+            save_lines(extract_pages(pdf), path)
+        paths.append(path)
+    return paths
+
+def bench(args):
+    pdfs = _corpus(args.corpus, ".pdf")
+    if not pdfs:
+        sys.exit(f"❌ No PDFs in {args.corpus}; run `generate` first")
+    inputs = {"parse": _artifacts(pdfs, os.path.join(args.corpus, "lines"))}
+    stages = args.stages.split(",") if args.stages else list(STAGES)
+
+    print(f"📄 {len(pdfs)} audits from {args.corpus}")
+    ctx = multiprocessing.get_context("spawn")
+    for stage in stages:
+        paths = inputs.get(stage, pdfs)
+        best = None
+        # Timed runs first, then one traced run for memory (tracemalloc slows the stage down).
+        for trace in [False] * args.repeat + [True]:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                run = pool.submit(_run_stage, stage, paths, trace).result()
+            if trace:
+                peak = run[3]
+            elif best is None or run[2] < best[2]:
+                best = run
+        lines, pages, elapsed, _ = best
+        print(f"  {stage:15s} {elapsed:8.3f}s  {lines / elapsed:12,.0f} lines/s  {pages / elapsed:9,.1f} pages/s  "
+              f"peak {peak / 1024 / 1024:7.2f} MiB allocated")
+
+# --- Regression Checks ---
+
+def _diff(expected, actual, path=""):
+    """First few places two parse results differ, as 'path: expected != actual'."""
+    if type(expected) != type(actual):
+        return [f"{path}: {expected!r} != {actual!r}"]
+    if isinstance(expected, dict):
+        problems = []
+        for key in expected.keys() | actual.keys():
+            problems += _diff(expected.get(key), actual.get(key), f"{path}.{key}")
+        return problems
+    if isinstance(expected, list):
+        problems = [f"{path}: {len(expected)} items != {len(actual)}"] if len(expected) != len(actual) else []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            problems += _diff(e, a, f"{path}[{i}]")
+        return problems
+    return [] if expected == actual else [f"{path}: {expected!r} != {actual!r}"]
+
+def _without_headings(result):
+    """Drops requirement_type, which the generator does not predict."""
+    trimmed = dict(result)
+    trimmed["requirements_needed"] = [
+        {k: v for k, v in req.items() if k != "requirement_type"} for req in result["requirements_needed"]
+    ]
+    return trimmed
+
+def check(args):
+    inputs = _corpus(args.corpus, ".txt") + _corpus(args.corpus, ".pdf")
+    if not inputs:
+        sys.exit(f"❌ No audits in {args.corpus}; run `generate` first")
+    if args.golden:
+        os.makedirs(args.golden, exist_ok=True)
+    failures = 0
+    for path in inputs:
+        result = parse_dars_file(path, layout=args.layout)
+        base = os.path.splitext(path)[0]
+        problems = []
+
+        if os.path.exists(base + ".expected.json"):
+            with open(base + ".expected.json", "r", encoding="utf-8") as f:
+                problems += _diff(json.load(f), _without_headings(result))
+        if args.golden:
+            golden_path = os.path.join(args.golden, os.path.basename(path) + ".json")
+            if args.update or not os.path.exists(golden_path):
+                with open(golden_path, "w", encoding="utf-8") as f:
+                    json.dump(result, f, indent=2)
+            else:
+                with open(golden_path, "r", encoding="utf-8") as f:
+                    problems += [f"golden {p}" for p in _diff(json.load(f), result)]
+
+        if problems:
+            failures += 1
+            print(f"❌ {path}")
+            for problem in problems[:5]:
+                print(f"     {problem}")
+    print(f"{'✅' if not failures else '❌'} {len(inputs) - failures}/{len(inputs)} audits match")
+    if failures:
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic DARS corpus, parser benchmark and regression checks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("generate", help="Write synthetic audits (.txt, .pdf) with their expected parse")
+    p.add_argument("--out", required=True)
+    p.add_argument("--audits", type=int, default=10)
+    p.add_argument("--requirements", type=int, default=20, help="Unmet requirements per audit")
+    p.add_argument("--or-merges", type=int, default=4, help="Requirements with an OR) alternative")
+    p.add_argument("--wildcards", type=float, default=0.3, help="Share of SELECT FROM lists with wildcards")
+    p.add_argument("--transfers", type=int, default=10, help="Transfer credit rows per audit")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--no-pdf", action="store_true", help="Only write the text dumps")
+    p.set_defaults(func=generate)
+
+    p = sub.add_parser("bench", help="lines/s, pages/s and peak allocation for each parser stage")
+    p.add_argument("--corpus", required=True)
+    p.add_argument("--stages", help=f"Comma-separated subset of {','.join(STAGES)}")
+    p.add_argument("--repeat", type=int, default=3, help="Report the best of this many runs")
+    p.set_defaults(func=bench)
+
+    p = sub.add_parser("check", help="Compare parser output with the expected parse and golden snapshots")
+    p.add_argument("--corpus", required=True)
+    p.add_argument("--golden", help="Directory of golden outputs (written on first use)")
+    p.add_argument("--update", action="store_true", help="Overwrite the golden outputs with the current parse")
+    p.add_argument("--layout", action="store_true", help="Check the layout-aware extraction")
+    p.set_defaults(func=check)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
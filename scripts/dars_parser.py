@@ -2,6 +2,15 @@ import pdfplumber
 import re
 import json
 import argparse
+import glob
+import gzip
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 ###############################################################################
 #                         HEADING & SKIP PATTERNS                              #
@@ -13,62 +22,86 @@ HEADING_KEYWORDS = [
     "non-technical", "with grade c", "degree", "english requirement", "core"
 ]
 
+# Noise lines (e.g. hours added, awarded, URLs). Plain substrings are checked
+# with `in`; only lines mentioning "ours" need the regex.
+SKIP_SUBSTRINGS = ("completed", "awarded:", "sub-group", "http://", "https://", "courses taken")
+SKIP_HOURS_RE = re.compile(r"h.ours added|\d+\.00\s+h.ours")  # e.g. "6.00 HOURS"
+
+ASCII_LETTERS = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+ASCII_UPPER = b"ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+def _upper_ratio(line):
+    """Share of letters in line that are uppercase (None if it has no letters)."""
+    if line.isascii():
+        raw = line.encode("ascii")
+        alpha_count = len(raw) - len(raw.translate(None, ASCII_LETTERS))
+        upper_count = len(raw) - len(raw.translate(None, ASCII_UPPER))
+    else:
+        alpha_count = sum(map(str.isalpha, line))
+        upper_count = sum(map(str.isupper, filter(str.isalpha, line)))
+    return upper_count / alpha_count if alpha_count else None
+
 def is_heading_candidate(line: str) -> bool:
     """Returns True if the line is likely a heading."""
     lower = line.lower()
     for kw in HEADING_KEYWORDS:
         if kw in lower:
             return True
-    alpha_chars = [ch for ch in line if ch.isalpha()]
-    if alpha_chars:
-        ratio = sum(ch.isupper() for ch in alpha_chars) / len(alpha_chars)
-        if ratio >= 0.6 and len(line.strip()) >= 5:
-            return True
+    ratio = _upper_ratio(line)
+    if ratio is not None and ratio >= 0.6 and len(line.strip()) >= 5:
+        return True
     return False
 
 def should_skip_heading_line(line: str) -> bool:
     """Skips lines that are clearly noise (e.g. hours added, awarded, URLs)."""
     lower = line.lower()
-    skip_patterns = [
-        r"completed",
-        r"awarded:",
-        r"h.ours added",
-        r"sub-group",
-        r"\d+\.00\s+h.ours",  # e.g. "6.00 HOURS"
-        r"https?://",
-        r"courses taken",
-        r"^\s*$"
-    ]
-    for pat in skip_patterns:
-        if re.search(pat, lower):
+    if not lower.strip():
+        return True
+    for kw in SKIP_SUBSTRINGS:
+        if kw in lower:
             return True
-    return False
+    return "ours" in lower and SKIP_HOURS_RE.search(lower) is not None
+
+DOUBLE_DASH_RE = re.compile(r"\s*-\s*-\s*")
+WHITESPACE_RE = re.compile(r"\s+")
 
 def gather_heading_for_needs(all_lines, needs_idx, lookback=10):
     """
     Looks up to `lookback` lines above the NEEDS line and collects those that
     are heading candidates (and not skip-worthy). Joined by ' - '.
+    all_lines is a list of DarsLine (see classify_lines).
     """
     start_line = max(0, needs_idx - lookback)
     heading_lines = []
     for i in range(needs_idx-1, start_line-1, -1):
-        line = all_lines[i].strip()
+        info = all_lines[i]
         # Stop if we hit another NEEDS line
-        if line.upper().startswith("NEEDS:"):
+        if info.tag == NEEDS:
             break
-        if is_heading_candidate(line) and not should_skip_heading_line(line):
-            heading_lines.append(line)
+        if info.heading:
+            heading_lines.append(info.text)
     if heading_lines:
         heading_lines.reverse()
         joined = " - ".join(heading_lines)
-        joined = re.sub(r"\s*-\s*-\s*", " - ", joined)
-        return re.sub(r"\s+", " ", joined).strip()
+        joined = DOUBLE_DASH_RE.sub(" - ", joined)
+        return WHITESPACE_RE.sub(" ", joined).strip()
     return ""  # return empty string if nothing found
 
 ###############################################################################
 #                          COURSE TOKEN PARSING                                #
 ###############################################################################
 
+ALPHA_RE = re.compile(r'[A-Z]', re.IGNORECASE)
+SUBJECT_NUMBER_RE = re.compile(r'^[A-Z]{2,4}\d', re.IGNORECASE)
+SUBJECT_ONLY_RE = re.compile(r'^[A-Z]{2,4}$', re.IGNORECASE)
+DIGIT_START_RE = re.compile(r'^\d')
+NUMBER_WILDCARD_RE = re.compile(r'^\d\*+$')
+FOUR_DIGITS_RE = re.compile(r'^\d{4}$')
+COURSE_LINE_RE = re.compile(r"[A-Z]{2,4}\s*\d{3,4}|\d\*+")
+BOUNDARY_PREFIX_RE = re.compile(
+    r"NEEDS:|OR\)|NOT FROM:|SELECT FROM:|AWARDED:|COURSES TAKEN|UNDERGRADUATE CREDIT SUMMARY|END OF ANALYSIS"
+)
+
 def parse_course_tokens(lines, last_subject=None):
     """
     Parse course tokens from one or more lines. Handles comma‐separated tokens,
@@ -85,23 +118,23 @@ def parse_course_tokens(lines, last_subject=None):
     i = 0
     while i < len(parts):
         part = parts[i]
-        if re.search(r'[A-Z]', part, re.IGNORECASE):
-            if re.match(r'^[A-Z]{2,4}\d', part, re.IGNORECASE):
+        if ALPHA_RE.search(part):
+            if SUBJECT_NUMBER_RE.match(part):
                 all_tokens.add(part.replace(' ', ''))
                 current_subject = ''.join(filter(str.isalpha, part))
-            elif re.match(r'^[A-Z]{2,4}$', part, re.IGNORECASE):
+            elif SUBJECT_ONLY_RE.match(part):
                 current_subject = part
                 if i + 1 < len(parts):
                     next_part = parts[i + 1]
-                    if re.match(r'^\d', next_part):
+                    if DIGIT_START_RE.match(next_part):
                         all_tokens.add(current_subject + next_part.replace(' ', ''))
                         i += 1
             else:
                 all_tokens.add(part.replace(' ', ''))
         elif current_subject:
-            if re.match(r'^\d\*+$', part):
+            if NUMBER_WILDCARD_RE.match(part):
                 all_tokens.add(current_subject + part.replace(' ', ''))
-            elif re.match(r'^\d{4}$', part):
+            elif FOUR_DIGITS_RE.match(part):
                 all_tokens.add(current_subject + part.replace(' ', ''))
         i += 1
 
@@ -117,7 +150,7 @@ def parse_course_tokens(lines, last_subject=None):
 
 def is_possible_course_line(line: str) -> bool:
     """Return True if the line appears to contain course tokens."""
-    return re.search(r"[A-Z]{2,4}\s*\d{3,4}|\d\*+", line) is not None
+    return COURSE_LINE_RE.search(line) is not None
 
 def is_block_boundary(line: str) -> bool:
     """
@@ -125,205 +158,710 @@ def is_block_boundary(line: str) -> bool:
     A line is a boundary if it starts with known keywords (NEEDS:, OR), NOT FROM:, etc.)
     unless it also appears to contain course tokens.
     """
-    up = line.upper()
-    boundary_keywords = [
-        "NEEDS:", "OR)", "NOT FROM:", "SELECT FROM:", "AWARDED:", "COURSES TAKEN",
-        "UNDERGRADUATE CREDIT SUMMARY", "END OF ANALYSIS"
-    ]
-    for kw in boundary_keywords:
-        if up.startswith(kw):
-            # If the line does not look like it contains course tokens, it's a boundary.
-            if not is_possible_course_line(line):
-                return True
-    return False
+    # If the line does not look like it contains course tokens, it's a boundary.
+    return BOUNDARY_PREFIX_RE.match(line.upper()) is not None and not is_possible_course_line(line)
+
+###############################################################################
+#                          SINGLE-PASS LINE CLASSIFIER                         #
+###############################################################################
+
+# Line tags. The first four drive the requirement state machine.
+OR_LINE = "OR"
+NEEDS = "NEEDS"
+SELECT_FROM = "SELECT_FROM"
+NOT_FROM = "NOT_FROM"
+COURSE_ROW = "COURSE_ROW"
+OTHER = "OTHER"
+
+COURSE_ROW_RE = re.compile(r"([A-Z]{2,4}\s?\d{4})\s+([\d.]+)\s+(IP|TR|AP|[A-F])?.*")
+LINE_START_RE = re.compile(r"OR\)|NEEDS:")
+NEEDS_HOURS_RE = re.compile(r"NEEDS:\s+([\d.]+)\s+HOURS", re.IGNORECASE)
+SELECT_FROM_SPLIT_RE = re.compile(r"SELECT FROM:")
+NOT_FROM_SPLIT_RE = re.compile(r"(?:->\s*)?NOT FROM:")
+
+class DarsLine:
+    """
+    One extracted line, tagged once by classify_lines.
+
+    tag and course_match are set up front. The heading and course-line checks
+    are only needed for the lines around NEEDS / SELECT FROM blocks, so they
+    are computed on first use and cached rather than for every line.
+    """
+    __slots__ = ("text", "upper", "tag", "course_match", "_heading", "_course_line")
+
+    def __init__(self, text):
+        self.text = text
+        self.upper = up = text.upper()
+        self.course_match = COURSE_ROW_RE.search(text)
+        start = LINE_START_RE.match(up)
+        if start:
+            self.tag = OR_LINE if start.group(0) == "OR)" else NEEDS
+        elif "SELECT FROM:" in up:
+            self.tag = SELECT_FROM
+        elif "NOT FROM:" in up:
+            self.tag = NOT_FROM
+        else:
+            self.tag = COURSE_ROW if self.course_match else OTHER
+        self._heading = None
+        self._course_line = None
+
+    @property
+    def heading(self):
+        """Heading candidate that is not a noise line."""
+        if self._heading is None:
+            self._heading = not should_skip_heading_line(self.text) and is_heading_candidate(self.text)
+        return self._heading
+
+    @property
+    def course_line(self):
+        """is_possible_course_line for this line."""
+        if self._course_line is None:
+            self._course_line = COURSE_LINE_RE.search(self.text) is not None
+        return self._course_line
+
+    @property
+    def has_hours(self):
+        return "HOURS" in self.upper
+
+    @property
+    def stops_gather(self):
+        """Ends a multi-line SELECT FROM / NOT FROM list."""
+        return (
+            self.tag in (OR_LINE, NEEDS, SELECT_FROM) or self.upper.startswith("NOT FROM:")
+            or (BOUNDARY_PREFIX_RE.match(self.upper) is not None and not self.course_line)
+        )
+
+def classify_lines(lines):
+    """Tags every extracted line once (see DarsLine)."""
+    return [DarsLine(line) for line in lines]
+
+###############################################################################
+#                          LAYOUT-AWARE EXTRACTION                             #
+###############################################################################
+
+# The browser print header/footer repeated on every page, e.g.
+#   "4/1/25, 5:16 PM My Audit - Audit Results Tab"
+#   "https://uachieve.es.cloud.vt.edu/selfservice/audit/read.html?... 1/8"
+PRINT_HEADER_RE = re.compile(r"^\d{1,2}/\d{1,2}/\d{2}, \d{1,2}:\d{2} [AP]M ")
+PRINT_FOOTER_RE = re.compile(r"^https?://\S+\s+\d+/\d+$")
+# Front-page disclaimer, dropped from the first line through the last.
+DISCLAIMER_START = "This report has been prepared"
+DISCLAIMER_END = "RESTS WITH YOU."
+# A row that starts one of these is never the wrapped tail of the row above it.
+ROW_START_RE = re.compile(r"(?:NEEDS:|OR\)|SELECT FROM:|NOT FROM:|\d+\)|\d{2}(?:FA|SP|SU|WI) )")
+
+ROW_TOLERANCE = 3   # points; words whose tops are this close share a row
+WRAP_SLACK = 15     # points; a row ending this close to the right edge may have wrapped
+
+def _rows(words):
+    """Groups words into rows by y-position, left to right within each row."""
+    rows = []
+    for word in sorted(words, key=lambda w: (round(w["top"]), w["x0"])):
+        if rows and abs(word["top"] - rows[-1][0]["top"]) <= ROW_TOLERANCE:
+            rows[-1].append(word)
+        else:
+            rows.append([word])
+    return [sorted(row, key=lambda w: w["x0"]) for row in rows]
+
+class LayoutExtractor:
+    """
+    Builds DARS lines from pdfplumber word boxes instead of extract_text().
+
+    Rows are grouped by y-position. A row that ends at the right edge of the
+    text, directly followed (no blank gap) by one that doesn't start a new
+    entry, wrapped, and the two are joined back into one line. The print
+    header/footer rows and the front-page disclaimer are dropped, so they
+    never reach the parser or its heading lookback.
+
+    bbox=(x0, top, x1, bottom) restricts extraction to that region of every page.
+    """
+
+    def __init__(self, bbox=None):
+        self.bbox = bbox
+        self.in_disclaimer = False
+        self.disclaimer_done = False
+
+    def page_lines(self, page):
+        if self.bbox is not None:
+            page = page.crop(self.bbox)
+        rows = _rows(page.extract_words())
+        if not rows:
+            return []
+
+        right_edge = max(row[-1]["x1"] for row in rows)
+        lines = []
+        prev = None
+        for row in rows:
+            text = " ".join(w["text"] for w in row)
+            if PRINT_HEADER_RE.match(text) or PRINT_FOOTER_RE.match(text) or self._skip_disclaimer(text):
+                prev = None
+                continue
+            line_height = row[0]["bottom"] - row[0]["top"]
+            wrapped = (
+                prev is not None and prev[-1]["x1"] >= right_edge - WRAP_SLACK
+                and row[0]["top"] - prev[0]["bottom"] < line_height * 0.75
+                and not ROW_START_RE.match(text)
+            )
+            if wrapped:
+                lines[-1] += " " + text
+            else:
+                lines.append(text)
+            prev = row
+        return lines
+
+    def _skip_disclaimer(self, text):
+        if self.disclaimer_done:
+            return False
+        if not self.in_disclaimer and text.startswith(DISCLAIMER_START):
+            self.in_disclaimer = True
+        if self.in_disclaimer:
+            if text.endswith(DISCLAIMER_END):
+                self.in_disclaimer = False
+                self.disclaimer_done = True
+            return True
+        return False
 
 ###############################################################################
 #                          MAIN PARSER WITH "OR)" MERGE                        #
 ###############################################################################
 
-def extract_requirement_type(text_lines, needs_idx):
+STUDENT_ID_RE = re.compile(r"Student ID[:\s]+(\d{9})")
+STUDENT_NAME_RE = re.compile(r"\b[A-Za-z]+,\s*[A-Za-z]+\b")
+HAS_DIGIT_RE = re.compile(r"\d")
+
+def extract_requirement_type(text_lines, needs_idx, lookback=10):
     """
     Attempts to extract the requirement type (the heading) from up to 10 lines above the NEEDS line.
-    Returns the joined heading text.
+    text_lines is a list of DarsLine. Returns the joined heading text.
     """
-    heading = gather_heading_for_needs(text_lines, needs_idx, lookback=10)
+    heading = gather_heading_for_needs(text_lines, needs_idx, lookback=lookback)
     return heading  # do not default to any value if empty
 
-def parse_dars(pdf_path):
-    data = {
-        "student_info": {"student_id": "", "name": "", "program": ""},
-        "completed_courses": [],
-        "in_progress_courses": [],
-        "requirements_needed": []
-    }
-
-    # Step 1: extract text lines from the PDF
-    lines = []
+def iter_pages(pdf_path, page_range=None, layout=False, bbox=None):
+    """
+    Stage 1, one page at a time: yields the non-empty, stripped text lines of
+    each page of a DARS PDF. Each page is closed once its text is extracted.
+    page_range=(start, end) limits extraction to pdf.pages[start:end].
+    layout=True builds the lines from word boxes (see LayoutExtractor),
+    optionally only from the bbox region of each page.
+    """
+    extractor = LayoutExtractor(bbox) if layout else None
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            txt = page.extract_text() or ""
-            for rline in txt.split("\n"):
-                line = rline.strip()
-                if line:
-                    lines.append(line)
+        selected = pdf.pages if page_range is None else pdf.pages[page_range[0]:page_range[1]]
+        for page in selected:
+            if extractor is not None:
+                lines = extractor.page_lines(page)
+            else:
+                txt = page.extract_text() or ""
+                lines = [line for line in (rline.strip() for rline in txt.split("\n")) if line]
+            page.close()
+            yield lines
+
+def extract_pages(pdf_path, page_range=None, layout=False, bbox=None):
+    """iter_pages collected into a list of pages."""
+    return list(iter_pages(pdf_path, page_range, layout, bbox))
+
+def extract_lines(pdf_path, page_range=None, layout=False):
+    """extract_pages flattened into one list of lines."""
+    return [line for page in iter_pages(pdf_path, page_range, layout) for line in page]
+
+class DarsStreamParser:
+    """
+    Parses DARS lines in a single pass as they arrive, without holding the
+    whole audit in memory.
+
+    Only the last `lookback` lines are kept (for the requirement heading, see
+    gather_heading_for_needs); NEEDS lines waiting for their HOURS and open
+    SELECT FROM / NOT FROM lists are carried across page breaks. feed() and
+    close() yield events as soon as they are known:
+
+      ("student_info", {...})   whenever the student info changes
+      ("course", {...})         a course row; a later row for the same
+                                course_id supersedes an earlier one
+      ("requirement", {...})    a requirement block, once no later line can add to it
+      ("done", {...})           from close(): the same dict parse_dars returns
+    """
+
+    def __init__(self, lookback=10):
+        self.student_info = {"student_id": "", "name": "", "program": ""}
+        self.completed_map = {}
+        self.inprogress_map = {}
+        self.requirements = []
+        self.lookback = lookback
+        self.window = deque(maxlen=lookback + 1)
+        self.line_no = 0
+        self.name_line_no = None
+        self.current_req = None
+        self.last_subject = None
+        self.or_mode = False
+        self.needs_text = None   # NEEDS line(s) joined so far, until one mentions HOURS
+        self.gather_tag = None   # SELECT_FROM / NOT_FROM while collecting a token list
+        self.gather_list = []
+
+    def feed(self, lines):
+        """Consumes one page (or any run) of lines."""
+        for text in lines:
+            yield from self._line(DarsLine(text))
+
+    def close(self):
+        """Finishes any open block and yields the remaining events."""
+        if self.needs_text is not None:
+            # The audit ended before a line mentioning HOURS; the last line ends the block.
+            yield from self._end_needs(list(self.window)[:-1])
+        if self.gather_tag is not None:
+            self._end_gather()
+        if self.current_req is not None:
+            yield "requirement", self.current_req
+        yield "done", self.result()
+
+    def result(self):
+        return {
+            "student_info": self.student_info,
+            "completed_courses": list(self.completed_map.values()),
+            "in_progress_courses": list(self.inprogress_map.values()),
+            "requirements_needed": self.requirements
+        }
+
+    def _line(self, info):
+        line_no = self.line_no
+        self.line_no += 1
+        if self._student_info(info.text, line_no):
+            yield "student_info", dict(self.student_info)
+        if info.course_match:
+            entry = self._course_row(info.course_match)
+            if entry:
+                yield "course", entry
+        yield from self._requirement_line(info)
+        self.window.append(info)
 
     # Step 2: parse student info
-    student_name_idx = None
-    for i, line in enumerate(lines):
+    def _student_info(self, line, line_no):
+        info = self.student_info
         if "Student ID" in line:
-            m = re.search(r"Student ID[:\s]+(\d{9})", line)
+            m = STUDENT_ID_RE.search(line)
             if m:
-                data["student_info"]["student_id"] = m.group(1)
-        elif not data["student_info"]["name"] and re.search(r"\b[A-Za-z]+,\s*[A-Za-z]+\b", line):
-            data["student_info"]["name"] = line.strip()
-            student_name_idx = i
-        elif student_name_idx is not None and i == student_name_idx + 1 and not data["student_info"]["program"]:
-            if not re.search(r"\d", line):
-                data["student_info"]["program"] = line.strip()
+                info["student_id"] = m.group(1)
+                return True
+        elif not info["name"] and STUDENT_NAME_RE.search(line):
+            info["name"] = line.strip()
+            self.name_line_no = line_no
+            return True
+        elif self.name_line_no is not None and line_no == self.name_line_no + 1 and not info["program"]:
+            if not HAS_DIGIT_RE.search(line):
+                info["program"] = line.strip()
+                return True
+        return False
 
     # Step 3: parse completed/in-progress courses
-    course_pattern = re.compile(r"([A-Z]{2,4}\s?\d{4})\s+([\d.]+)\s+(IP|TR|AP|[A-F])?.*")
-    completed_map = {}
-    inprogress_map = {}
-    for line in lines:
-        cc = course_pattern.search(line)
-        if cc:
-            cid = cc.group(1).replace(" ", "")
-            credits = cc.group(2)
-            status = cc.group(3)
-            entry = {"course_id": cid, "credits": credits,
-                     "status": "In-Progress" if status == "IP" else (status if status else "Completed")}
-            if status == "IP":
-                inprogress_map[cid] = entry
-            else:
-                old = completed_map.get(cid)
-                if old:
-                    old_status = old["status"]
-                    if (status and len(status) == 1 and status.isalpha()) or (status == "AP" and old_status == "TR"):
-                        completed_map[cid] = entry
-                else:
-                    completed_map[cid] = entry
-
-    data["completed_courses"] = list(completed_map.values())
-    data["in_progress_courses"] = list(inprogress_map.values())
+    def _course_row(self, cc):
+        cid = cc.group(1).replace(" ", "")
+        credits = cc.group(2)
+        status = cc.group(3)
+        entry = {"course_id": cid, "credits": credits,
+                 "status": "In-Progress" if status == "IP" else (status if status else "Completed")}
+        if status == "IP":
+            self.inprogress_map[cid] = entry
+            return entry
+        old = self.completed_map.get(cid)
+        if old:
+            old_status = old["status"]
+            if (status and len(status) == 1 and status.isalpha()) or (status == "AP" and old_status == "TR"):
+                self.completed_map[cid] = entry
+                return entry
+            return None
+        self.completed_map[cid] = entry
+        return entry
 
     # Step 4: parse requirements with merging of OR blocks
-    requirements = []
-    current_req = None
-    last_subject = None
-    or_mode = False
+    def _requirement_line(self, info):
+        line = info.text
 
-    i = 0
-    while i < len(lines):
-        line = lines[i]
+        if self.needs_text is not None:
+            # Join lines until one mentions HOURS.
+            self.needs_text += " " + line
+            if info.has_hours:
+                yield from self._end_needs(list(self.window))
+            return
+
+        if self.gather_tag is not None:
+            if not info.stops_gather and info.course_line:
+                self.gather_list.append(line)
+                return
+            self._end_gather()  # this line is then handled like any other
 
         # If an "OR)" line is encountered, set or_mode so that the next NEEDS block is merged.
-        if line.upper().startswith("OR)"):
-            or_mode = True
-            i += 1
-            continue
-
-        if line.upper().startswith("NEEDS:"):
-            if not or_mode:
-                # Start a new requirement block
-                combined = line
-                while ("HOURS" not in combined.upper()) and (i + 1 < len(lines)):
-                    i += 1
-                    combined += " " + lines[i]
-                hh = re.search(r"NEEDS:\s+([\d.]+)\s+HOURS", combined, re.IGNORECASE)
-                if hh:
-                    hours_needed = hh.group(1)
-                    req_heading = extract_requirement_type(lines, i)
-                    current_req = {
-                        "requirement_description": combined,
-                        "hours_needed": hours_needed,
-                        "requirement_type": req_heading,
-                        "select_from": [],
-                        "not_from": []
-                    }
-                    requirements.append(current_req)
-                else:
-                    current_req = None
-            else:
-                # OR mode: do not start a new block, just merge additional tokens
-                # (We assume the current_req already exists.)
-                combined = line
-                while ("HOURS" not in combined.upper()) and (i + 1 < len(lines)):
-                    i += 1
-                    combined += " " + lines[i]
-                # Do not update current_req's description/hours; just merge tokens later.
-            or_mode = False
-            i += 1
-            continue
-
-        # Process SELECT FROM:
-        if "SELECT FROM:" in line.upper():
-            gather_list = []
-            splitted = re.split(r"SELECT FROM:", line, maxsplit=1)
+        if info.tag == OR_LINE:
+            self.or_mode = True
+        elif info.tag == NEEDS:
+            self.needs_text = line
+            if info.has_hours:
+                yield from self._end_needs(list(self.window))
+        elif info.tag in (SELECT_FROM, NOT_FROM):
+            # Process SELECT FROM: / NOT FROM:
+            split_re = SELECT_FROM_SPLIT_RE if info.tag == SELECT_FROM else NOT_FROM_SPLIT_RE
+            self.gather_tag = info.tag
+            self.gather_list = []
+            splitted = split_re.split(line, maxsplit=1)
             if len(splitted) > 1:
-                gather_list.append(splitted[1].strip())
-            j = i + 1
-            while j < len(lines):
-                sub = lines[j]
-                if (sub.upper().startswith("NEEDS:") or sub.upper().startswith("OR)") or
-                    sub.upper().startswith("NOT FROM:") or "SELECT FROM:" in sub.upper() or
-                    is_block_boundary(sub)):
-                    break
-                if is_possible_course_line(sub):
-                    gather_list.append(sub)
-                else:
-                    break
-                j += 1
-            tokens, last_subject = parse_course_tokens(gather_list, last_subject)
-            if current_req:
-                # Remove stray tokens like "OR" if any
-                tokens = [t for t in tokens if t.upper() != "OR"]
-                current_req["select_from"].extend(tokens)
-            i = j
-            continue
-
-        # Process NOT FROM:
-        if "NOT FROM:" in line.upper() or "-> NOT FROM:" in line.upper():
-            gather_list = []
-            splitted = re.split(r"(?:->\s*)?NOT FROM:", line, maxsplit=1)
-            if len(splitted) > 1:
-                gather_list.append(splitted[1].strip())
-            j = i + 1
-            while j < len(lines):
-                sub = lines[j]
-                if (sub.upper().startswith("NEEDS:") or sub.upper().startswith("OR)") or
-                    sub.upper().startswith("NOT FROM:") or "SELECT FROM:" in sub.upper() or
-                    is_block_boundary(sub)):
-                    break
-                if is_possible_course_line(sub):
-                    gather_list.append(sub)
-                else:
-                    break
-                j += 1
-            tokens, last_subject = parse_course_tokens(gather_list, last_subject)
-            if current_req:
-                tokens = [t for t in tokens if t.upper() != "OR"]
-                current_req["not_from"].extend(tokens)
-            i = j
-            continue
+                self.gather_list.append(splitted[1].strip())
 
-        i += 1
+    def _end_needs(self, preceding):
+        """Closes a NEEDS block; preceding holds the lines before its last line."""
+        combined = self.needs_text
+        self.needs_text = None
+        if not self.or_mode:
+            # Start a new requirement block
+            finished = self.current_req
+            hh = NEEDS_HOURS_RE.search(combined)
+            if hh:
+                self.current_req = {
+                    "requirement_description": combined,
+                    "hours_needed": hh.group(1),
+                    "requirement_type": extract_requirement_type(preceding, len(preceding), self.lookback),
+                    "select_from": [],
+                    "not_from": []
+                }
+                self.requirements.append(self.current_req)
+            else:
+                self.current_req = None
+            if finished is not None:
+                yield "requirement", finished
+        # else OR mode: do not start a new block, just merge additional tokens
+        # (We assume the current_req already exists.)
+        self.or_mode = False
+
+    def _end_gather(self):
+        tokens, self.last_subject = parse_course_tokens(self.gather_list, self.last_subject)
+        if self.current_req:
+            # Remove stray tokens like "OR" if any
+            tokens = [t for t in tokens if t.upper() != "OR"]
+            key = "select_from" if self.gather_tag == SELECT_FROM else "not_from"
+            self.current_req[key].extend(tokens)
+        self.gather_tag = None
+        self.gather_list = []
+
+def parse_dars_stream(pages, lookback=10):
+    """
+    Runs DarsStreamParser over an iterable of pages (lists of lines), e.g.
+    iter_pages(pdf_path), yielding its events as each page is parsed.
+    """
+    parser = DarsStreamParser(lookback)
+    for page in pages:
+        yield from parser.feed(page)
+    yield from parser.close()
+
+def parse_dars_pages(pages):
+    """Parses an iterable of pages and returns the final parse_dars dict."""
+    for kind, payload in parse_dars_stream(pages):
+        if kind == "done":
+            return payload
+
+def parse_dars(pdf_path, layout=False):
+    # Step 1 streams pages out of the PDF; steps 2-4 run as each page arrives.
+    return parse_dars_pages(iter_pages(pdf_path, layout=layout))
+
+def parse_dars_lines(lines):
+    """Runs steps 2-4 of parse_dars over already-extracted lines."""
+    return parse_dars_pages([lines])
+
+###############################################################################
+#                          LINES ARTIFACT (STAGE 1 OUTPUT)                     #
+###############################################################################
+
+# Stage 1 (pdfplumber) output can be saved once and parsed any number of times:
+#   *.lines.json.gz  {"format": "dars-lines", "version": 1, "pages": [[line, ...], ...]}
+#   *.txt            one line per line, as written by scripts/pdfplumb.py
+LINES_FORMAT = "dars-lines"
+LINES_VERSION = 1
+LINES_SUFFIX = ".lines.json.gz"
+
+def save_lines(pages, path):
+    """Writes extract_pages output as a gzipped JSON lines artifact."""
+    payload = json.dumps({"format": LINES_FORMAT, "version": LINES_VERSION, "pages": pages}, separators=(",", ":"))
+    # mtime=0 keeps the bytes (and so the cache key) identical for identical pages.
+    with open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        f.write(payload.encode("utf-8"))
+
+def load_pages(path):
+    """Reads a lines artifact or a plain text dump back into a list of pages."""
+    if path.endswith(".txt"):
+        with open(path, "r", encoding="utf-8") as f:
+            return [[line for line in (rline.strip() for rline in f) if line]]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        artifact = json.load(f)
+    if artifact.get("format") != LINES_FORMAT or artifact.get("version") != LINES_VERSION:
+        raise ValueError(f"{path} is not a {LINES_FORMAT} v{LINES_VERSION} artifact")
+    return artifact["pages"]
+
+def is_pdf(path):
+    return path.lower().endswith(".pdf")
+
+def parse_dars_file(path, layout=False):
+    """Stage 2 from whatever path holds: a PDF, a lines artifact or a text dump."""
+    if is_pdf(path):
+        return parse_dars(path, layout)
+    return parse_dars_pages(load_pages(path))
+
+###############################################################################
+#                          PARSED RESULT CACHE                                 #
+###############################################################################
+
+# Bump whenever a change to the parsing steps changes the output, so cached
+# results from the old parser are never served.
+PARSER_VERSION = "2"
+
+def pdf_cache_key(pdf_path, layout=False):
+    """SHA-256 of the PDF bytes plus PARSER_VERSION (and the extraction mode)."""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return f"{digest.hexdigest()}:{PARSER_VERSION}" + (":layout" if layout else "")
+
+class ParseCache:
+    """
+    SQLite-backed cache of parse_dars output keyed by pdf_cache_key, so a
+    re-uploaded audit skips pdfplumber entirely. Once the stored JSON exceeds
+    max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS parsed ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS parsed_last_used ON parsed (last_used)")
+        self.db.commit()
+
+    def get(self, key):
+        row = self.db.execute("SELECT result FROM parsed WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute("UPDATE parsed SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.db.commit()
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        payload = json.dumps(result)
+        self.db.execute(
+            "INSERT OR REPLACE INTO parsed (key, result, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, payload, len(payload), time.time())
+        )
+        self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM parsed").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM parsed ORDER BY last_used").fetchall():
+            self.db.execute("DELETE FROM parsed WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM parsed").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def close(self):
+        self.db.close()
+
+def parse_dars_cached(pdf_path, cache, layout=False):
+    """parse_dars_file, served from cache when this exact file was parsed before."""
+    key = pdf_cache_key(pdf_path, layout)
+    result = cache.get(key)
+    if result is None:
+        result = parse_dars_file(pdf_path, layout)
+        cache.put(key, result)
+    return result
 
-    data["requirements_needed"] = requirements
-    return data
+###############################################################################
+#                          BATCH MODE (PROCESS POOL)                           #
+###############################################################################
+
+def count_pages(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def _extract_chunk(pdf_path, page_range, layout=False):
+    """Worker task: extract one page range (or load a whole lines artifact) and time it."""
+    start = time.perf_counter()
+    pages = extract_pages(pdf_path, page_range, layout) if is_pdf(pdf_path) else load_pages(pdf_path)
+    return pages, time.perf_counter() - start
+
+def lines_artifact_path(lines_dir, pdf_path):
+    return os.path.join(lines_dir, os.path.splitext(os.path.basename(pdf_path))[0] + LINES_SUFFIX)
+
+def find_pdfs(pattern):
+    """
+    A directory (all *.pdf inside it) or a glob pattern -> sorted paths.
+    A glob may also match lines artifacts or text dumps, which skip stage 1.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.pdf")
+    return sorted(glob.glob(pattern, recursive=True))
+
+def batch_parse(pdf_paths, out, workers=None, pages_per_task=8, cache=None, lines_dir=None, layout=False):
+    """
+    Parses many DARS PDFs across a process pool and writes one JSON object per
+    file to `out` (JSON Lines) as soon as that file finishes.
+
+    Audits longer than pages_per_task pages are split into page ranges that are
+    extracted by different workers and stitched back together in page order.
+    A file that fails is reported as {"file", "ok": false, "error"} and the
+    rest of the batch carries on. With a ParseCache, files parsed before are
+    answered from it without being submitted. Lines artifacts and text dumps
+    in pdf_paths skip extraction; with lines_dir, the extracted pages of each
+    PDF are saved there as a lines artifact. layout=True extracts with
+    LayoutExtractor. Returns (ok_count, failed_count).
+    """
+    ok_count = failed_count = 0
+
+    def emit(record):
+        nonlocal ok_count, failed_count
+        if record["ok"]:
+            ok_count += 1
+        else:
+            failed_count += 1
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+        status = f"✅ {record['seconds']:.2f}s" if record["ok"] else f"❌ {record['error']}"
+        if record.get("cached"):
+            status += " (cached)"
+        print(f"{status}  {record['file']}", file=sys.stderr)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}   # future -> (path, chunk index)
+        chunks = {}    # path -> list of extracted line lists, in page order
+        seconds = {}   # path -> extraction time summed over its chunks
+        keys = {}      # path -> cache key
+        for path in pdf_paths:
+            try:
+                if cache is not None:
+                    start = time.perf_counter()
+                    keys[path] = pdf_cache_key(path, layout)
+                    result = cache.get(keys[path])
+                    if result is not None:
+                        emit({"file": path, "ok": True, "seconds": round(time.perf_counter() - start, 4),
+                              "pages_split": 0, "cached": True, "result": result})
+                        continue
+                n_pages = count_pages(path) if is_pdf(path) else 0
+            except Exception as e:
+                emit({"file": path, "ok": False, "error": f"{type(e).__name__}: {e}", "seconds": 0.0})
+                continue
+            ranges = [(p, min(p + pages_per_task, n_pages)) for p in range(0, n_pages, pages_per_task)] or [(0, 0)]
+            chunks[path] = [None] * len(ranges)
+            seconds[path] = 0.0
+            for idx, page_range in enumerate(ranges):
+                pending[pool.submit(_extract_chunk, path, page_range, layout)] = (path, idx)
+
+        for future in as_completed(pending):
+            path, idx = pending[future]
+            if path not in chunks:
+                continue  # an earlier chunk of this file already failed
+            try:
+                pages, elapsed = future.result()
+            except Exception as e:
+                del chunks[path]
+                emit({"file": path, "ok": False, "error": f"{type(e).__name__}: {e}", "seconds": seconds[path]})
+                continue
+            chunks[path][idx] = pages
+            seconds[path] += elapsed
+            if any(chunk is None for chunk in chunks[path]):
+                continue
+
+            file_chunks = chunks.pop(path)
+            pages = [page for chunk in file_chunks for page in chunk]
+            start = time.perf_counter()
+            try:
+                if lines_dir and is_pdf(path):
+                    save_lines(pages, lines_artifact_path(lines_dir, path))
+                result = parse_dars_pages(pages)
+            except Exception as e:
+                emit({"file": path, "ok": False, "error": f"{type(e).__name__}: {e}", "seconds": seconds[path]})
+                continue
+            seconds[path] += time.perf_counter() - start
+            if cache is not None:
+                cache.put(keys[path], result)
+            emit({"file": path, "ok": True, "seconds": round(seconds[path], 4), "pages_split": len(file_chunks),
+                  "result": result})
+
+    return ok_count, failed_count
 
 def main():
     parser = argparse.ArgumentParser(
         description="Parse DARS PDF -> JSON, merge OR blocks & gather multiline SELECT FROM."
     )
-    parser.add_argument("--input", required=True, help="Path to DARS PDF")
-    parser.add_argument("--output", required=True, help="Path to output JSON")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help=f"Path to DARS PDF, {LINES_SUFFIX} artifact or text dump")
+    source.add_argument("--batch", help="Directory or glob of DARS PDFs (or lines artifacts) to parse in parallel")
+    parser.add_argument("--output", help="Path to output JSON (JSON Lines for --batch; default stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --batch (default: CPU count)")
+    parser.add_argument("--pages-per-task", type=int, default=8,
+                        help="Split audits longer than this many pages across workers (--batch)")
+    parser.add_argument("--cache", help="SQLite file caching parsed results by PDF content hash")
+    parser.add_argument("--cache-max-mb", type=float, default=64, help="Evict least recently used results past this size")
+    parser.add_argument("--lines-dir", help=f"Also save each PDF's extracted lines here as a {LINES_SUFFIX} artifact")
+    parser.add_argument("--layout", action="store_true",
+                        help="Build lines from word positions (joins wrapped rows, drops print headers/footers)")
+    parser.add_argument("--events", action="store_true",
+                        help="With --input, stream parse events as JSON Lines while pages are parsed")
     args = parser.parse_args()
+    if args.lines_dir:
+        os.makedirs(args.lines_dir, exist_ok=True)
+
+    cache = ParseCache(args.cache, max_bytes=int(args.cache_max_mb * 1024 * 1024)) if args.cache else None
+
+    if args.batch:
+        pdf_paths = find_pdfs(args.batch)
+        start = time.perf_counter()
+        if args.output and args.output != "-":
+            with open(args.output, "w", encoding="utf-8") as f:
+                ok, failed = batch_parse(pdf_paths, f, args.workers, args.pages_per_task, cache, args.lines_dir,
+                                         args.layout)
+        else:
+            ok, failed = batch_parse(pdf_paths, sys.stdout, args.workers, args.pages_per_task, cache, args.lines_dir,
+                                     args.layout)
+        elapsed = time.perf_counter() - start
+        print(f"Parsed {ok}/{len(pdf_paths)} audits ({failed} failed) in {elapsed:.2f}s", file=sys.stderr)
+    elif args.events:
+        pages = iter_pages(args.input, layout=args.layout) if is_pdf(args.input) else load_pages(args.input)
+        out = open(args.output, "w", encoding="utf-8") if args.output and args.output != "-" else sys.stdout
+        for kind, payload in parse_dars_stream(pages):
+            out.write(json.dumps({"event": kind, "data": payload}) + "\n")
+            out.flush()
+        if out is not sys.stdout:
+            out.close()
+    else:
+        if not args.output:
+            parser.error("--output is required with --input")
+        if args.lines_dir and is_pdf(args.input):
+            pages = extract_pages(args.input, layout=args.layout)
+            artifact = lines_artifact_path(args.lines_dir, args.input)
+            save_lines(pages, artifact)
+            print(f"Saved lines to {artifact}")
+            parsed = parse_dars_pages(pages)
+        elif cache:
+            parsed = parse_dars_cached(args.input, cache, args.layout)
+        else:
+            parsed = parse_dars_file(args.input, args.layout)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(parsed, f, indent=2)
+        print(f"Saved to {args.output}")
 
-    parsed = parse_dars(args.input)
-    with open(args.output, "w", encoding="utf-8") as f:
-        json.dump(parsed, f, indent=2)
-    print(f"Saved to {args.output}")
+    if cache:
+        stats = cache.stats()
+        print(f"📦 Cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / 1024:.1f} KB)", file=sys.stderr)
+        cache.close()
 
 if __name__ == "__main__":
     main()
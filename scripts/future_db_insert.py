@@ -3,19 +3,42 @@ import os
 load_dotenv(dotenv_path="../.env")
 print(f"DATABASE_URL LOADED: {os.environ.get('DATABASE_URL')}")
 
+import asyncio
+import hashlib
 import time
 import json
+import random
+import httpx
 import requests
-from bs4 import BeautifulSoup
 import psycopg2
 from psycopg2.extras import execute_values
 import argparse
 
+from html_backends import BACKENDS, DEFAULT_BACKEND, timetable_rows
+
 
 # --- Scraper Functionality ---
-def scrape_subject(term, subject, open_only=False):
-    url = "https://selfservice.banner.vt.edu/ssb/HZSKVTSC.P_ProcRequest"
-    form_data = {
+BANNER_URL = "https://selfservice.banner.vt.edu/ssb/HZSKVTSC.P_ProcRequest"
+
+SUBJECTS = [
+    "AAD", "AAEC", "ACIS", "ADS", "ADV", "AFST", "AHRM", "AINS", "AIS", "ALCE", "ALS",
+    "AOE", "APS", "APSC", "ARBC", "ARCH", "ART", "AS", "ASPT", "AT", "BC", "BCHM", "BDS",
+    "BIOL", "BIT", "BMES", "BMSP", "BMVS", "BSE", "CEE", "CEM", "CHE", "CHEM", "CHN",
+    "CINE", "CLA", "CMDA", "CMST", "CNST", "COMM", "CONS", "COS", "CRIM", "CS", "CSES",
+    "DANC", "DASC", "ECE", "ECON", "EDCI", "EDCO", "EDCT", "EDEL", "EDEP", "EDHE",
+    "EDIT", "EDP", "EDRE", "EDTE", "ENGE", "ENGL", "ENGR", "ENSC", "ENT", "ESM", "FA",
+    "FIN", "FIW", "FL", "FMD", "FR", "FREC", "FST", "GBCB", "GEOG", "GEOS", "GER", "GIA",
+    "GR", "GRAD", "HD", "HEB", "HIST", "HNFE", "HORT", "HTM", "HUM", "IDS", "IS",
+    "ISC", "ISE", "ITAL", "ITDS", "JMC", "JPN", "JUD", "LAHS", "LAR", "LAT", "LDRS",
+    "MACR", "MATH", "ME", "MGT", "MINE", "MKTG", "MN", "MS", "MSE", "MTRG", "MUS",
+    "NANO", "NEUR", "NR", "NSEG", "PAPA", "PHIL", "PHS", "PHYS", "PM", "PORT", "PPE",
+    "PPWS", "PR", "PSCI", "PSVP", "PSYC", "REAL", "RED", "RLCL", "RTM", "RUS", "SBIO",
+    "SOC", "SPAN", "SPES", "SPIA", "STAT", "STL", "STS", "SYSB", "TA", "TBMH", "UAP",
+    "UH", "UNIV", "VM", "WATR", "WGS"
+]
+
+def banner_form(term, subject, open_only=False):
+    return {
         "TERMYEAR": term,
         "subj_code": subject,
         "SCHDTYPE": "%",
@@ -24,24 +47,17 @@ def scrape_subject(term, subject, open_only=False):
         "open_only": "on" if open_only else "",
         "BTN_PRESSED": "FIND class sections"
     }
-    
-    try:
-        response = requests.post(url, data=form_data, timeout=10)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"❌ Failed to fetch data for subject {subject}: {e}")
-        return []
-    
-    soup = BeautifulSoup(response.text, "html.parser")
-    table = soup.find("table", class_="dataentrytable")
-    if not table:
+
+def parse_subject_html(html, term, subject, parser=DEFAULT_BACKEND):
+    """Section dicts from one Banner timetable results page (see html_backends for `parser`)."""
+    rows = timetable_rows(html, parser)
+    if rows is None:
         print(f"⚠️ No results found for subject {subject} in term {term}")
         return []
     
-    rows = table.find_all("tr", attrs={"class": None})
     sections = []
-    for row in rows:
-        cols = [td.get_text(strip=True).replace("\xa0", " ") for td in row.find_all("td")]
+    for cells in rows:
+        cols = [cell.replace("\xa0", " ") for cell in cells]
         if len(cols) >= 12 and cols[0].isdigit():
             section = {
                 "crn": cols[0],
@@ -62,6 +78,121 @@ def scrape_subject(term, subject, open_only=False):
             sections.append(section)
     return sections
 
+def scrape_subject(term, subject, open_only=False, url=BANNER_URL, parser=DEFAULT_BACKEND):
+    try:
+        response = requests.post(url, data=banner_form(term, subject, open_only), timeout=10)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"❌ Failed to fetch data for subject {subject}: {e}")
+        return []
+    
+    return parse_subject_html(response.text, term, subject, parser)
+
+# --- Concurrent Scraper ---
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Lets through `rate` requests per second on average, in bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+async def fetch_subject(client, bucket, term, subject, open_only=False, url=BANNER_URL, retries=3, backoff=0.5):
+    """
+    POSTs one subject's search through the shared client. Connection errors,
+    timeouts, 429 and 5xx responses are retried up to `retries` times with
+    jittered exponential backoff. Returns (html, attempts).
+    """
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        try:
+            response = await client.post(url, data=banner_form(term, subject, open_only))
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                return response.text, attempt + 1
+            error = httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+        except httpx.TransportError as e:
+            error = e
+        if attempt == retries:
+            raise error
+        await asyncio.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+def _timed_parse(html, term, subject, parser=DEFAULT_BACKEND):
+    """parse_subject_html plus the CPU time it took (wall time is skewed by the other threads)."""
+    start = time.thread_time()
+    sections = parse_subject_html(html, term, subject, parser)
+    return sections, time.thread_time() - start
+
+async def scrape_subjects(term, subjects, open_only=False, url=BANNER_URL, concurrency=8, rate=4.0,
+                          retries=3, timeout=10, save_html=None, parser=DEFAULT_BACKEND):
+    """
+    Scrapes many subjects concurrently over one keep-alive connection pool.
+    At most `concurrency` requests are in flight and at most `rate` start per
+    second. A subject that still fails after its retries is logged and skipped.
+
+    Returns (sections in subject order, {subject: timing metrics}).
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    bucket = TokenBucket(rate, burst=concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    metrics = {}
+
+    async def scrape_one(client, subject):
+        async with slots:
+            start = time.perf_counter()
+            try:
+                html, attempts = await fetch_subject(client, bucket, term, subject, open_only, url, retries)
+            except Exception as e:
+                print(f"❌ Failed to fetch data for subject {subject}: {e}")
+                metrics[subject] = {"ok": False, "fetch_s": round(time.perf_counter() - start, 3), "error": str(e)}
+                return []
+        fetch_s = time.perf_counter() - start
+        if save_html:
+            with open(os.path.join(save_html, f"{subject}.html"), "w", encoding="utf-8") as f:
+                f.write(html)
+        # Parse off the event loop so other subjects' responses keep flowing in meanwhile.
+        sections, parse_s = await asyncio.to_thread(_timed_parse, html, term, subject, parser)
+        metrics[subject] = {
+            "ok": True, "sections": len(sections), "attempts": attempts,
+            "fetch_s": round(fetch_s, 3), "parse_s": round(parse_s, 3)
+        }
+        print(f"✅ {subject}: {len(sections)} sections in {fetch_s:.2f}s"
+              f"{f' ({attempts} attempts)' if attempts > 1 else ''}")
+        return sections
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        results = await asyncio.gather(*(scrape_one(client, subject) for subject in subjects))
+    return [section for sections in results for section in sections], metrics
+
+def print_scrape_summary(metrics, elapsed):
+    ok = [m for m in metrics.values() if m["ok"]]
+    failed = sorted(subject for subject, m in metrics.items() if not m["ok"])
+    print(f"⏱️ Scraped {len(ok)}/{len(metrics)} subjects in {elapsed:.2f}s "
+          f"({sum(m['sections'] for m in ok)} sections, {sum(m['attempts'] - 1 for m in ok)} retries)")
+    if ok:
+        fetch_times = sorted(m["fetch_s"] for m in ok)
+        print(f"   fetch p50 {fetch_times[len(fetch_times) // 2]:.2f}s, max {fetch_times[-1]:.2f}s; "
+              f"parse CPU {sum(m['parse_s'] for m in ok):.2f}s")
+        slowest = sorted(((m["fetch_s"], s) for s, m in metrics.items() if m["ok"]), reverse=True)[:5]
+        print("   slowest: " + ", ".join(f"{s} {t:.2f}s" for t, s in slowest))
+    if failed:
+        print(f"   failed: {', '.join(failed)}")
+
 # --- Extract Unique Courses from Sections ---
 def extract_courses(sections):
     seen = set()
@@ -132,6 +263,116 @@ def insert_sections(conn, sections):
     conn.commit()
     print(f"Inserted {len(values)} sections into the database.")
 
+# --- Incremental Section Refresh ---
+SECTION_COLUMNS = ("crn", "section_code", "days", "time", "location", "instructor")
+
+def section_row(s):
+    """The sections table row for a scraped section dict."""
+    return (s["crn"], s["code"], s["days"], f"{s['start_time']}-{s['end_time']}", s["location"], s["instructor"])
+
+def section_fingerprint(row):
+    """Short hash of everything stored for a section."""
+    return hashlib.blake2b("\x1f".join(str(v) for v in row).encode("utf-8"), digest_size=8).hexdigest()
+
+def row_subject(row):
+    return row[1].split("-", 1)[0]
+
+def load_fingerprints(conn, state_path=None):
+    """
+    {crn: [subject, fingerprint]} as of the last refresh: from state_path when
+    it exists, otherwise computed from what is in the sections table now.
+    CRNs are always str keys, like the scraped sections and the state file,
+    whatever the type of the sections.crn column.
+    """
+    if state_path and os.path.exists(state_path):
+        with open(state_path, "r") as f:
+            return json.load(f)
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {', '.join(SECTION_COLUMNS)} FROM sections")
+        return {str(row[0]): [row_subject(row), section_fingerprint(row)] for row in cur}
+
+def diff_sections(previous, sections, scraped_subjects=None):
+    """
+    Compares scraped sections with the previous fingerprints.
+
+    Returns (upserts, deleted, fingerprints): the rows that are new or changed
+    as (op, row) pairs, the CRNs that disappeared, and the fingerprints to keep
+    for next time. A CRN only counts as deleted if its subject was scraped
+    successfully, so a failed fetch never wipes a subject; with
+    scraped_subjects=None nothing is deleted.
+    """
+    current = {}
+    for s in sections:
+        row = section_row(s)
+        current[row[0]] = row  # a CRN listed twice keeps its last row, as the upsert would
+
+    upserts = []
+    fingerprints = {}
+    for crn, row in current.items():
+        fingerprint = section_fingerprint(row)
+        fingerprints[crn] = [row_subject(row), fingerprint]
+        old = previous.get(crn)
+        if old is None:
+            upserts.append(("insert", row))
+        elif old[1] != fingerprint:
+            upserts.append(("update", row))
+
+    deleted = []
+    for crn, (subject, fingerprint) in previous.items():
+        if crn in current:
+            continue
+        if scraped_subjects is not None and subject in scraped_subjects:
+            deleted.append(crn)
+        else:
+            fingerprints[crn] = [subject, fingerprint]  # not re-scraped this run; keep it
+    return upserts, deleted, fingerprints
+
+def apply_section_changes(conn, upserts, deleted):
+    """Writes only the changed rows, in one transaction."""
+    with conn.cursor() as cur:
+        if upserts:
+            execute_values(cur, """
+            INSERT INTO sections (crn, section_code, days, time, location, instructor)
+            VALUES %s
+            ON CONFLICT (crn) DO UPDATE
+            SET
+            section_code = EXCLUDED.section_code,
+            days = EXCLUDED.days,
+            time = EXCLUDED.time,
+            location = EXCLUDED.location,
+            instructor = EXCLUDED.instructor;
+            """, [row for _, row in upserts])
+        if deleted:
+            # CRNs are str here; compare as text so an integer crn column works too.
+            cur.execute("DELETE FROM sections WHERE crn::text = ANY(%s)", (deleted,))
+    conn.commit()
+
+def write_changelog(path, upserts, deleted, term):
+    """Appends one compact JSON line per inserted, updated or deleted section."""
+    ts = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(path, "a") as f:
+        for op, row in upserts:
+            f.write(json.dumps({"ts": ts, "term": term, "op": op, **dict(zip(SECTION_COLUMNS, row))}) + "\n")
+        for crn in deleted:
+            f.write(json.dumps({"ts": ts, "term": term, "op": "delete", "crn": crn}) + "\n")
+
+def refresh_sections(conn, sections, scraped_subjects=None, state_path=None, changelog=None, term=""):
+    """Incremental replacement for insert_sections; returns (inserted, updated, deleted) counts."""
+    previous = load_fingerprints(conn, state_path)
+    upserts, deleted, fingerprints = diff_sections(previous, sections, scraped_subjects)
+    apply_section_changes(conn, upserts, deleted)
+    if state_path:
+        with open(state_path, "w") as f:
+            json.dump(fingerprints, f)
+    if changelog:
+        write_changelog(changelog, upserts, deleted, term)
+
+    inserted = sum(1 for op, _ in upserts if op == "insert")
+    counts = (inserted, len(upserts) - inserted, len(deleted))
+    print(f"🔁 Sections: {counts[0]} inserted, {counts[1]} updated, {counts[2]} deleted, "
+          f"{len(fingerprints) - counts[0] - counts[1]} unchanged.")
+    return counts
+
 def insert_courses(conn, courses):
     if not courses:
         return
@@ -156,39 +397,59 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--subject", help="Optional: single subject to scrape (e.g., CS)")
     parser.add_argument("--term", default="202509", help="Academic term (default: 202509)")
+    parser.add_argument("--url", default=BANNER_URL, help="Timetable endpoint (e.g. a local banner_stub.py)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--rate", type=float, default=4.0, help="Max requests started per second")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per subject on errors, 429 and 5xx")
+    parser.add_argument("--serial", action="store_true", help="Scrape one subject at a time with a 1s pause")
+    parser.add_argument("--html-parser", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="HTML backend for the results pages (see html_backends.py)")
+    parser.add_argument("--save-html", help="Directory to save each subject's results page (stub fixtures)")
+    parser.add_argument("--metrics", help="Write per-subject timing metrics to this JSON file")
+    parser.add_argument("--full", action="store_true", help="Re-upsert every section instead of only the changes")
+    parser.add_argument("--state", help="JSON file of per-CRN fingerprints from the last run "
+                                        "(default: computed from the sections table)")
+    parser.add_argument("--changelog", help="Append inserted/updated/deleted sections to this JSON Lines file")
     args = parser.parse_args()
 
-    subjects = [args.subject.upper()] if args.subject else [  # if --subject is passed, use it
-        "AAD", "AAEC", "ACIS", "ADS", "ADV", "AFST", "AHRM", "AINS", "AIS", "ALCE", "ALS",
-        "AOE", "APS", "APSC", "ARBC", "ARCH", "ART", "AS", "ASPT", "AT", "BC", "BCHM", "BDS",
-        "BIOL", "BIT", "BMES", "BMSP", "BMVS", "BSE", "CEE", "CEM", "CHE", "CHEM", "CHN",
-        "CINE", "CLA", "CMDA", "CMST", "CNST", "COMM", "CONS", "COS", "CRIM", "CS", "CSES",
-        "DANC", "DASC", "ECE", "ECON", "EDCI", "EDCO", "EDCT", "EDEL", "EDEP", "EDHE",
-        "EDIT", "EDP", "EDRE", "EDTE", "ENGE", "ENGL", "ENGR", "ENSC", "ENT", "ESM", "FA",
-        "FIN", "FIW", "FL", "FMD", "FR", "FREC", "FST", "GBCB", "GEOG", "GEOS", "GER", "GIA",
-        "GR", "GRAD", "HD", "HEB", "HIST", "HNFE", "HORT", "HTM", "HUM", "IDS", "IS",
-        "ISC", "ISE", "ITAL", "ITDS", "JMC", "JPN", "JUD", "LAHS", "LAR", "LAT", "LDRS",
-        "MACR", "MATH", "ME", "MGT", "MINE", "MKTG", "MN", "MS", "MSE", "MTRG", "MUS",
-        "NANO", "NEUR", "NR", "NSEG", "PAPA", "PHIL", "PHS", "PHYS", "PM", "PORT", "PPE",
-        "PPWS", "PR", "PSCI", "PSVP", "PSYC", "REAL", "RED", "RLCL", "RTM", "RUS", "SBIO",
-        "SOC", "SPAN", "SPES", "SPIA", "STAT", "STL", "STS", "SYSB", "TA", "TBMH", "UAP",
-        "UH", "UNIV", "VM", "WATR", "WGS"
-    ]
-
-    all_sections = []
-    for subject in subjects:
-        print(f"🔍 Scraping subject {subject} for term {args.term}...")
-        sections = scrape_subject(args.term, subject, open_only=True)
-        print(f"✅ Found {len(sections)} sections for {subject}.")
-        all_sections.extend(sections)
-        time.sleep(1)
+    subjects = [args.subject.upper()] if args.subject else SUBJECTS  # if --subject is passed, use it
+    if args.save_html:
+        os.makedirs(args.save_html, exist_ok=True)
+
+    start = time.perf_counter()
+    scraped_subjects = None  # unknown for --serial, which reports failures as empty subjects
+    if args.serial:
+        all_sections = []
+        for subject in subjects:
+            print(f"🔍 Scraping subject {subject} for term {args.term}...")
+            sections = scrape_subject(args.term, subject, open_only=True, url=args.url,
+                                      parser=args.html_parser)
+            print(f"✅ Found {len(sections)} sections for {subject}.")
+            all_sections.extend(sections)
+            time.sleep(1)
+    else:
+        print(f"🔍 Scraping {len(subjects)} subjects for term {args.term} "
+              f"({args.concurrency} at a time, {args.rate:g} req/s)...")
+        all_sections, metrics = asyncio.run(scrape_subjects(
+            args.term, subjects, open_only=True, url=args.url, concurrency=args.concurrency,
+            rate=args.rate, retries=args.retries, save_html=args.save_html,
+            parser=args.html_parser
+        ))
+        print_scrape_summary(metrics, time.perf_counter() - start)
+        scraped_subjects = {subject for subject, m in metrics.items() if m["ok"]}
+        if args.metrics:
+            with open(args.metrics, "w") as f:
+                json.dump(metrics, f, indent=2)
 
     courses = extract_courses(all_sections)
 
     try:
         conn = connect_db()
         insert_courses(conn, courses)
-        insert_sections(conn, all_sections)
+        if args.full:
+            insert_sections(conn, all_sections)
+        else:
+            refresh_sections(conn, all_sections, scraped_subjects, args.state, args.changelog, args.term)
         conn.close()
     except Exception as e:
         print(f"❌ Failed to insert into database: {e}")
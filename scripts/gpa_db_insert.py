@@ -1,45 +1,218 @@
+"""
+Loads the Grade Distribution CSV into gpa_stats.
+
+The CSV is streamed in chunks, so memory stays flat however many years or
+campuses the file covers. Each chunk's columns are derived with vectorized
+pandas ops and pushed with COPY FROM STDIN into a temporary staging table;
+one INSERT ... SELECT ... ON CONFLICT DO NOTHING then merges the staging
+table into gpa_stats in the same transaction. The rows the merge actually
+added are folded into avg_gpa_stats' running totals before it commits, so
+only the (course, instructor) averages the new term touches are rewritten.
+
+    python scripts/gpa_db_insert.py --csv "data/Grade Distribution.csv"
+    python scripts/gpa_db_insert.py --csv /tmp/grades.csv --generate 500000
+    python scripts/gpa_db_insert.py --csv /tmp/grades.csv \\
+        --dsn postgresql://postgres@127.0.0.1:5432/postgres --sslmode disable
+"""
+import argparse
+import io
+import os
+import random
+import time
+
 import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_values
 from dotenv import load_dotenv
-import os
+
+from avg_gpa_populator import apply_gpa_deltas, ensure_running_totals
 
 # Load environment variables (including DATABASE_URL)
 load_dotenv(dotenv_path="../.env")
 db_url = os.getenv("DATABASE_URL")
 print("DB URL Loaded:", bool(db_url))
 
-# Load CSV
-df = pd.read_csv("/Users/shyam/HokieMatch/data/Grade Distribution.csv")
+DEFAULT_CSV = "/Users/shyam/HokieMatch/data/Grade Distribution.csv"
 
-# Prepare data
-def format_semester(term, year):
-    return f"{term} {year}"
+CSV_COLUMNS = ["Academic Year", "Term", "Subject", "Course No.", "Instructor", "GPA", "Graded Enrollment"]
+# Read as text so every chunk formats codes and years the same way.
+CSV_DTYPES = {"Academic Year": str, "Term": str, "Subject": str, "Course No.": str, "Instructor": str}
+COLUMNS = ["course_code", "instructor", "avg_gpa", "num_students", "semester"]
 
-df['course_code'] = df['Subject'] + "-" + df['Course No.'].astype(str)
-df['semester'] = df.apply(lambda row: format_semester(row['Term'], row['Academic Year']), axis=1)
+# Same column types as gpa_stats, so values land exactly as a direct INSERT would store them.
+# gpa_stats_inserted receives the rows the merge really added (not the duplicates it skipped).
+STAGING_DDL = f"""
+CREATE TEMP TABLE gpa_stats_staging ON COMMIT DROP AS
+SELECT {', '.join(COLUMNS)} FROM gpa_stats WITH NO DATA;
+CREATE TEMP TABLE gpa_stats_inserted ON COMMIT DROP AS
+SELECT {', '.join(COLUMNS)} FROM gpa_stats WITH NO DATA;
+"""
+COPY_SQL = f"COPY gpa_stats_staging ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+MERGE_SQL = f"""
+WITH inserted AS (
+    INSERT INTO gpa_stats ({', '.join(COLUMNS)})
+    SELECT {', '.join(COLUMNS)} FROM gpa_stats_staging
+    ON CONFLICT DO NOTHING
+    RETURNING {', '.join(COLUMNS)}
+)
+INSERT INTO gpa_stats_inserted SELECT * FROM inserted;
+"""
 
-# Select and rename relevant columns
-upload_df = df[['course_code', 'Instructor', 'GPA', 'Graded Enrollment', 'semester']].copy()
-upload_df.columns = ['course_code', 'instructor', 'avg_gpa', 'num_students', 'semester']
+# --- Reading ---
 
-# Drop rows with missing GPA or Enrollment
-upload_df.dropna(subset=['avg_gpa', 'num_students'], inplace=True)
+def read_chunks(path, chunksize=50000):
+    """The CSV's relevant columns, chunksize rows at a time."""
+    return pd.read_csv(path, usecols=CSV_COLUMNS, dtype=CSV_DTYPES, chunksize=chunksize)
 
-# Convert to correct data types
-upload_df['avg_gpa'] = upload_df['avg_gpa'].astype(float)
-upload_df['num_students'] = upload_df['num_students'].astype(int)
+def prepare_chunk(df):
+    """gpa_stats rows from one CSV chunk: course code, semester label, no missing GPA/enrollment."""
+    upload_df = pd.DataFrame({
+        "course_code": df["Subject"] + "-" + df["Course No."],
+        "instructor": df["Instructor"],
+        "avg_gpa": df["GPA"],
+        "num_students": df["Graded Enrollment"],
+        "semester": df["Term"] + " " + df["Academic Year"],
+    })
 
-# Insert into Supabase
-conn = psycopg2.connect(db_url, sslmode="require")
-with conn.cursor() as cur:
-    query = """
-    INSERT INTO gpa_stats (course_code, instructor, avg_gpa, num_students, semester)
-    VALUES %s
-    ON CONFLICT DO NOTHING;
+    # Drop rows with missing GPA or Enrollment
+    upload_df = upload_df.dropna(subset=["avg_gpa", "num_students"])
+
+    # Convert to correct data types
+    upload_df["avg_gpa"] = upload_df["avg_gpa"].astype(float)
+    upload_df["num_students"] = upload_df["num_students"].astype(int)
+    return upload_df
+
+# --- Loading ---
+
+def copy_chunk(cur, upload_df):
+    """Streams one prepared chunk into the staging table as CSV."""
+    buf = io.StringIO()
+    upload_df.to_csv(buf, header=False, index=False)
+    buf.seek(0)
+    cur.copy_expert(COPY_SQL, buf)
+
+def load_gpa_stats(conn, path, chunksize=50000, averages=True):
+    """
+    COPYs the CSV into a staging table chunk by chunk and merges it into
+    gpa_stats in one transaction; with averages=True the newly inserted rows
+    are applied to avg_gpa_stats in that same transaction. Returns timing and
+    row-count metrics.
     """
-    execute_values(cur, query, upload_df.values.tolist())
+    metrics = {"rows_read": 0, "rows_staged": 0, "rows_inserted": 0, "read_s": 0.0, "copy_s": 0.0, "merge_s": 0.0}
+    if averages:
+        # Schema changes get their own short transaction, never the load's.
+        ensure_running_totals(conn)
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(STAGING_DDL)
+        chunks = iter(read_chunks(path, chunksize))
+        while True:
+            t = time.perf_counter()
+            df = next(chunks, None)
+            if df is None:
+                break
+            upload_df = prepare_chunk(df)
+            metrics["read_s"] += time.perf_counter() - t
+
+            t = time.perf_counter()
+            copy_chunk(cur, upload_df)
+            metrics["copy_s"] += time.perf_counter() - t
+            metrics["rows_read"] += len(df)
+            metrics["rows_staged"] += len(upload_df)
+            print(f"📦 Staged {metrics['rows_staged']} rows...")
+
+        t = time.perf_counter()
+        cur.execute(MERGE_SQL)
+        metrics["rows_inserted"] = cur.rowcount
+        metrics["merge_s"] = time.perf_counter() - t
+
+        if averages:
+            t = time.perf_counter()
+            metrics["avg_rows"] = apply_gpa_deltas(cur, "gpa_stats_inserted")
+            metrics["avg_s"] = time.perf_counter() - t
+        conn.commit()
+    metrics["total_s"] = time.perf_counter() - start
+    return metrics
+
+def load_gpa_stats_values(conn, path, chunksize=50000):
+    """The previous execute_values insert, chunked, for comparing load times."""
+    metrics = {"rows_read": 0, "rows_staged": 0, "rows_inserted": -1}  # execute_values can't tell
+    start = time.perf_counter()
+    query = f"INSERT INTO gpa_stats ({', '.join(COLUMNS)}) VALUES %s ON CONFLICT DO NOTHING;"
+    with conn.cursor() as cur:
+        for df in read_chunks(path, chunksize):
+            upload_df = prepare_chunk(df)
+            execute_values(cur, query, upload_df.values.tolist())
+            metrics["rows_read"] += len(df)
+            metrics["rows_staged"] += len(upload_df)
     conn.commit()
-    print(f"✅ Inserted {len(upload_df)} rows into gpa_stats.")
+    metrics["total_s"] = time.perf_counter() - start
+    return metrics
+
+def print_load_summary(metrics):
+    total = metrics["total_s"]
+    print(f"✅ Inserted {metrics['rows_inserted'] if metrics['rows_inserted'] >= 0 else '?'} new rows into gpa_stats "
+          f"({metrics['rows_staged']} of {metrics['rows_read']} CSV rows had a GPA and enrollment).")
+    print(f"⏱️ {total:.2f}s, {metrics['rows_read'] / total:,.0f} rows/s" if total else "⏱️ 0s")
+    if "copy_s" in metrics:
+        print(f"   read+prepare {metrics['read_s']:.2f}s, COPY {metrics['copy_s']:.2f}s, merge {metrics['merge_s']:.2f}s")
+    if "avg_rows" in metrics:
+        print(f"✅ Updated {metrics['avg_rows']} avg_gpa_stats rows in {metrics['avg_s']:.2f}s.")
+
+# --- Synthetic Data ---
+
+def generate_csv(path, rows, seed=0):
+    """Writes a Grade Distribution-shaped CSV of made-up rows, for load testing."""
+    rng = random.Random(seed)
+    subjects = ["CS", "MATH", "ECE", "PHYS", "CHEM", "ENGL", "HIST", "ECON", "PSYC", "STAT"]
+    instructors = [f"{rng.choice('ABCDEFGHJKLMNPRSTW')} {name}" for name in
+                   ["Smith", "Lee", "Patel", "Garcia", "Chen", "Nguyen", "Brown", "Kim", "Davis", "Lopez"] * 20]
+    header = ["Academic Year", "Term", "Subject", "Course No.", "Course Title", "Instructor", "GPA",
+              "A (%)", "B (%)", "C (%)", "D (%)", "F (%)", "Withdraws", "Graded Enrollment", "CRN", "Credits"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(f'"{h}"' for h in header) + "\n")
+        for i in range(rows):
+            year = rng.randint(2012, 2024)
+            subject = rng.choice(subjects)
+            gpa = "" if rng.random() < 0.02 else f"{rng.uniform(1.8, 4.0):.2f}"
+            f.write(",".join([
+                f"{year}-{(year + 1) % 100:02d}", rng.choice(["Fall", "Spring", "Summer I", "Summer II", "Winter"]),
+                subject, str(rng.randint(1, 4) * 1000 + rng.randint(0, 999)), f'"Topics in {subject}, Part {i % 7}"',
+                f'"{rng.choice(instructors)}"', gpa, *(f"{rng.uniform(0, 60):.1f}" for _ in range(5)),
+                str(rng.randint(0, 10)), str(rng.randint(5, 400)), str(10000 + i % 90000), str(rng.choice([1, 3, 4])),
+            ]) + "\n")
+
+# --- Main ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the Grade Distribution CSV into gpa_stats")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="Grade Distribution CSV to load")
+    parser.add_argument("--chunksize", type=int, default=50000, help="CSV rows per chunk")
+    parser.add_argument("--dsn", default=db_url, help="Postgres DSN (default: DATABASE_URL)")
+    parser.add_argument("--sslmode", default="require", help="e.g. disable for a local Postgres")
+    parser.add_argument("--method", choices=["copy", "values"], default="copy",
+                        help="COPY through a staging table, or the old execute_values insert")
+    parser.add_argument("--skip-averages", action="store_true",
+                        help="Leave avg_gpa_stats alone (rebuild it later with avg_gpa_populator.py)")
+    parser.add_argument("--generate", type=int, metavar="ROWS",
+                        help="Write a synthetic CSV with this many rows to --csv and exit")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_csv(args.csv, args.generate)
+        print(f"✅ Wrote {args.generate} synthetic rows to {args.csv}")
+        return
+
+    conn = psycopg2.connect(args.dsn, sslmode=args.sslmode)
+    try:
+        if args.method == "copy":
+            metrics = load_gpa_stats(conn, args.csv, args.chunksize, averages=not args.skip_averages)
+        else:
+            metrics = load_gpa_stats_values(conn, args.csv, args.chunksize)
+            print("⚠️ --method values does not update avg_gpa_stats; run avg_gpa_populator.py afterwards.")
+        print_load_summary(metrics)
+    finally:
+        conn.close()
 
-conn.close()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Interchangeable HTML parsers for the scrapers' results pages.
+
+Every backend returns the same plain lists, so future_db_insert.py and
+scrape_pre_co_req.py build identical section/course dicts whichever one is
+used. `html_bench.py` times them against each other on saved pages and
+checks that they agree.
+
+    html.parser  BeautifulSoup's pure-Python parser (the default, no extra deps)
+    strainer     html.parser, but only the results table / course blocks are built
+    lxml         lxml.html tree walked directly, no BeautifulSoup objects
+    selectolax   selectolax's lexbor parser
+
+Text is taken the way BeautifulSoup's get_text(strip=True) does it: every
+text node stripped and joined without a separator, comments and <script>
+contents left out. On well-formed pages the backends agree exactly; lxml and
+selectolax repair unclosed <td>s the way a browser does, while html.parser
+nests them, so on broken markup the cell text can differ.
+"""
+from bs4 import BeautifulSoup, SoupStrainer
+
+BACKENDS = ("html.parser", "strainer", "lxml", "selectolax")
+DEFAULT_BACKEND = "html.parser"
+
+RESULTS_TABLE = SoupStrainer("table", class_="dataentrytable")
+COURSE_BLOCKS = SoupStrainer("div", class_="courseblock")
+
+CATALOG_FIELDS = ("detail-code", "detail-title", "detail-prereq", "detail-coreq")
+
+def _class_xpath(tag, cls):
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+
+# --- BeautifulSoup ---
+
+def _soup_timetable(html, strainer=None):
+    soup = BeautifulSoup(html, "html.parser", parse_only=strainer)
+    table = soup.find("table", class_="dataentrytable")
+    if not table:
+        return None
+    return [
+        [td.get_text(strip=True) for td in row.find_all("td")]
+        for row in table.find_all("tr", attrs={"class": None})
+    ]
+
+def _soup_catalog(html, strainer=None):
+    soup = BeautifulSoup(html, "html.parser", parse_only=strainer)
+    courses = []
+    for block in soup.find_all("div", class_="courseblock"):
+        fields = []
+        for cls in CATALOG_FIELDS:
+            elem = block.find("span", class_=cls)
+            fields.append(elem.get_text(strip=True) if elem else None)
+        courses.append(tuple(fields))
+    return courses
+
+# --- lxml ---
+
+def _lxml_doc(html):
+    import lxml.html
+    from lxml import etree
+
+    if not html.strip():
+        return None
+    # Parsed from bytes so pages with an XML encoding declaration are accepted too.
+    doc = lxml.html.fromstring(html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+    etree.strip_elements(doc, "script", "style", with_tail=False)
+    return doc
+
+def _lxml_text(elem):
+    return "".join(s.strip() for s in elem.itertext())
+
+def _lxml_timetable(html):
+    doc = _lxml_doc(html)
+    tables = doc.xpath(_class_xpath("table", "dataentrytable")) if doc is not None else []
+    if not tables:
+        return None
+    return [
+        [_lxml_text(td) for td in row.iter("td")]
+        for row in tables[0].iter("tr") if row.get("class") is None
+    ]
+
+def _lxml_catalog(html):
+    doc = _lxml_doc(html)
+    if doc is None:
+        return []
+    courses = []
+    for block in doc.xpath(_class_xpath("div", "courseblock")):
+        fields = []
+        for cls in CATALOG_FIELDS:
+            found = block.xpath("." + _class_xpath("span", cls))
+            fields.append(_lxml_text(found[0]) if found else None)
+        courses.append(tuple(fields))
+    return courses
+
+# --- selectolax ---
+
+def _lexbor_tree(html):
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(["script", "style"])
+    return tree
+
+def _lexbor_timetable(html):
+    table = _lexbor_tree(html).css_first("table.dataentrytable")
+    if table is None:
+        return None
+    return [
+        [td.text(deep=True, strip=True) for td in row.css("td")]
+        for row in table.css("tr:not([class])")
+    ]
+
+def _lexbor_catalog(html):
+    courses = []
+    for block in _lexbor_tree(html).css("div.courseblock"):
+        fields = []
+        for cls in CATALOG_FIELDS:
+            elem = block.css_first(f"span.{cls}")
+            fields.append(elem.text(deep=True, strip=True) if elem is not None else None)
+        courses.append(tuple(fields))
+    return courses
+
+_TIMETABLE = {
+    "html.parser": _soup_timetable,
+    "strainer": lambda html: _soup_timetable(html, RESULTS_TABLE),
+    "lxml": _lxml_timetable,
+    "selectolax": _lexbor_timetable,
+}
+
+_CATALOG = {
+    "html.parser": _soup_catalog,
+    "strainer": lambda html: _soup_catalog(html, COURSE_BLOCKS),
+    "lxml": _lxml_catalog,
+    "selectolax": _lexbor_catalog,
+}
+
+def _backend(table, backend):
+    if backend not in table:
+        raise ValueError(f"Unknown HTML backend {backend!r} (choose from {', '.join(BACKENDS)})")
+    return table[backend]
+
+def timetable_rows(html, backend=DEFAULT_BACKEND):
+    """
+    Cell texts of every class-less <tr> in the Banner results table
+    (table.dataentrytable), or None when the page has no results table.
+    """
+    return _backend(_TIMETABLE, backend)(html)
+
+def catalog_courses(html, backend=DEFAULT_BACKEND):
+    """
+    (code, title, prerequisite text, corequisite text) for every
+    div.courseblock on a catalog course-descriptions page; fields the
+    block does not have are None.
+    """
+    return _backend(_CATALOG, backend)(html)
@@ -0,0 +1,130 @@
+"""
+Per-page parse time of each html_backends backend on saved results pages.
+
+Timetable pages come from `future_db_insert.py --save-html DIR` (one
+<SUBJ>.html per subject); catalog pages are any saved course-descriptions
+pages. Without directories, --synthesize generates pages with banner_stub.py.
+Each backend's output is compared with html.parser's and any page where they
+differ is reported.
+
+    python scripts/html_bench.py --timetable /tmp/banner_html
+    python scripts/html_bench.py --synthesize 40 --repeat 3 --backends html.parser lxml
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import time
+
+from banner_stub import render_catalog_html, render_subject_html
+from html_backends import BACKENDS, DEFAULT_BACKEND, catalog_courses, timetable_rows
+
+KINDS = {"timetable": timetable_rows, "catalog": catalog_courses}
+
+def load_pages(directory):
+    """{page name: html} for every *.html file in directory."""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return pages
+
+def synthesize_pages(kind, count, seed=0):
+    rng = random.Random(f"{kind}:{seed}")
+    subjects = [f"S{i:03d}" for i in range(count)]
+    if kind == "timetable":
+        return {s: render_subject_html(s, rng.randint(5, 400), seed) for s in subjects}
+    return {s: render_catalog_html(s, rng.randint(5, 150), seed) for s in subjects}
+
+def available_backends(backends):
+    usable = []
+    for backend in backends:
+        try:
+            timetable_rows("<html></html>", backend)
+        except ImportError as e:
+            print(f"⚠️ Skipping {backend}: {e}")
+            continue
+        usable.append(backend)
+    return usable
+
+def bench_kind(kind, pages, backends, repeat):
+    """Times every backend on every page (best of `repeat`) and diffs it against html.parser."""
+    parse = KINDS[kind]
+    reference = {name: parse(html, DEFAULT_BACKEND) for name, html in pages.items()}
+    size_mb = sum(len(html.encode("utf-8")) for html in pages.values()) / 1e6
+    results = {}
+    for backend in backends:
+        times, mismatches = [], []
+        for name, html in pages.items():
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                out = parse(html, backend)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times.append(best)
+            if out != reference[name]:
+                mismatches.append(name)
+        total = sum(times)
+        ordered = sorted(times)
+        results[backend] = {
+            "pages": len(times),
+            "total_s": round(total, 4),
+            "mean_ms": round(1000 * total / len(times), 2),
+            "p50_ms": round(1000 * ordered[len(ordered) // 2], 2),
+            "max_ms": round(1000 * ordered[-1], 2),
+            "mb_per_s": round(size_mb / total, 2) if total else None,
+            "mismatches": mismatches,
+        }
+    return results, size_mb
+
+def print_results(kind, results, size_mb):
+    base = results.get(DEFAULT_BACKEND, {}).get("total_s")
+    pages = next(iter(results.values()))["pages"]
+    print(f"\n📦 {kind}: {pages} pages, {size_mb:.1f} MB")
+    print(f"   {'backend':<12} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9} {'MB/s':>7} {'speedup':>8}  output")
+    for backend, r in results.items():
+        speedup = f"{base / r['total_s']:.1f}x" if base and r["total_s"] else "-"
+        same = "✅ same" if not r["mismatches"] else f"❌ {len(r['mismatches'])} differ ({', '.join(r['mismatches'][:5])})"
+        print(f"   {backend:<12} {r['mean_ms']:>9.2f} {r['p50_ms']:>9.2f} {r['max_ms']:>9.2f} "
+              f"{r['mb_per_s'] or 0:>7.2f} {speedup:>8}  {same}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parser backends on saved pages")
+    parser.add_argument("--timetable", help="Directory of saved Banner results pages (<SUBJ>.html)")
+    parser.add_argument("--catalog", help="Directory of saved catalog course-descriptions pages")
+    parser.add_argument("--synthesize", type=int, default=0,
+                        help="Generate this many pages of each kind that has no directory")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=1, help="Parses per page; the fastest counts")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    corpora = {}
+    for kind, directory in (("timetable", args.timetable), ("catalog", args.catalog)):
+        if directory:
+            corpora[kind] = load_pages(directory)
+        elif args.synthesize:
+            corpora[kind] = synthesize_pages(kind, args.synthesize)
+    corpora = {kind: pages for kind, pages in corpora.items() if pages}
+    if not corpora:
+        parser.error("no pages: pass --timetable/--catalog directories or --synthesize N")
+
+    backends = available_backends(args.backends)
+    if DEFAULT_BACKEND not in backends:
+        backends.insert(0, DEFAULT_BACKEND)  # the reference for speedups
+
+    report = {}
+    for kind, pages in corpora.items():
+        results, size_mb = bench_kind(kind, pages, backends, args.repeat)
+        print_results(kind, results, size_mb)
+        report[kind] = results
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Expressions/sec of prereq_parser on a corpus of catalog requisite strings.
+
+The corpus comes from a `scrape_pre_co_req.py --cache DIR` directory, or is
+extracted from catalog pages synthesized with banner_stub.py. Every mode's
+JSON is compared with the plain pyparsing path (the old parse_req_string).
+
+    python scripts/prereq_bench.py --cache /tmp/catalog_cache
+    python scripts/prereq_bench.py --synthesize 150 --workers 4
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import string
+import time
+
+from banner_stub import render_catalog_html
+from html_backends import catalog_courses
+from prereq_parser import clear_cache, normalize_req_string, parse_req_string, parse_req_strings, parse_simple
+
+def load_cached_expressions(cache_dir):
+    """Raw prerequisite/corequisite strings from scrape_pre_co_req cache entries."""
+    texts = []
+    for path in sorted(glob.glob(os.path.join(cache_dir, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for course in json.load(f).get("courses", []):
+                texts += [t for t in (course.get("prerequisites"), course.get("corequisites")) if t]
+    return texts
+
+def synthesize_expressions(pages, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    for i in range(pages):
+        subject = "".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(2, 4)))
+        html = render_catalog_html(subject, rng.randint(5, 150), seed)
+        for _, _, prereq, coreq in catalog_courses(html, "lxml"):
+            if prereq:
+                texts.append(prereq.replace("Prerequisite(s):", "").strip())
+            if coreq:
+                texts.append(coreq.replace("Corequisite(s):", "").strip())
+    return texts
+
+def timed(fn):
+    # pyparsing failures print each string; keep them out of the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        out = fn()
+        return out, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prerequisite expression parsing")
+    parser.add_argument("--cache", help="scrape_pre_co_req.py --cache directory to take expressions from")
+    parser.add_argument("--synthesize", type=int, default=0, help="Catalog pages to generate expressions from")
+    parser.add_argument("--workers", type=int, default=0, help="Also time parse_req_strings across this many processes")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat the corpus this many times (a multi-term rebuild)")
+    args = parser.parse_args()
+
+    texts = load_cached_expressions(args.cache) if args.cache else synthesize_expressions(args.synthesize)
+    if not texts:
+        parser.error("no expressions: pass --cache DIR or --synthesize N")
+    texts = texts * args.repeat
+    normalized = {normalize_req_string(t) for t in texts} - {None}
+    simple = sum(parse_simple(t) is not None for t in normalized)
+    print(f"📦 {len(texts)} expressions, {len(normalized)} distinct, "
+          f"{simple / len(normalized):.0%} of distinct ones on the fast path")
+
+    reference, base = timed(lambda: [parse_req_string(t, fast=False) for t in texts])
+    expected = json.dumps(reference)
+    modes = [("pyparsing", reference, base)]
+    clear_cache()
+    modes.append(("fast + cache", *timed(lambda: [parse_req_string(t) for t in texts])))
+    if args.workers:
+        clear_cache()
+        modes.append((f"{args.workers} workers", *timed(lambda: parse_req_strings(texts, args.workers))))
+
+    print(f"   {'mode':<14} {'seconds':>9} {'expr/s':>10} {'speedup':>8}  output")
+    for name, out, elapsed in modes:
+        same = "✅ same" if json.dumps(out) == expected else "❌ differs"
+        print(f"   {name:<14} {elapsed:>9.3f} {len(texts) / elapsed:>10.0f} {base / elapsed:>7.1f}x  {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Prerequisite/corequisite expression parsing for scrape_pre_co_req.py.
+
+parse_req_string turns catalog text such as "CS 2114 or ECE 2574" into the
+nested {"type": "and"/"or"/"single", "conditions": [...]} JSON stored in
+course_requirements. Most strings are a single course or a flat and/or list
+and many repeat across courses, so parsing goes through:
+
+  1. a cache keyed by the normalized string,
+  2. a hand-written tokenizer + shunting-yard parser that accepts only
+     course codes, "and", "or" and parentheses,
+  3. the pyparsing grammar for anything else (odd spacing, stray words,
+     unbalanced parentheses...), exactly as before.
+
+The fast path builds the same left-associative trees as the grammar ("and"
+binding tighter than "or"), so the JSON is identical either way;
+`prereq_bench.py` checks that on a corpus and reports expressions/sec.
+Cached results are shared between callers and must not be mutated.
+"""
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+# Import pyparsing for a more robust parser
+from pyparsing import (
+    infixNotation, opAssoc, Word, alphas, nums, Combine, ParserElement, oneOf
+)
+
+# Enable packrat parsing for better performance
+ParserElement.enablePackrat()
+
+# --- Define a Grammar for Course Codes and Boolean Expressions ---
+# A course code typically consists of a subject (letters) followed by a space and a number (or alphanumeric)
+subject_part = Word(alphas)
+number_part = Word(nums + alphas)
+course_token = Combine(subject_part + " " + number_part)
+
+# Define a boolean expression grammar with operators "and" and "or"
+bool_expr = infixNotation(course_token,
+    [
+        (oneOf("and"), 2, opAssoc.LEFT),
+        (oneOf("or"), 2, opAssoc.LEFT),
+    ]
+)
+
+def parse_with_pyparsing(text):
+    """
+    Parse the prerequisite/corequisite string using pyparsing.
+    Returns a nested Python structure.
+    """
+    try:
+        parsed = bool_expr.parseString(text, parseAll=True).asList()
+
+        def convert(parsed_item):
+            if isinstance(parsed_item, list):
+                if len(parsed_item) == 1:
+                    return convert(parsed_item[0])
+                elif len(parsed_item) == 3:
+                    left = convert(parsed_item[0])
+                    op = parsed_item[1]
+                    right = convert(parsed_item[2])
+                    return {"type": op, "conditions": [left, right]}
+                else:
+                    # Process left-associatively for longer lists
+                    result = convert(parsed_item[0])
+                    for i in range(1, len(parsed_item), 2):
+                        op = parsed_item[i]
+                        right = convert(parsed_item[i+1])
+                        result = {"type": op, "conditions": [result, right]}
+                    return result
+            else:
+                # Return the token as is
+                return parsed_item
+        return convert(parsed)
+    except Exception as e:
+        print("Error parsing prerequisites:", text, e)
+        return text  # Fallback to raw string if parsing fails
+
+# --- Fast Path ---
+
+# After normalization operators are always " and " / " or " (lowercase, single spaces).
+TOKEN_RE = re.compile(r"([A-Za-z]+) ([A-Za-z0-9]+)| (and|or) |(\()|(\))")
+PRECEDENCE = {"or": 1, "and": 2}
+
+def parse_simple(text):
+    """
+    Shunting-yard parse of a normalized string made only of course codes,
+    " and ", " or " and parentheses. Returns the same structure as
+    parse_with_pyparsing, or None when the string is anything else.
+    """
+    output, ops = [], []
+
+    def reduce_top():
+        right, left = output.pop(), output.pop()
+        output.append({"type": ops.pop(), "conditions": [left, right]})
+
+    pos, expect_operand = 0, True
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if not m:
+            return None
+        pos = m.end()
+        subject, number, op, lparen, rparen = m.groups()
+        if subject is not None:
+            if not expect_operand or subject in PRECEDENCE or number in PRECEDENCE:
+                return None
+            output.append(f"{subject} {number}")
+            expect_operand = False
+        elif op is not None:
+            if expect_operand:
+                return None
+            # Left-associative: pop operators of equal or higher precedence first.
+            while ops and ops[-1] != "(" and PRECEDENCE[ops[-1]] >= PRECEDENCE[op]:
+                reduce_top()
+            ops.append(op)
+            expect_operand = True
+        elif lparen is not None:
+            if not expect_operand:
+                return None
+            ops.append("(")
+        else:
+            if expect_operand:
+                return None
+            while ops and ops[-1] != "(":
+                reduce_top()
+            if not ops:
+                return None
+            ops.pop()
+    if expect_operand:
+        return None
+    while ops:
+        if ops[-1] == "(":
+            return None
+        reduce_top()
+    return output[0]
+
+# --- Parsing ---
+
+def normalize_req_string(req_text):
+    """The whitespace/operator-normalized text parse_req_string parses (None if empty)."""
+    # Replace non-breaking spaces with regular spaces
+    req_text = req_text.replace("\xa0", " ").strip()
+    if not req_text:
+        return None
+    # Normalize whitespace around "and" and "or"
+    req_text = re.sub(r'\s*or\s*', ' or ', req_text, flags=re.IGNORECASE)
+    req_text = re.sub(r'\s*and\s*', ' and ', req_text, flags=re.IGNORECASE)
+    return req_text
+
+def _parse_normalized(req_text, fast=True):
+    result = parse_simple(req_text) if fast else None
+    if result is None:
+        result = parse_with_pyparsing(req_text)
+    # If the result is a simple string, wrap it in a structured object
+    if isinstance(result, str):
+        return {"type": "single", "conditions": [result]}
+    return result
+
+_parse_cached = lru_cache(maxsize=65536)(_parse_normalized)
+
+def parse_req_string(req_text, fast=True):
+    """
+    Preprocess the raw prerequisite/corequisite text to normalize whitespace and
+    then parse it into a structured JSON object. fast=False skips the cache and
+    the fast path and always runs the pyparsing grammar.
+    """
+    req_text = normalize_req_string(req_text)
+    if req_text is None:
+        return None
+    return _parse_cached(req_text) if fast else _parse_normalized(req_text, fast=False)
+
+def parse_req_strings(texts, workers=1, chunksize=256):
+    """
+    parse_req_string over many strings, each distinct string parsed once.
+    With workers > 1 the distinct strings are split across that many
+    processes (for full catalog rebuilds).
+    """
+    unique = list(dict.fromkeys(texts))
+    if workers > 1 and len(unique) > chunksize:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(parse_req_string, unique, chunksize=chunksize))
+    else:
+        parsed = [parse_req_string(text) for text in unique]
+    by_text = dict(zip(unique, parsed))
+    return [by_text[text] for text in texts]
+
+def cache_info():
+    """lru_cache statistics of the normalized-string cache."""
+    return _parse_cached.cache_info()
+
+def clear_cache():
+    _parse_cached.cache_clear()
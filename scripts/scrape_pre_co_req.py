@@ -1,19 +1,17 @@
+import argparse
+import asyncio
+import httpx
 import requests
-from bs4 import BeautifulSoup
 import os
 import json
-import re
+import random
+import time
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import execute_values
 
-# Import pyparsing for a more robust parser
-from pyparsing import (
-    infixNotation, opAssoc, Word, alphas, nums, Combine, ParserElement, oneOf
-)
-
-# Enable packrat parsing for better performance
-ParserElement.enablePackrat()
+from html_backends import BACKENDS, DEFAULT_BACKEND, catalog_courses
+from prereq_parser import parse_req_string, parse_req_strings
 
 # Load environment variables (DATABASE_URL must be defined in your .env file)
 load_dotenv(dotenv_path="../.env")
@@ -21,73 +19,58 @@ DATABASE_URL = os.environ.get("DATABASE_URL")
 if not DATABASE_URL:
     raise Exception("DATABASE_URL not set in environment")
 
-# --- Define a Grammar for Course Codes and Boolean Expressions ---
-# A course code typically consists of a subject (letters) followed by a space and a number (or alphanumeric)
-subject_part = Word(alphas)
-number_part = Word(nums + alphas)
-course_token = Combine(subject_part + " " + number_part)
-
-# Define a boolean expression grammar with operators "and" and "or"
-bool_expr = infixNotation(course_token,
-    [
-        (oneOf("and"), 2, opAssoc.LEFT),
-        (oneOf("or"), 2, opAssoc.LEFT),
-    ]
-)
-
-def parse_with_pyparsing(text):
-    """
-    Parse the prerequisite/corequisite string using pyparsing.
-    Returns a nested Python structure.
-    """
-    try:
-        parsed = bool_expr.parseString(text, parseAll=True).asList()
-
-        def convert(parsed_item):
-            if isinstance(parsed_item, list):
-                if len(parsed_item) == 1:
-                    return convert(parsed_item[0])
-                elif len(parsed_item) == 3:
-                    left = convert(parsed_item[0])
-                    op = parsed_item[1]
-                    right = convert(parsed_item[2])
-                    return {"type": op, "conditions": [left, right]}
-                else:
-                    # Process left-associatively for longer lists
-                    result = convert(parsed_item[0])
-                    for i in range(1, len(parsed_item), 2):
-                        op = parsed_item[i]
-                        right = convert(parsed_item[i+1])
-                        result = {"type": op, "conditions": [result, right]}
-                    return result
-            else:
-                # Return the token as is
-                return parsed_item
-        return convert(parsed)
-    except Exception as e:
-        print("Error parsing prerequisites:", text, e)
-        return text  # Fallback to raw string if parsing fails
-
-def parse_req_string(req_text):
+# --- Scraper Functionality ---
+CATALOG_URL = "https://catalog.vt.edu/undergraduate/course-descriptions/{}/"
+
+SUBJECTS = [
+    "AAD", "AAEC", "ACIS", "ADS", "ADV", "AFST", "AHRM", "AINS", "AIS", "ALCE", "ALS",
+    "AOE", "APS", "APSC", "ARBC", "ARCH", "ART", "AS", "ASPT", "AT", "BC", "BCHM", "BDS",
+    "BIOL", "BIT", "BMES", "BMSP", "BMVS", "BSE", "CEE", "CEM", "CHE", "CHEM", "CHN",
+    "CINE", "CLA", "CMDA", "CMST", "CNST", "COMM", "CONS", "COS", "CRIM", "CS", "CSES",
+    "DANC", "DASC", "ECE", "ECON", "EDCI", "EDCO", "EDCT", "EDEL", "EDEP", "EDHE",
+    "EDIT", "EDP", "EDRE", "EDTE", "ENGE", "ENGL", "ENGR", "ENSC", "ENT", "ESM", "FA",
+    "FIN", "FIW", "FL", "FMD", "FR", "FREC", "FST", "GBCB", "GEOG", "GEOS", "GER", "GIA",
+    "GR", "GRAD", "HD", "HEB", "HIST", "HNFE", "HORT", "HTM", "HUM", "IDS", "IS",
+    "ISC", "ISE", "ITAL", "ITDS", "JMC", "JPN", "JUD", "LAHS", "LAR", "LAT", "LDRS",
+    "MACR", "MATH", "ME", "MGT", "MINE", "MKTG", "MN", "MS", "MSE", "MTRG", "MUS",
+    "NANO", "NEUR", "NR", "NSEG", "PAPA", "PHIL", "PHS", "PHYS", "PM", "PORT", "PPE",
+    "PPWS", "PR", "PSCI", "PSVP", "PSYC", "REAL", "RED", "RLCL", "RTM", "RUS", "SBIO",
+    "SOC", "SPAN", "SPES", "SPIA", "STAT", "STL", "STS", "SYSB", "TA", "TBMH", "UAP",
+    "UH", "UNIV", "VM", "WATR", "WGS"
+]
+
+def parse_catalog_html(html, parser=DEFAULT_BACKEND, requirements=True):
     """
-    Preprocess the raw prerequisite/corequisite text to normalize whitespace and
-    then parse it into a structured JSON object.
+    Course requirement dicts from one catalog course-descriptions page
+    (see html_backends for `parser`). Courses without prerequisites or
+    corequisites are left out. With requirements=False the *_json fields
+    are left None for parse_requirements to fill in later.
     """
-    # Replace non-breaking spaces with regular spaces
-    req_text = req_text.replace("\xa0", " ").strip()
-    if not req_text:
-        return None
-    # Normalize whitespace around "and" and "or"
-    req_text = re.sub(r'\s*or\s*', ' or ', req_text, flags=re.IGNORECASE)
-    req_text = re.sub(r'\s*and\s*', ' and ', req_text, flags=re.IGNORECASE)
-    result = parse_with_pyparsing(req_text)
-    # If the result is a simple string, wrap it in a structured object
-    if isinstance(result, str):
-        return {"type": "single", "conditions": [result]}
-    return result
+    courses = []
+    for course_code, title, prereq_text, coreq_text in catalog_courses(html, parser):
+        # Extract prerequisites / corequisites raw text (if any)
+        raw_prereq = prereq_text.replace("Prerequisite(s):", "").strip() if prereq_text is not None else ""
+        raw_coreq = coreq_text.replace("Corequisite(s):", "").strip() if coreq_text is not None else ""
 
-# --- Scraper Functionality ---
-def scrape_course_requirements(subject_code):
+        # Only include courses with prerequisite or corequisite info
+        if not raw_prereq and not raw_coreq:
+            continue
+
+        # Parse into structured JSON
+        prereqs_json = parse_req_string(raw_prereq) if raw_prereq and requirements else None
+        coreqs_json = parse_req_string(raw_coreq) if raw_coreq and requirements else None
+
+        courses.append({
+            "course_code": course_code,
+            "title": title,
+            "prerequisites": raw_prereq,
+            "corequisites": raw_coreq,
+            "prereqs_json": prereqs_json,
+            "coreqs_json": coreqs_json
+        })
+    return courses
+
+def scrape_course_requirements(subject_code, parser=DEFAULT_BACKEND):
     """
     Scrapes the course page for the given subject code.
     For example, for ALCE the URL would be:
@@ -102,55 +85,122 @@ def scrape_course_requirements(subject_code):
          'coreqs_json': <structured JSON>
        }
     """
-    url = f"https://catalog.vt.edu/undergraduate/course-descriptions/{subject_code}/"
-    response = requests.get(url)
+    response = requests.get(CATALOG_URL.format(subject_code), timeout=10)
     response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
-    course_blocks = soup.find_all("div", class_="courseblock")
-    courses = []
-    for block in course_blocks:
-        # Extract course code
-        code_elem = block.find("span", class_="detail-code")
-        course_code = code_elem.get_text(strip=True) if code_elem else None
+    return parse_catalog_html(response.text, parser)
 
-        # Extract title
-        title_elem = block.find("span", class_="detail-title")
-        title = title_elem.get_text(strip=True) if title_elem else None
+def parse_requirements(courses, workers=1):
+    """
+    Fills in prereqs_json / coreqs_json for courses parsed with
+    requirements=False, each distinct expression parsed once (across
+    `workers` processes if more than one).
+    """
+    texts = [c["prerequisites"] for c in courses if c["prerequisites"]]
+    texts += [c["corequisites"] for c in courses if c["corequisites"]]
+    parsed = dict(zip(texts, parse_req_strings(texts, workers)))
+    for c in courses:
+        c["prereqs_json"] = parsed[c["prerequisites"]] if c["prerequisites"] else None
+        c["coreqs_json"] = parsed[c["corequisites"]] if c["corequisites"] else None
+    return courses
 
-        # Extract prerequisites raw text (if any)
-        prereq_elem = block.find("span", class_="detail-prereq")
-        raw_prereq = (prereq_elem.get_text(strip=True)
-                      .replace("Prerequisite(s):", "").strip()) if prereq_elem else ""
+# --- Concurrent Scraper ---
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+CACHE_VERSION = 1  # bump when parse_catalog_html's output changes, to drop stale entries
 
-        # Extract corequisites raw text (if any)
-        coreq_elem = block.find("span", class_="detail-coreq")
-        raw_coreq = (coreq_elem.get_text(strip=True)
-                     .replace("Corequisite(s):", "").strip()) if coreq_elem else ""
+def load_cache_entry(cache_dir, subject):
+    """The cached validators and parsed courses for subject, or None."""
+    if not cache_dir:
+        return None
+    try:
+        with open(os.path.join(cache_dir, f"{subject}.json"), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if entry.get("version") == CACHE_VERSION else None
 
-        # Only include courses with prerequisite or corequisite info
-        if not raw_prereq and not raw_coreq:
-            continue
+def save_cache_entry(cache_dir, subject, entry):
+    path = os.path.join(cache_dir, f"{subject}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(path + ".tmp", path)
 
-        # Parse into structured JSON
-        prereqs_json = parse_req_string(raw_prereq) if raw_prereq else None
-        coreqs_json = parse_req_string(raw_coreq) if raw_coreq else None
+async def fetch_catalog_page(client, url, cached=None, retries=3, backoff=0.5):
+    """
+    GETs one catalog page through the shared client, revalidating with the
+    cached ETag / Last-Modified so an unchanged page comes back as an empty
+    304. Connection errors, timeouts, 429 and 5xx are retried with jittered
+    exponential backoff. Returns (response, attempts).
+    """
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    for attempt in range(retries + 1):
+        try:
+            response = await client.get(url, headers=headers)
+            if response.status_code not in RETRY_STATUSES:
+                if response.status_code != 304 or not cached:
+                    response.raise_for_status()
+                return response, attempt + 1
+            error = httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+        except httpx.TransportError as e:
+            error = e
+        if attempt == retries:
+            raise error
+        await asyncio.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
 
-        courses.append({
-            "course_code": course_code,
-            "title": title,
-            "prerequisites": raw_prereq,
-            "corequisites": raw_coreq,
-            "prereqs_json": prereqs_json,
-            "coreqs_json": coreqs_json
-        })
-    return courses
+async def scrape_catalog(subjects, parser=DEFAULT_BACKEND, concurrency=8, cache_dir=None,
+                         url=CATALOG_URL, retries=3, timeout=10):
+    """
+    Scrapes many subjects' catalog pages concurrently over one keep-alive
+    connection pool, at most `concurrency` at a time. With a cache_dir,
+    pages the server reports unchanged (304) reuse the courses parsed last
+    time instead of being downloaded and parsed again. A subject that still
+    fails after its retries is logged and skipped. Downloaded pages' courses
+    come back without *_json; run parse_requirements on them.
+
+    Returns {subject: {"status": "fetched" | "unchanged", "courses": [...],
+    "entry": cache entry to save once the courses are stored}}.
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async def scrape_one(client, subject):
+        cached = load_cache_entry(cache_dir, subject)
+        page_url = url.format(subject.lower())
+        async with slots:
+            try:
+                response, attempts = await fetch_catalog_page(client, page_url, cached, retries)
+            except Exception as e:
+                print(f"❌ Error scraping subject {subject}: {e}")
+                return
+        if response.status_code == 304:
+            results[subject] = {"status": "unchanged", "courses": cached["courses"], "entry": None}
+            return
+        # Parse off the event loop so other pages keep downloading meanwhile.
+        courses = await asyncio.to_thread(parse_catalog_html, response.text, parser, False)
+        entry = {
+            "version": CACHE_VERSION, "url": page_url, "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"), "courses": courses,
+        }
+        results[subject] = {"status": "fetched", "courses": courses, "entry": entry}
+        print(f"✅ {subject}: {len(courses)} courses with prereq/coreq data"
+              f"{f' ({attempts} attempts)' if attempts > 1 else ''}")
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True) as client:
+        await asyncio.gather(*(scrape_one(client, subject) for subject in subjects))
+    return {subject: results[subject] for subject in subjects if subject in results}
 
 # --- Database Insertion ---
 def insert_course_requirements(conn, courses):
     """
     Inserts or updates course requirement data into the course_requirements table.
     Expects each course as a dict containing raw prerequisite/corequisite strings
-    and the structured JSON versions.
+    and the structured JSON versions. All rows go out as one batched upsert;
+    a course listed more than once keeps its last entry.
     """
     if not courses:
         print("No course requirement data to insert.")
@@ -173,52 +223,79 @@ def insert_course_requirements(conn, courses):
            prereqs_json = EXCLUDED.prereqs_json,
            coreqs_json = EXCLUDED.coreqs_json;
     """
-    data_tuples = []
+    # ON CONFLICT cannot touch the same row twice within one statement.
+    by_code = {}
     for c in courses:
-        data_tuples.append((
+        by_code[c["course_code"]] = (
             c["course_code"],
             c["title"],
             c["prerequisites"],
             c["corequisites"],
             json.dumps(c["prereqs_json"]) if c["prereqs_json"] else None,
             json.dumps(c["coreqs_json"]) if c["coreqs_json"] else None
-        ))
+        )
+    data_tuples = list(by_code.values())
     with conn.cursor() as cur:
-        execute_values(cur, query, data_tuples)
+        execute_values(cur, query, data_tuples, page_size=len(data_tuples))
     conn.commit()
-    print(f"Inserted/Updated {len(courses)} rows into course_requirements.")
+    print(f"Inserted/Updated {len(data_tuples)} rows into course_requirements.")
 
 def main():
-    subjects = [
-        "AAD", "AAEC", "ACIS", "ADS", "ADV", "AFST", "AHRM", "AINS", "AIS", "ALCE", "ALS",
-        "AOE", "APS", "APSC", "ARBC", "ARCH", "ART", "AS", "ASPT", "AT", "BC", "BCHM", "BDS",
-        "BIOL", "BIT", "BMES", "BMSP", "BMVS", "BSE", "CEE", "CEM", "CHE", "CHEM", "CHN",
-        "CINE", "CLA", "CMDA", "CMST", "CNST", "COMM", "CONS", "COS", "CRIM", "CS", "CSES",
-        "DANC", "DASC", "ECE", "ECON", "EDCI", "EDCO", "EDCT", "EDEL", "EDEP", "EDHE",
-        "EDIT", "EDP", "EDRE", "EDTE", "ENGE", "ENGL", "ENGR", "ENSC", "ENT", "ESM", "FA",
-        "FIN", "FIW", "FL", "FMD", "FR", "FREC", "FST", "GBCB", "GEOG", "GEOS", "GER", "GIA",
-        "GR", "GRAD", "HD", "HEB", "HIST", "HNFE", "HORT", "HTM", "HUM", "IDS", "IS",
-        "ISC", "ISE", "ITAL", "ITDS", "JMC", "JPN", "JUD", "LAHS", "LAR", "LAT", "LDRS",
-        "MACR", "MATH", "ME", "MGT", "MINE", "MKTG", "MN", "MS", "MSE", "MTRG", "MUS",
-        "NANO", "NEUR", "NR", "NSEG", "PAPA", "PHIL", "PHS", "PHYS", "PM", "PORT", "PPE",
-        "PPWS", "PR", "PSCI", "PSVP", "PSYC", "REAL", "RED", "RLCL", "RTM", "RUS", "SBIO",
-        "SOC", "SPAN", "SPES", "SPIA", "STAT", "STL", "STS", "SYSB", "TA", "TBMH", "UAP",
-        "UH", "UNIV", "VM", "WATR", "WGS"
-    ]
-
-    conn = psycopg2.connect(DATABASE_URL, sslmode="require")
+    parser = argparse.ArgumentParser(description="Scrape catalog prerequisites/corequisites into course_requirements")
+    parser.add_argument("--subject", help="Optional: single subject to scrape (e.g., CS)")
+    parser.add_argument("--url", default=CATALOG_URL,
+                        help="Catalog page URL with {} for the lowercase subject (e.g. a local banner_stub.py)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per subject on errors, 429 and 5xx")
+    parser.add_argument("--cache", help="Directory of per-subject ETag/Last-Modified and parsed courses; "
+                                        "unchanged pages are neither downloaded nor parsed again")
+    parser.add_argument("--full", action="store_true",
+                        help="Upsert every subject's courses, not only those from pages that changed")
+    parser.add_argument("--html-parser", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="HTML backend for the catalog pages (see html_backends.py)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for parsing prerequisite expressions (full rebuilds)")
+    args = parser.parse_args()
 
-    try:
-        for subject in subjects:
-            print(f"\nScraping course requirements for subject: {subject} ...")
-            try:
-                course_data = scrape_course_requirements(subject.lower())
-                print(f"Found {len(course_data)} courses with prereq/coreq data.")
-                insert_course_requirements(conn, course_data)
-            except Exception as e:
-                print(f"Error scraping subject {subject}: {e}")
-    finally:
-        conn.close()
+    subjects = [args.subject.upper()] if args.subject else SUBJECTS
+    if args.cache:
+        os.makedirs(args.cache, exist_ok=True)
+
+    start = time.perf_counter()
+    print(f"🔍 Scraping course requirements for {len(subjects)} subjects ({args.concurrency} at a time)...")
+    results = asyncio.run(scrape_catalog(
+        subjects, args.html_parser, concurrency=args.concurrency, cache_dir=args.cache,
+        url=args.url, retries=args.retries
+    ))
+    fetched = [s for s, r in results.items() if r["status"] == "fetched"]
+    unchanged = [s for s, r in results.items() if r["status"] == "unchanged"]
+    failed = [s for s in subjects if s not in results]
+    print(f"⏱️ {len(results)}/{len(subjects)} subjects in {time.perf_counter() - start:.2f}s: "
+          f"{len(fetched)} downloaded, {len(unchanged)} unchanged (304), {len(failed)} failed")
+    if failed:
+        print(f"   failed: {', '.join(failed)}")
+
+    # The cache entries hold these same course dicts, so they are saved with the parsed JSON.
+    parse_start = time.perf_counter()
+    new_courses = parse_requirements([c for s in fetched for c in results[s]["courses"]], args.workers)
+    print(f"⏱️ Parsed requirements of {len(new_courses)} courses in {time.perf_counter() - parse_start:.2f}s")
+
+    to_store = results if args.full else {s: results[s] for s in fetched}
+    courses = [course for r in to_store.values() for course in r["courses"]]
+
+    if courses:
+        conn = psycopg2.connect(DATABASE_URL, sslmode="require")
+        try:
+            insert_course_requirements(conn, courses)
+        finally:
+            conn.close()
+    else:
+        print("No course requirement data to insert.")
+
+    # Only remember pages once their courses are stored, so a failed insert is retried next run.
+    if args.cache:
+        for subject in fetched:
+            save_cache_entry(args.cache, subject, results[subject]["entry"])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# backend.recommender is imported as a package from the repo root; the
+# scripts import each other as top-level modules from scripts/.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,110 @@
+import pytest
+
+from backend.recommender.planner import NEVER, DegreePlanner
+
+def _and(*codes):
+    return {"type": "and", "conditions": list(codes)}
+
+def _or(*codes):
+    return {"type": "or", "conditions": list(codes)}
+
+# CS 1114 -> CS 2114 -> CS 3114, plus a taller chain X1 -> X2 -> X3 -> X4 competing for the same terms.
+CHAINS = {
+    "CS2114": _and("CS 1114"),
+    "CS3114": _and("CS 2114"),
+    "X2": _and("X1"),
+    "X3": _and("X2"),
+    "X4": _and("X3"),
+}
+
+def _dars(*requirements, completed=()):
+    return {
+        "completed_courses": [{"course_id": code} for code in completed],
+        "in_progress_courses": [],
+        "requirements_needed": [
+            {"requirement_type": f"Requirement {i}", "hours_needed": str(3 * len(codes)), "select_from": list(codes)}
+            for i, codes in enumerate(requirements)
+        ],
+    }
+
+def _term_of(planner):
+    return {course: t for t, courses in enumerate(planner.terms) for course in courses}
+
+def _assert_prereqs_first(planner):
+    term_of = _term_of(planner)
+    for course, t in term_of.items():
+        for prereq in planner._path(course)[2]:
+            assert term_of[prereq] < t, f"{prereq} is not before {course}"
+
+def test_layering_respects_credit_cap_and_chain():
+    planner = DegreePlanner(_dars(["CS3114", "A", "B", "C", "D"]), dict(CHAINS), credits_per_term=9)
+
+    assert all(sum(planner.credits(c) for c in courses) <= 9 for courses in planner.terms)
+    assert set(_term_of(planner)) == {"CS1114", "CS2114", "CS3114", "A", "B", "C", "D"}
+    # The longest chain starts in the first term.
+    assert "CS1114" in planner.terms[0]
+    assert planner.unplaced == []
+    _assert_prereqs_first(planner)
+
+def test_completed_prerequisites_are_not_planned():
+    planner = DegreePlanner(_dars(["CS3114"], completed=["CS 1114"]), dict(CHAINS))
+
+    assert planner.terms == [["CS2114"], ["CS3114"]]
+
+def test_lock_before_prerequisites_is_rejected():
+    planner = DegreePlanner(_dars(["CS3114"]), dict(CHAINS))
+    before = [list(t) for t in planner.terms]
+
+    with pytest.raises(ValueError):
+        planner.lock("CS3114", 0)
+    assert planner.terms == before
+    assert planner.locked == {}
+
+def test_lock_pulls_prerequisites_ahead_of_taller_chains():
+    # One course per term: left alone, the taller X chain goes first and CS 3114 lands in term 7.
+    planner = DegreePlanner(_dars(["X4"], ["CS3114"]), dict(CHAINS), credits_per_term=3)
+    assert _term_of(planner)["CS3114"] > 2
+
+    planner.lock("CS3114", 2)
+    term_of = _term_of(planner)
+    assert term_of["CS1114"] == 0
+    assert term_of["CS2114"] == 1
+    assert term_of["CS3114"] == 2
+    assert all(sum(planner.credits(c) for c in courses) <= 3 for courses in planner.terms)
+    _assert_prereqs_first(planner)
+
+def test_lock_that_cannot_fit_prerequisites_is_rejected():
+    planner = DegreePlanner(_dars(["X4"], ["CS3114"]), dict(CHAINS), credits_per_term=3)
+    planner.lock("X2", 1)
+    before = [list(t) for t in planner.terms]
+
+    # X1 and CS 1114 would both have to go in term 1 under a one-course cap.
+    with pytest.raises(ValueError):
+        planner.lock("CS3114", 2)
+    assert planner.terms == before
+    assert "CS3114" not in planner.locked
+
+@pytest.mark.parametrize("first", ["A", "B"])
+def test_cycle_paths_do_not_depend_on_call_order(first):
+    prereqs = {"A": _and("B"), "B": _or("A", "C")}
+    planner = DegreePlanner(_dars(), prereqs)
+
+    planner._path(first)
+    assert planner._path("A") == (2, frozenset({"B", "C"}), frozenset({"B"}))
+    assert planner._path("B") == (1, frozenset({"C"}), frozenset({"C"}))
+
+def test_cycle_course_is_planned_through_its_other_branch():
+    prereqs = {"A": _and("B"), "B": _or("A", "C")}
+    planner = DegreePlanner(_dars(["B"], ["A"]), prereqs)
+
+    assert planner.unmet == []
+    assert planner.terms == [["C"], ["B"], ["A"]]
+
+def test_pure_cycle_is_unreachable():
+    prereqs = {"A": _and("B"), "B": _and("A")}
+    planner = DegreePlanner(_dars(["A"]), prereqs)
+
+    assert planner._path("A")[0] == NEVER
+    assert planner.unmet == ["Requirement 0"]
+    with pytest.raises(ValueError):
+        planner.lock("A", 3)
@@ -0,0 +1,41 @@
+from backend.recommender.recommender import (
+    GpaLookup, compile_prereq, evaluate_prereq, prereqs_satisfied, recommend_courses
+)
+
+# parse_req_string's shape for a one-course prerequisite ("CS 2114").
+SINGLE = {"type": "single", "conditions": ["CS 2114"]}
+
+SECTIONS = [
+    {"crn": "10001", "code": "CS-3114", "instructor": "A Smith", "days": "M W F",
+     "start_time": "9:05AM", "end_time": "9:55AM", "location": "MCB 100"},
+]
+
+def _dars(completed):
+    return {
+        "completed_courses": [{"course_id": code} for code in completed],
+        "in_progress_courses": [],
+        "requirements_needed": [{"requirement_type": "Data Structures", "select_from": ["CS3114"], "not_from": []}],
+    }
+
+def _recommended(completed, prereq):
+    result = recommend_courses(_dars(completed), SECTIONS, {"CS3114": prereq}, None,
+                               gpa_lookup=GpaLookup.from_rows([]))
+    return [rec["section"]["code"] for rec in result["recommendations"][0]["recommended_courses"]]
+
+def test_single_prerequisite_is_satisfied_by_its_course():
+    # Previously a "single" node never evaluated to True, so CS 3114 was never offered.
+    assert evaluate_prereq(SINGLE, {"CS2114"})
+    assert compile_prereq(SINGLE)({"CS2114"})
+    assert prereqs_satisfied("CS-3114", {"CS2114"}, {"CS3114": SINGLE})
+    assert _recommended(["CS 2114"], SINGLE) == ["CS-3114"]
+
+def test_single_prerequisite_still_required():
+    assert not evaluate_prereq(SINGLE, {"MATH1225"})
+    assert not compile_prereq(SINGLE)({"MATH1225"})
+    assert _recommended(["MATH 1225"], SINGLE) == []
+
+def test_single_matches_equivalent_and():
+    as_and = {"type": "and", "conditions": ["CS 2114"]}
+    for student in (set(), {"CS2114"}, {"CS2114", "CS2505"}):
+        assert evaluate_prereq(SINGLE, student) == evaluate_prereq(as_and, student)
+        assert compile_prereq(SINGLE)(student) == compile_prereq(as_and)(student)
@@ -0,0 +1,53 @@
+from future_db_insert import diff_sections, load_fingerprints, section_row
+
+SECTIONS = [
+    {"crn": "12345", "code": "CS-3114", "days": "M W F", "start_time": "9:05AM", "end_time": "9:55AM",
+     "location": "MCB 100", "instructor": "A Smith"},
+    {"crn": "23456", "code": "MATH-2114", "days": "T R", "start_time": "11:00AM", "end_time": "12:15PM",
+     "location": "TORG 1020", "instructor": "B Lee"},
+]
+
+class FakeCursor:
+    """Yields the sections table rows the way psycopg2 does for an integer crn column."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        pass
+
+    def __iter__(self):
+        return iter(self.rows)
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+def _db_rows(sections):
+    return [(int(row[0]),) + row[1:] for row in map(section_row, sections)]
+
+def test_int_crns_from_db_diff_as_empty():
+    previous = load_fingerprints(FakeConnection(_db_rows(SECTIONS)))
+    assert set(previous) == {"12345", "23456"}
+
+    upserts, deleted, fingerprints = diff_sections(previous, SECTIONS, scraped_subjects={"CS", "MATH"})
+    assert upserts == []
+    assert deleted == []
+    assert fingerprints == previous
+
+def test_changed_section_from_db_is_an_update():
+    previous = load_fingerprints(FakeConnection(_db_rows(SECTIONS)))
+    moved = [dict(SECTIONS[0], location="GBJ 102"), SECTIONS[1]]
+
+    upserts, deleted, _ = diff_sections(previous, moved, scraped_subjects={"CS", "MATH"})
+    assert [(op, row[0]) for op, row in upserts] == [("update", "12345")]
+    assert deleted == []